@@ -1,6 +1,5 @@
 import time
 import pandas as pd
-import re
 from datetime import datetime
 from selenium import webdriver
 from selenium.webdriver.common.by import By
@@ -12,6 +11,89 @@ from webdriver_manager.chrome import ChromeDriverManager
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 import logging
 from urllib.parse import urljoin, urlparse
+from padroes_texto import (
+    LISTING_SOLD_BY_PATTERN, LISTING_SHIPPED_SOLD_BY_PATTERN, DETAILED_SELLER_PATTERNS,
+    SELLER_NAME_CLEANUP_PATTERN, PAGE_PRICE_PATTERNS, RATING_PATTERN,
+    MAIN_IMAGE_SELECTORS, MAIN_IMAGE_ATTRIBUTES,
+    seller_name_rejection, parse_price_text, normalize_specifications, pick_main_image_url
+)
+
+# Lê a tabela de especificações inteira numa única chamada ao navegador:
+# primeiro seletor que tiver linhas chave/valor (th+td ou td+td)
+SPEC_TABLE_SCRIPT = """
+const selectors = arguments[0];
+for (const selector of selectors) {
+    const pairs = [];
+    for (const row of document.querySelectorAll(selector)) {
+        const cells = row.querySelectorAll(':scope > th, :scope > td');
+        if (cells.length !== 2) continue;
+        const key = cells[0].innerText.trim();
+        const value = cells[1].innerText.trim();
+        if (key && value) pairs.push([key, value]);
+    }
+    if (pairs.length) return pairs;
+}
+return [];
+"""
+
+class PageSnapshot:
+    """
+    Estado de uma página durante uma visita
+
+    Criado na navegação e compartilhado por todos os extract_* da mesma página:
+    page_source, texto do body, elementos resolvidos e seus textos/atributos são
+    buscados no WebDriver uma única vez. É descartado na próxima navegação.
+    """
+
+    def __init__(self, driver):
+        self.driver = driver
+        self._page_source = None
+        self._body_text = None
+        self._elements = {}
+        self._texts = {}
+        self._attributes = {}
+
+    @property
+    def page_source(self):
+        """HTML da página (buscado uma vez)"""
+        if self._page_source is None:
+            self._page_source = self.driver.page_source
+        return self._page_source
+
+    @property
+    def body_text(self):
+        """Texto renderizado do body (buscado uma vez)"""
+        if self._body_text is None:
+            self._body_text = self.driver.find_element(By.TAG_NAME, "body").text
+        return self._body_text
+
+    def find_elements(self, by, selector):
+        """Elementos do seletor, resolvidos uma vez por página (inclusive resultados vazios)"""
+        key = (by, selector)
+        if key not in self._elements:
+            self._elements[key] = self.driver.find_elements(by, selector)
+        return self._elements[key]
+
+    def find_element(self, by, selector):
+        """Primeiro elemento do seletor, com a mesma exceção do WebDriver quando não existe"""
+        elements = self.find_elements(by, selector)
+        if not elements:
+            raise NoSuchElementException(f"Elemento não encontrado: {selector}")
+        return elements[0]
+
+    def text(self, element):
+        """Texto do elemento (buscado uma vez)"""
+        if element.id not in self._texts:
+            self._texts[element.id] = element.text
+        return self._texts[element.id]
+
+    def attribute(self, element, name):
+        """Atributo do elemento (buscado uma vez)"""
+        key = (element.id, name)
+        if key not in self._attributes:
+            self._attributes[key] = element.get_attribute(name)
+        return self._attributes[key]
+
 
 class AmazonScraperV2:
     def __init__(self, headless=True, debug=False):
@@ -21,6 +103,7 @@ class AmazonScraperV2:
         self.debug = debug
         self.setup_logging()
         self.driver = None
+        self.page = None
         self.headless = headless
         self.setup_driver()
         
@@ -56,6 +139,17 @@ class AmazonScraperV2:
             self.logger.error(f"Erro ao configurar driver: {e}")
             raise
     
+    def navigate(self, url):
+        """Navega para a URL e inicia um novo snapshot da página"""
+        self.driver.get(url)
+        self.page = PageSnapshot(self.driver)
+    
+    def current_page(self):
+        """Snapshot da página atual (criado sob demanda se não houve navegação)"""
+        if self.page is None:
+            self.page = PageSnapshot(self.driver)
+        return self.page
+    
     def scrape_product_listing(self, search_url, max_pages=3):
         """
         Extrai a listagem de produtos da página de busca
@@ -64,7 +158,7 @@ class AmazonScraperV2:
         
         try:
             # Navegar para a página de busca
-            self.driver.get(search_url)
+            self.navigate(search_url)
             time.sleep(2)  # Aguardar carregamento inicial
             
             # Aguardar carregamento dos resultados
@@ -105,6 +199,7 @@ class AmazonScraperV2:
                         next_button = self.driver.find_element(By.CSS_SELECTOR, "a[aria-label='Próxima página']")
                         if next_button.is_enabled():
                             next_button.click()
+                            self.page = None
                             time.sleep(3)
                         else:
                             break
@@ -226,10 +321,10 @@ class AmazonScraperV2:
         for selector in price_selectors:
             try:
                 price_element = element.find_element(By.CSS_SELECTOR, selector)
-                price_text = price_element.text.replace("R$", "").replace(".", "").replace(",", ".").strip()
-                if price_text and price_text.replace(".", "").isdigit():
-                    return float(price_text)
-            except (NoSuchElementException, ValueError):
+                price_value = parse_price_text(price_element.text)
+                if price_value is not None:
+                    return price_value
+            except NoSuchElementException:
                 continue
         
         return None
@@ -239,7 +334,7 @@ class AmazonScraperV2:
         try:
             rating_element = element.find_element(By.CSS_SELECTOR, ".a-icon-alt")
             rating_text = rating_element.get_attribute("textContent")
-            rating_match = re.search(r'(\d+[,.]\d+)', rating_text)
+            rating_match = RATING_PATTERN.search(rating_text)
             if rating_match:
                 return float(rating_match.group(1).replace(",", "."))
         except (NoSuchElementException, ValueError):
@@ -269,7 +364,7 @@ class AmazonScraperV2:
                 self.logger.info(f"Texto do elemento para análise de vendedor: {element_text[:200]}...")
             
             # Padrão: "Vendido por [Nome do Vendedor]"
-            vendido_por_match = re.search(r'Vendido por\s+([^\n\r]+)', element_text, re.IGNORECASE)
+            vendido_por_match = LISTING_SOLD_BY_PATTERN.search(element_text)
             if vendido_por_match:
                 seller_name = vendido_por_match.group(1).strip()
                 if self.debug:
@@ -278,7 +373,7 @@ class AmazonScraperV2:
                     return seller_name
             
             # Padrão: "Enviado por [Nome] / Vendido por [Nome]"
-            enviado_vendido_match = re.search(r'Enviado por\s+([^/]+)\s*/\s*Vendido por\s+([^\n\r]+)', element_text, re.IGNORECASE)
+            enviado_vendido_match = LISTING_SHIPPED_SOLD_BY_PATTERN.search(element_text)
             if enviado_vendido_match:
                 seller_name = enviado_vendido_match.group(2).strip()
                 if self.debug:
@@ -323,23 +418,27 @@ class AmazonScraperV2:
             
             try:
                 # Navegar para a página do produto
-                self.driver.get(product_url)
+                self.navigate(product_url)
                 time.sleep(2)  # Aguardar carregamento
                 
                 # Extrair informações detalhadas
+                specifications = self.extract_specifications()
                 details = {
                     'seller_detailed': self.extract_detailed_seller(),
                     'price_detailed': self.extract_detailed_price(),
                     'description': self.extract_description(),
-                    'specifications': self.extract_specifications(),
+                    'specifications': specifications,
                     'availability': self.extract_availability(),
-                    'shipping_info': self.extract_shipping_info()
+                    'shipping_info': self.extract_shipping_info(),
+                    'image_url': self.extract_main_image_url(),
+                    **normalize_specifications(specifications)
                 }
                 
                 return details
                 
             finally:
-                # Fechar aba e voltar para a original
+                # Descartar snapshot, fechar aba e voltar para a original
+                self.page = None
                 self.driver.close()
                 self.driver.switch_to.window(original_window)
                 
@@ -353,6 +452,8 @@ class AmazonScraperV2:
             if self.debug:
                 self.logger.info("Iniciando extração detalhada do vendedor...")
             
+            page = self.current_page()
+            
             # 1. PRIMEIRO: Verificar se é vendido pela Amazon
             amazon_indicators = [
                 "#merchant-info a[href*='amazon.com.br']",
@@ -365,10 +466,10 @@ class AmazonScraperV2:
             
             for selector in amazon_indicators:
                 try:
-                    amazon_elements = self.driver.find_elements(By.CSS_SELECTOR, selector)
+                    amazon_elements = page.find_elements(By.CSS_SELECTOR, selector)
                     for element in amazon_elements:
-                        href = element.get_attribute("href")
-                        text = element.text.strip()
+                        href = page.attribute(element, "href")
+                        text = page.text(element).strip()
                         if "amazon" in href.lower() or "amazon" in text.lower():
                             if self.debug:
                                 self.logger.info(f"Amazon detectado via seletor '{selector}': {text}")
@@ -400,8 +501,8 @@ class AmazonScraperV2:
             
             for xpath_selector in xpath_selectors:
                 try:
-                    merchant_element = self.driver.find_element(By.XPATH, xpath_selector)
-                    merchant_text = merchant_element.text.strip()
+                    merchant_element = page.find_element(By.XPATH, xpath_selector)
+                    merchant_text = page.text(merchant_element).strip()
                     if self.debug:
                         self.logger.info(f"Seletor XPath '{xpath_selector}' encontrou: '{merchant_text}'")
                     if self.is_valid_seller_name(merchant_text):
@@ -417,10 +518,10 @@ class AmazonScraperV2:
             
             for selector in seller_selectors:
                 try:
-                    seller_elements = self.driver.find_elements(By.CSS_SELECTOR, selector)
+                    seller_elements = page.find_elements(By.CSS_SELECTOR, selector)
                     for seller_element in seller_elements:
-                        seller_text = seller_element.text.strip()
-                        href = seller_element.get_attribute("href")
+                        seller_text = page.text(seller_element).strip()
+                        href = page.attribute(seller_element, "href")
                         
                         # Pular se for link da Amazon
                         if href and "amazon" in href.lower():
@@ -437,23 +538,14 @@ class AmazonScraperV2:
                     continue
             
             # 3. TERCEIRO: Procurar por padrões no texto da página (mais específicos)
-            page_text = self.driver.find_element(By.TAG_NAME, "body").text
+            page_text = page.body_text
             
             if self.debug:
                 self.logger.info(f"Texto da página para análise: {page_text[:500]}...")
             
-            # Padrões mais específicos e robustos
-            patterns = [
-                r'Vendido por\s+([^\n\r,]+?)(?:\s*$|\s*\(|\s*\|)',
-                r'Enviado por\s+([^/]+?)\s*/\s*Vendido por\s+([^\n\r,]+?)(?:\s*$|\s*\(|\s*\|)',
-                r'Sold by\s+([^\n\r,]+?)(?:\s*$|\s*\(|\s*\|)',
-                r'Shipped by\s+([^/]+?)\s*/\s*Sold by\s+([^\n\r,]+?)(?:\s*$|\s*\(|\s*\|)',
-                r'Vendedor:\s*([^\n\r,]+?)(?:\s*$|\s*\(|\s*\|)',
-                r'Seller:\s*([^\n\r,]+?)(?:\s*$|\s*\(|\s*\|)'
-            ]
-            
-            for pattern in patterns:
-                match = re.search(pattern, page_text, re.IGNORECASE | re.MULTILINE)
+            # Padrões mais específicos e robustos (pré-compilados em padroes_texto)
+            for pattern in DETAILED_SELLER_PATTERNS:
+                match = pattern.search(page_text)
                 if match:
                     if len(match.groups()) == 2:
                         seller_name = match.group(2).strip()
@@ -461,7 +553,7 @@ class AmazonScraperV2:
                         seller_name = match.group(1).strip()
                     
                     # Limpar caracteres indesejados
-                    seller_name = re.sub(r'[^\w\s\-\.]', '', seller_name).strip()
+                    seller_name = SELLER_NAME_CLEANUP_PATTERN.sub('', seller_name).strip()
                     
                     if self.debug:
                         self.logger.info(f"Padrão regex encontrou: '{seller_name}'")
@@ -489,10 +581,10 @@ class AmazonScraperV2:
             
             # 5. QUINTO: Fallback - procurar qualquer link que não seja Amazon
             try:
-                all_links = self.driver.find_elements(By.CSS_SELECTOR, "a[href*='seller'], a[href*='merchant'], a[href*='storefront']")
+                all_links = page.find_elements(By.CSS_SELECTOR, "a[href*='seller'], a[href*='merchant'], a[href*='storefront']")
                 for link in all_links:
-                    href = link.get_attribute("href")
-                    text = link.text.strip()
+                    href = page.attribute(link, "href")
+                    text = page.text(link).strip()
                     if href and "amazon" not in href.lower() and self.is_valid_seller_name(text):
                         if self.debug:
                             self.logger.info(f"Fallback encontrou vendedor: {text}")
@@ -515,17 +607,18 @@ class AmazonScraperV2:
             if self.debug:
                 self.logger.info("Iniciando extração detalhada do preço...")
             
+            page = self.current_page()
+            
             # 1. PRIMEIRO: Tentar o seletor XPath específico sugerido
             try:
-                price_element = self.driver.find_element(By.XPATH, "//*[@id='corePrice_feature_div']/div/div/div/div/span[1]/span[1]")
-                price_text = price_element.text.strip()
+                price_element = page.find_element(By.XPATH, "//*[@id='corePrice_feature_div']/div/div/div/div/span[1]/span[1]")
+                price_text = page.text(price_element).strip()
                 if self.debug:
                     self.logger.info(f"Seletor XPath específico encontrou preço: '{price_text}'")
                 
                 # Limpar e converter preço
-                cleaned_price = price_text.replace("R$", "").replace(".", "").replace(",", ".").strip()
-                if cleaned_price and cleaned_price.replace(".", "").isdigit():
-                    price_value = float(cleaned_price)
+                price_value = parse_price_text(price_text)
+                if price_value is not None:
                     if self.debug:
                         self.logger.info(f"Preço válido extraído via XPath: {price_value}")
                     return price_value
@@ -550,15 +643,14 @@ class AmazonScraperV2:
             
             for selector in price_selectors:
                 try:
-                    price_element = self.driver.find_element(By.CSS_SELECTOR, selector)
-                    price_text = price_element.text.strip()
+                    price_element = page.find_element(By.CSS_SELECTOR, selector)
+                    price_text = page.text(price_element).strip()
                     if self.debug:
                         self.logger.info(f"Seletor CSS '{selector}' encontrou: '{price_text}'")
                     
                     # Limpar e converter preço
-                    cleaned_price = price_text.replace("R$", "").replace(".", "").replace(",", ".").strip()
-                    if cleaned_price and cleaned_price.replace(".", "").isdigit():
-                        price_value = float(cleaned_price)
+                    price_value = parse_price_text(price_text)
+                    if price_value is not None:
                         if self.debug:
                             self.logger.info(f"Preço válido extraído via CSS: {price_value}")
                         return price_value
@@ -572,19 +664,12 @@ class AmazonScraperV2:
             
             # 3. TERCEIRO: Procurar por padrões no texto da página
             try:
-                page_text = self.driver.find_element(By.TAG_NAME, "body").text
+                page_text = page.body_text
                 if self.debug:
                     self.logger.info(f"Texto da página para análise de preço: {page_text[:500]}...")
                 
-                patterns = [
-                    r'R\$\s*(\d+[,.]?\d*)',
-                    r'(\d+[,.]?\d*)\s*reais',
-                    r'Preço:\s*R\$\s*(\d+[,.]?\d*)',
-                    r'Valor:\s*R\$\s*(\d+[,.]?\d*)'
-                ]
-                
-                for pattern in patterns:
-                    match = re.search(pattern, page_text, re.IGNORECASE)
+                for pattern in PAGE_PRICE_PATTERNS:
+                    match = pattern.search(page_text)
                     if match:
                         price_text = match.group(1).replace(",", ".")
                         if price_text.replace(".", "").isdigit():
@@ -609,6 +694,7 @@ class AmazonScraperV2:
     def extract_description(self):
         """Extrai a descrição do produto"""
         try:
+            page = self.current_page()
             description_selectors = [
                 "#feature-bullets ul",
                 ".a-unordered-list .a-list-item",
@@ -617,8 +703,8 @@ class AmazonScraperV2:
             
             for selector in description_selectors:
                 try:
-                    desc_element = self.driver.find_element(By.CSS_SELECTOR, selector)
-                    return desc_element.text.strip()
+                    desc_element = page.find_element(By.CSS_SELECTOR, selector)
+                    return page.text(desc_element).strip()
                 except NoSuchElementException:
                     continue
             
@@ -628,31 +714,37 @@ class AmazonScraperV2:
             self.logger.warning(f"Erro ao extrair descrição: {e}")
             return None
     
-    def extract_specifications(self):
-        """Extrai especificações do produto"""
+    def extract_main_image_url(self):
+        """Extrai a URL da imagem principal do produto"""
         try:
-            specs = {}
+            page = self.current_page()
+            for selector in MAIN_IMAGE_SELECTORS:
+                for element in page.find_elements(By.CSS_SELECTOR, selector):
+                    url = pick_main_image_url({name: page.attribute(element, name) for name in MAIN_IMAGE_ATTRIBUTES})
+                    if url:
+                        return url
+            return None
             
+        except Exception as e:
+            self.logger.warning(f"Erro ao extrair imagem principal: {e}")
+            return None
+    
+    def extract_specifications(self):
+        """Extrai a tabela de especificações do produto numa única ida ao navegador"""
+        try:
             # Procurar por tabela de especificações
             spec_selectors = [
                 "#productDetails_techSpec_section_1 tr",
+                "#productDetails_detailBullets_sections1 tr",
                 ".a-keyvalue tr",
                 "[data-feature-name='productDetails'] tr"
             ]
             
-            for selector in spec_selectors:
-                try:
-                    spec_rows = self.driver.find_elements(By.CSS_SELECTOR, selector)
-                    for row in spec_rows:
-                        cells = row.find_elements(By.TAG_NAME, "td")
-                        if len(cells) == 2:
-                            key = cells[0].text.strip()
-                            value = cells[1].text.strip()
-                            if key and value:
-                                specs[key] = value
-                    break
-                except NoSuchElementException:
-                    continue
+            pairs = self.driver.execute_script(SPEC_TABLE_SCRIPT, spec_selectors) or []
+            specs = {key: value for key, value in pairs}
+            
+            if self.debug:
+                self.logger.info(f"Especificações extraídas: {len(specs)} campos")
             
             return specs
             
@@ -663,6 +755,7 @@ class AmazonScraperV2:
     def extract_availability(self):
         """Extrai informações de disponibilidade"""
         try:
+            page = self.current_page()
             availability_selectors = [
                 "#availability span",
                 ".a-size-medium.a-color-success",
@@ -671,8 +764,8 @@ class AmazonScraperV2:
             
             for selector in availability_selectors:
                 try:
-                    avail_element = self.driver.find_element(By.CSS_SELECTOR, selector)
-                    return avail_element.text.strip()
+                    avail_element = page.find_element(By.CSS_SELECTOR, selector)
+                    return page.text(avail_element).strip()
                 except NoSuchElementException:
                     continue
             
@@ -685,6 +778,7 @@ class AmazonScraperV2:
     def extract_shipping_info(self):
         """Extrai informações de frete"""
         try:
+            page = self.current_page()
             shipping_selectors = [
                 "#delivery-block .a-size-base",
                 ".a-size-base.a-color-secondary"
@@ -692,8 +786,8 @@ class AmazonScraperV2:
             
             for selector in shipping_selectors:
                 try:
-                    shipping_element = self.driver.find_element(By.CSS_SELECTOR, selector)
-                    return shipping_element.text.strip()
+                    shipping_element = page.find_element(By.CSS_SELECTOR, selector)
+                    return page.text(shipping_element).strip()
                 except NoSuchElementException:
                     continue
             
@@ -705,67 +799,18 @@ class AmazonScraperV2:
     
     def is_valid_seller_name(self, text):
         """Valida se o texto é um nome de vendedor válido"""
-        if not text or text.strip() == "":
-            return False
-        
-        text = text.strip()
-        
-        if self.debug:
-            self.logger.info(f"Validando nome de vendedor: '{text}'")
-        
-        # Filtrar textos que claramente não são nomes de vendedores
-        invalid_keywords = [
-            'avaliação', 'review', 'rating', 'estrela', 'star',
-            'avaliações', 'reviews', 'disponível', 'available',
-            'preço', 'price', 'frete', 'shipping', 'entrega', 'delivery',
-            'mais vendidos', 'best sellers', 'escolha da amazon',
-            'amazon choice', 'patrocinado', 'sponsored',
-            'pesquisas relacionadas', 'related searches',
-            'anterior', 'próximo', 'next', 'previous',
-            'departamentos', 'departments', 'categoria', 'category',
-            'ver mais', 'see more', 'ver ofertas', 'see offers',
-            'produtos similares', 'similar products',
-            'outras opções', 'other options',
-            # Termos genéricos que não são nomes
-            'vendido por', 'enviado por', 'sold by', 'shipped by'
-        ]
-        
-        text_lower = text.lower()
-        for keyword in invalid_keywords:
-            if keyword in text_lower:
-                if self.debug:
-                    self.logger.info(f"Nome rejeitado por palavra-chave: '{keyword}'")
-                return False
-        
-        # Verificar se tem pelo menos 2 caracteres
-        if len(text) < 2:
-            if self.debug:
-                self.logger.info("Nome rejeitado por ser muito curto")
-            return False
-        
-        # Verificar se não é um número puro
-        try:
-            float(text.replace(',', '.'))
-            if self.debug:
-                self.logger.info("Nome rejeitado por ser apenas número")
-            return False
-        except ValueError:
-            pass
-        
-        # Verificar se não contém apenas caracteres especiais
-        if not any(c.isalnum() for c in text):
-            if self.debug:
-                self.logger.info("Nome rejeitado por não conter caracteres alfanuméricos")
-            return False
-        
-        # Verificar se não é muito longo (provavelmente não é nome de vendedor)
-        if len(text) > 100:
-            if self.debug:
-                self.logger.info("Nome rejeitado por ser muito longo")
+        if self.debug and text and text.strip():
+            self.logger.info(f"Validando nome de vendedor: '{text.strip()}'")
+        
+        # Regras e palavras-chave inválidas compartilhadas em padroes_texto
+        rejection = seller_name_rejection(text)
+        if rejection:
+            if self.debug and text and text.strip():
+                self.logger.info(rejection)
             return False
         
         if self.debug:
-            self.logger.info(f"Nome de vendedor válido: '{text}'")
+            self.logger.info(f"Nome de vendedor válido: '{text.strip()}'")
         
         return True
     
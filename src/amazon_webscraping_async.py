@@ -0,0 +1,658 @@
+"""
+Motor de scraping assíncrono da Amazon (asyncio)
+Alternativa ao AmazonScraperV2: mantém dezenas de requisições em andamento
+num único processo, sem um navegador por requisição
+"""
+import asyncio
+import json
+import logging
+import os
+import shutil
+import tempfile
+from datetime import datetime
+from urllib.parse import urljoin, urlparse, urlencode, parse_qsl, urlunparse
+
+import aiohttp
+import pandas as pd
+from bs4 import BeautifulSoup
+from padroes_texto import (
+    LISTING_SOLD_BY_PATTERN, LISTING_SHIPPED_SOLD_BY_PATTERN, DETAILED_SELLER_PATTERNS,
+    SELLER_NAME_CLEANUP_PATTERN, RATING_PATTERN, MAIN_IMAGE_SELECTORS, MAIN_IMAGE_ATTRIBUTES,
+    seller_name_rejection, parse_price_text, find_price_in_text, normalize_specifications, pick_main_image_url
+)
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+
+
+class ChromeDevToolsClient:
+    """
+    Cliente assíncrono do Chrome DevTools Protocol (CDP)
+
+    Usado apenas para páginas que precisam de JavaScript. Cada renderização
+    abre uma aba própria na mesma instância do Chrome e a fecha ao final,
+    inclusive quando a tarefa é cancelada.
+    """
+
+    def __init__(self, session, chrome_path=None, headless=True, logger=None):
+        self.session = session
+        self.chrome_path = chrome_path
+        self.headless = headless
+        self.logger = logger or logging.getLogger(__name__)
+        self.process = None
+        self.user_data_dir = None
+        self.ws = None
+        self.reader_task = None
+        self.next_id = 0
+        self.pending = {}
+        self.event_waiters = {}
+
+    async def start(self):
+        """Inicia o Chrome com depuração remota e conecta ao websocket do navegador"""
+        chrome_path = self.chrome_path or self.find_chrome()
+        if not chrome_path:
+            raise RuntimeError("Executável do Chrome não encontrado para renderização via CDP")
+
+        self.user_data_dir = tempfile.mkdtemp(prefix="cdp_profile_")
+        args = [
+            chrome_path,
+            "--remote-debugging-port=0",
+            f"--user-data-dir={self.user_data_dir}",
+            "--no-sandbox",
+            "--disable-dev-shm-usage",
+            "--disable-gpu",
+            "--window-size=1920,1080",
+            f"--user-agent={USER_AGENT}",
+            "about:blank"
+        ]
+        if self.headless:
+            args.insert(1, "--headless=new")
+
+        self.process = await asyncio.create_subprocess_exec(
+            *args, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL
+        )
+
+        # O Chrome grava a porta escolhida e o caminho do websocket neste arquivo
+        port_file = os.path.join(self.user_data_dir, "DevToolsActivePort")
+        for _ in range(100):
+            if os.path.exists(port_file):
+                with open(port_file, 'r') as f:
+                    lines = f.read().split()
+                if len(lines) >= 2:
+                    break
+            await asyncio.sleep(0.1)
+        else:
+            raise RuntimeError("Chrome não expôs a porta de depuração remota")
+
+        ws_url = f"ws://127.0.0.1:{lines[0]}{lines[1]}"
+        self.ws = await self.session.ws_connect(ws_url, max_msg_size=0)
+        self.reader_task = asyncio.create_task(self.read_messages())
+        self.logger.info(f"Chrome DevTools conectado em {ws_url}")
+
+    @staticmethod
+    def find_chrome():
+        """Procura o executável do Chrome/Chromium no PATH"""
+        for name in ["google-chrome", "google-chrome-stable", "chromium", "chromium-browser", "chrome"]:
+            path = shutil.which(name)
+            if path:
+                return path
+        return None
+
+    async def read_messages(self):
+        """Distribui respostas e eventos recebidos pelo websocket"""
+        try:
+            async for msg in self.ws:
+                if msg.type != aiohttp.WSMsgType.TEXT:
+                    continue
+                data = json.loads(msg.data)
+                if 'id' in data:
+                    future = self.pending.pop(data['id'], None)
+                    if future and not future.done():
+                        if 'error' in data:
+                            future.set_exception(RuntimeError(f"Erro CDP: {data['error']}"))
+                        else:
+                            future.set_result(data.get('result', {}))
+                else:
+                    key = (data.get('sessionId'), data.get('method'))
+                    for future in self.event_waiters.pop(key, []):
+                        if not future.done():
+                            future.set_result(data.get('params', {}))
+        finally:
+            for future in list(self.pending.values()):
+                if not future.done():
+                    future.set_exception(ConnectionError("Conexão CDP encerrada"))
+            self.pending.clear()
+
+    async def send(self, method, params=None, session_id=None):
+        """Envia um comando CDP e aguarda a resposta"""
+        self.next_id += 1
+        message = {'id': self.next_id, 'method': method, 'params': params or {}}
+        if session_id:
+            message['sessionId'] = session_id
+        future = asyncio.get_running_loop().create_future()
+        self.pending[self.next_id] = future
+        await self.ws.send_str(json.dumps(message))
+        return await future
+
+    def wait_event(self, method, session_id):
+        """Registra a espera por um evento antes do comando que o dispara"""
+        future = asyncio.get_running_loop().create_future()
+        self.event_waiters.setdefault((session_id, method), []).append(future)
+        return future
+
+    def discard_event(self, method, session_id, future):
+        """Remove a espera de wait_event cujo evento não chegou (timeout ou erro)"""
+        waiters = self.event_waiters.get((session_id, method), [])
+        if future in waiters:
+            waiters.remove(future)
+            if not waiters:
+                del self.event_waiters[(session_id, method)]
+        future.cancel()
+
+    async def render(self, url, timeout=30):
+        """Abre a URL numa aba nova e retorna o HTML após o evento de load"""
+        target = await self.send("Target.createTarget", {"url": "about:blank"})
+        target_id = target['targetId']
+        session_id = loaded = None
+        try:
+            attached = await self.send("Target.attachToTarget", {"targetId": target_id, "flatten": True})
+            session_id = attached['sessionId']
+            await self.send("Page.enable", session_id=session_id)
+
+            loaded = self.wait_event("Page.loadEventFired", session_id)
+            await self.send("Page.navigate", {"url": url}, session_id=session_id)
+            await asyncio.wait_for(loaded, timeout)
+
+            result = await self.send(
+                "Runtime.evaluate",
+                {"expression": "document.documentElement.outerHTML", "returnByValue": True},
+                session_id=session_id
+            )
+            return result.get('result', {}).get('value', '')
+        finally:
+            # Sem o evento de load a espera ficaria registrada para sempre
+            if loaded is not None:
+                self.discard_event("Page.loadEventFired", session_id, loaded)
+            # Fechar a aba mesmo se a tarefa foi cancelada no meio do carregamento
+            try:
+                await asyncio.shield(self.send("Target.closeTarget", {"targetId": target_id}))
+            except Exception:
+                pass
+
+    async def close(self):
+        """Encerra a conexão e o processo do Chrome"""
+        if self.reader_task:
+            self.reader_task.cancel()
+        if self.ws is not None:
+            await self.ws.close()
+        if self.process and self.process.returncode is None:
+            self.process.terminate()
+            await self.process.wait()
+        if self.user_data_dir:
+            shutil.rmtree(self.user_data_dir, ignore_errors=True)
+
+
+class AsyncAmazonScraper:
+    def __init__(self, max_concurrency=20, per_host_limit=4, request_timeout=20,
+                 use_browser=False, chrome_path=None, headless=True, debug=False):
+        """
+        Inicializa o scraper assíncrono da Amazon
+
+        max_concurrency: total de requisições simultâneas
+        per_host_limit: requisições simultâneas por host
+        request_timeout: tempo máximo (s) de cada página, incluindo renderização
+        use_browser: renderiza via Chrome DevTools quando o HTML estático não basta
+        """
+        self.debug = debug
+        self.setup_logging()
+        self.max_concurrency = max_concurrency
+        self.per_host_limit = per_host_limit
+        self.request_timeout = request_timeout
+        self.use_browser = use_browser
+        self.chrome_path = chrome_path
+        self.headless = headless
+        self.session = None
+        self.browser = None
+        self.global_limit = None
+        self.host_limits = {}
+
+    def setup_logging(self):
+        """Configura o sistema de logging"""
+        logging.basicConfig(
+            level=logging.INFO,
+            format='%(asctime)s - %(levelname)s - %(message)s',
+            handlers=[
+                logging.FileHandler('logs/amazon_scraper_async.log'),
+                logging.StreamHandler()
+            ]
+        )
+        self.logger = logging.getLogger(__name__)
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def start(self):
+        """Abre a sessão HTTP e, se configurado, o navegador via CDP"""
+        self.global_limit = asyncio.Semaphore(self.max_concurrency)
+        connector = aiohttp.TCPConnector(limit=self.max_concurrency, limit_per_host=self.per_host_limit)
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            headers={
+                "User-Agent": USER_AGENT,
+                "Accept-Language": "pt-BR,pt;q=0.9,en;q=0.8",
+                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8"
+            }
+        )
+        if self.use_browser:
+            self.browser = ChromeDevToolsClient(self.session, self.chrome_path, self.headless, self.logger)
+            try:
+                await self.browser.start()
+            except Exception as e:
+                self.logger.warning(f"Renderização via CDP indisponível, usando apenas HTTP: {e}")
+                self.browser = None
+        self.logger.info("Scraper assíncrono iniciado")
+
+    def host_limit(self, url):
+        """Semáforo de concorrência do host da URL"""
+        host = urlparse(url).netloc
+        if host not in self.host_limits:
+            self.host_limits[host] = asyncio.Semaphore(self.per_host_limit)
+        return self.host_limits[host]
+
+    async def fetch_html(self, url, needs_js=None):
+        """
+        Baixa o HTML da URL respeitando os limites global e por host
+
+        Usa HTTP puro e recorre ao navegador quando needs_js(html) indica que a
+        página depende de JavaScript. Cancelamentos são propagados sem engolir.
+        """
+        async with self.global_limit, self.host_limit(url):
+            try:
+                async with self.session.get(url, timeout=aiohttp.ClientTimeout(total=self.request_timeout)) as response:
+                    html = await response.text()
+                    status = response.status
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.warning(f"Erro HTTP em {url}: {e}")
+                html, status = "", None
+
+            if self.browser and (status != 200 or (needs_js and needs_js(html))):
+                if self.debug:
+                    self.logger.info(f"Renderizando via CDP: {url}")
+                try:
+                    html = await asyncio.wait_for(self.browser.render(url, self.request_timeout), self.request_timeout)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self.logger.warning(f"Erro ao renderizar {url}: {e}")
+
+            return html
+
+    @staticmethod
+    def listing_needs_js(html):
+        """A busca precisa de JS quando o HTML estático não traz produtos"""
+        return 'data-asin' not in html
+
+    @staticmethod
+    def product_needs_js(html):
+        """A página do produto precisa de JS quando falta o bloco de preço/vendedor"""
+        return 'corePrice_feature_div' not in html and 'merchant-info' not in html
+
+    @staticmethod
+    def page_url(search_url, page):
+        """Monta a URL da página N da busca"""
+        parts = urlparse(search_url)
+        query = dict(parse_qsl(parts.query))
+        if page > 1:
+            query['page'] = str(page)
+        return urlunparse(parts._replace(query=urlencode(query)))
+
+    async def scrape_product_listing(self, search_url, max_pages=3):
+        """
+        Extrai a listagem de produtos das páginas de busca (em paralelo)
+        """
+        self.logger.info(f"Iniciando scraping assíncrono da listagem: {search_url}")
+
+        pages = await asyncio.gather(
+            *[self.fetch_html(self.page_url(search_url, page), self.listing_needs_js) for page in range(1, max_pages + 1)],
+            return_exceptions=True
+        )
+
+        products = []
+        seen = set()
+        for page_number, html in enumerate(pages, 1):
+            if isinstance(html, BaseException):
+                if isinstance(html, asyncio.CancelledError):
+                    raise html
+                self.logger.warning(f"Erro na página {page_number}: {html}")
+                continue
+
+            soup = BeautifulSoup(html, 'html.parser')
+            for element in soup.select("[data-asin]"):
+                asin = element.get("data-asin", "").strip()
+                if not asin or asin in seen:
+                    continue
+                product_data = self.extract_basic_product_info(element, search_url)
+                if product_data:
+                    seen.add(asin)
+                    products.append(product_data)
+
+        self.logger.info(f"Coletados {len(products)} produtos da listagem")
+        return products
+
+    def extract_basic_product_info(self, element, base_url):
+        """Extrai as informações básicas de um produto da listagem (mesmo esquema do V2)"""
+        try:
+            title = None
+            for selector in ["h2 a span", "h2 span", "h2 a", ".s-size-mini .s-link-style .s-color-base", "h2 .a-link-normal .a-text-normal"]:
+                node = element.select_one(selector)
+                if node and len(node.get_text(strip=True)) > 3:
+                    title = node.get_text(strip=True)
+                    break
+            if not title:
+                return None
+
+            url = None
+            for selector in ["h2 a", "a[href*='/dp/']", "a[href*='/product/']", ".s-link-style a", "a[data-csa-c-content-id]"]:
+                node = element.select_one(selector)
+                if node and node.get("href"):
+                    href = urljoin(base_url, node["href"])
+                    if selector == "h2 a" or "/dp/" in href:
+                        url = href
+                        break
+
+            rating = None
+            node = element.select_one(".a-icon-alt")
+            if node:
+                match = RATING_PATTERN.search(node.get_text())
+                if match:
+                    rating = float(match.group(1).replace(",", "."))
+
+            review_count = None
+            node = element.select_one("a[href*='reviews'] span")
+            if node:
+                review_text = node.get_text(strip=True).replace(".", "").replace(",", "")
+                if review_text.isdigit():
+                    review_count = int(review_text)
+
+            return {
+                'asin': element.get("data-asin"),
+                'title': title,
+                'url': url,
+                'price': self.parse_price(element, [".a-price-whole", ".a-price .a-offscreen", ".a-price-range .a-offscreen"]),
+                'rating': rating,
+                'review_count': review_count,
+                'seller': self.extract_seller_from_text(element.get_text("\n", strip=True)),
+                'scraped_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            }
+        except Exception as e:
+            self.logger.warning(f"Erro ao extrair informações básicas: {e}")
+            return None
+
+    @staticmethod
+    def parse_price(root, selectors):
+        """Converte o primeiro preço válido encontrado nos seletores"""
+        for selector in selectors:
+            node = root.select_one(selector)
+            if node:
+                price_value = parse_price_text(node.get_text(strip=True))
+                if price_value is not None:
+                    return price_value
+        return None
+
+    def extract_seller_from_text(self, text):
+        """Extrai o vendedor do texto de um card da listagem"""
+        match = LISTING_SOLD_BY_PATTERN.search(text)
+        if match and self.is_valid_seller_name(match.group(1).strip()):
+            return match.group(1).strip()
+
+        match = LISTING_SHIPPED_SOLD_BY_PATTERN.search(text)
+        if match and self.is_valid_seller_name(match.group(2).strip()):
+            return match.group(2).strip()
+
+        if "Amazon.com.br" in text or "Vendido por Amazon" in text:
+            return "Amazon.com.br"
+        return ""
+
+    async def scrape_product_details(self, product_url):
+        """
+        Baixa a página do produto e extrai os mesmos campos detalhados do V2
+        """
+        try:
+            html = await self.fetch_html(product_url, self.product_needs_js)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.logger.error(f"Erro ao acessar página do produto: {e}")
+            return {}
+
+        if not html:
+            return {}
+
+        soup = BeautifulSoup(html, 'html.parser')
+        body = soup.body or soup
+        page_text = body.get_text("\n", strip=True)
+        specifications = self.extract_specifications(soup)
+
+        return {
+            'seller_detailed': self.extract_detailed_seller(soup, page_text),
+            'price_detailed': self.extract_detailed_price(soup, page_text),
+            'description': self.select_text(soup, ["#feature-bullets ul", ".a-unordered-list .a-list-item", "[data-feature-name='featureList']"]),
+            'specifications': specifications,
+            'availability': self.select_text(soup, ["#availability span", ".a-size-medium.a-color-success", ".a-size-medium.a-color-price"]),
+            'shipping_info': self.select_text(soup, ["#delivery-block .a-size-base", ".a-size-base.a-color-secondary"]),
+            'image_url': self.extract_main_image_url(soup),
+            **normalize_specifications(specifications)
+        }
+
+    @staticmethod
+    def select_text(soup, selectors):
+        """Texto do primeiro seletor encontrado"""
+        for selector in selectors:
+            node = soup.select_one(selector)
+            if node:
+                return node.get_text("\n", strip=True)
+        return None
+
+    def extract_detailed_seller(self, soup, page_text):
+        """Extrai o vendedor da página do produto (mesma ordem de prioridade do V2)"""
+        amazon_selectors = [
+            "#merchant-info a[href*='amazon.com.br']",
+            "#merchant-info a[href*='amazon.com']",
+            "#sellerProfileTriggerId[href*='amazon']",
+            ".tabular-buybox-text a[href*='amazon']",
+            "#shipsFromSoldByMessage_feature_div a[href*='amazon']",
+            "[data-cel-widget='desktop-merchant-info'] a[href*='amazon']"
+        ]
+        for selector in amazon_selectors:
+            if soup.select_one(selector):
+                return "Amazon.com.br"
+
+        for selector in ["#merchantInfoFeature_feature_div > div:nth-of-type(2)", "#fulfillerInfoFeature_feature_div > div:nth-of-type(2)"]:
+            node = soup.select_one(selector)
+            if node:
+                merchant_text = node.get_text(" ", strip=True)
+                if self.is_valid_seller_name(merchant_text):
+                    return merchant_text
+
+        seller_selectors = [
+            "#sellerProfileTriggerId",
+            "#merchant-info a",
+            "#shipsFromSoldByMessage_feature_div a",
+            ".tabular-buybox-text a",
+            "[data-cel-widget='desktop-merchant-info'] a",
+            "a[href*='seller']",
+            "a[href*='merchant']",
+            "a[href*='storefront']"
+        ]
+        for selector in seller_selectors:
+            for node in soup.select(selector):
+                href = node.get("href") or ""
+                if "amazon" in href.lower():
+                    continue
+                seller_text = node.get_text(" ", strip=True)
+                if self.is_valid_seller_name(seller_text):
+                    return seller_text
+
+        for pattern in DETAILED_SELLER_PATTERNS:
+            match = pattern.search(page_text)
+            if match:
+                seller_name = match.group(len(match.groups())).strip()
+                seller_name = SELLER_NAME_CLEANUP_PATTERN.sub('', seller_name).strip()
+                if self.is_valid_seller_name(seller_name):
+                    return seller_name
+
+        if "Amazon" in page_text:
+            return "Amazon.com.br"
+        return ""
+
+    def extract_detailed_price(self, soup, page_text):
+        """Extrai o preço da página do produto"""
+        price = self.parse_price(soup, [
+            "#corePrice_feature_div > div > div > div > div > span:nth-of-type(1) > span:nth-of-type(1)",
+            "#corePrice_feature_div .a-price-whole",
+            "#corePrice_feature_div .a-offscreen",
+            ".a-price-whole",
+            ".a-price .a-offscreen",
+            ".a-price-range .a-offscreen",
+            "#apex_desktop .a-price-whole",
+            "#apex_desktop .a-offscreen"
+        ])
+        if price is not None:
+            return price
+        return find_price_in_text(page_text)
+
+    @staticmethod
+    def extract_main_image_url(soup):
+        """Extrai a URL da imagem principal (mesmos seletores do V2)"""
+        for selector in MAIN_IMAGE_SELECTORS:
+            for node in soup.select(selector):
+                url = pick_main_image_url({name: node.get(name) for name in MAIN_IMAGE_ATTRIBUTES})
+                if url:
+                    return url
+        return None
+
+    def extract_specifications(self, soup):
+        """Extrai a tabela de especificações (mesmas regras do SPEC_TABLE_SCRIPT do V2)"""
+        for selector in ["#productDetails_techSpec_section_1 tr", "#productDetails_detailBullets_sections1 tr", ".a-keyvalue tr", "[data-feature-name='productDetails'] tr"]:
+            specs = {}
+            for row in soup.select(selector):
+                cells = row.find_all(["th", "td"], recursive=False)
+                if len(cells) == 2:
+                    key = cells[0].get_text(" ", strip=True)
+                    value = cells[1].get_text(" ", strip=True)
+                    if key and value:
+                        specs[key] = value
+            if specs:
+                return specs
+        return {}
+
+    def is_valid_seller_name(self, text):
+        """Valida se o texto é um nome de vendedor válido (mesmas regras do V2)"""
+        return seller_name_rejection(text) is None
+
+    async def scrape_complete_products(self, search_url, max_pages=3):
+        """
+        Scraping completo: listagem + detalhes de todos os produtos em paralelo
+        """
+        products = await self.scrape_product_listing(search_url, max_pages)
+
+        async def with_details(product):
+            if not product['url']:
+                return product
+            details = await self.scrape_product_details(product['url'])
+            return {**product, **details}
+
+        results = await asyncio.gather(*[with_details(p) for p in products], return_exceptions=True)
+
+        complete_products = []
+        for product, result in zip(products, results):
+            if isinstance(result, asyncio.CancelledError):
+                raise result
+            if isinstance(result, BaseException):
+                self.logger.warning(f"Erro ao detalhar produto {product['asin']}: {result}")
+                result = product
+            if self.has_seller(result):
+                complete_products.append(result)
+            elif self.debug:
+                self.logger.info(f"Produto sem vendedor filtrado: {result.get('title', 'N/A')[:50]}")
+
+        self.logger.info(f"Scraping assíncrono concluído: {len(complete_products)}/{len(products)} produtos com vendedor")
+        return complete_products
+
+    async def scrape_search_terms(self, search_terms, max_pages=3):
+        """Executa o scraping completo de vários termos de busca ao mesmo tempo"""
+        urls = [f"https://www.amazon.com.br/s?k={term.replace(' ', '+')}" for term in search_terms]
+        results = await asyncio.gather(*[self.scrape_complete_products(url, max_pages) for url in urls], return_exceptions=True)
+
+        all_products = []
+        for term, result in zip(search_terms, results):
+            if isinstance(result, asyncio.CancelledError):
+                raise result
+            if isinstance(result, BaseException):
+                self.logger.error(f"Erro ao buscar '{term}': {result}")
+                continue
+            self.logger.info(f"Encontrados {len(result)} produtos para '{term}'")
+            all_products.extend(result)
+        return all_products
+
+    @staticmethod
+    def has_seller(product):
+        """Mesmo critério de vendedor válido usado pelo V2"""
+        for field in ['seller_detailed', 'seller']:
+            value = product.get(field)
+            if value and str(value).strip() and str(value).lower() not in ['nan', 'none', 'null', '']:
+                return True
+        return False
+
+    def save_to_csv(self, products, filename="resultados/produtos_amazon_async.csv"):
+        """Salva os produtos em CSV"""
+        if not products:
+            self.logger.warning("Nenhum produto para salvar")
+            return
+        pd.DataFrame(products).to_csv(filename, index=False, encoding='utf-8')
+        self.logger.info(f"Produtos salvos em {filename}")
+
+    async def close(self):
+        """Fecha o navegador e a sessão HTTP"""
+        if self.browser:
+            await self.browser.close()
+            self.browser = None
+        if self.session:
+            await self.session.close()
+            self.session = None
+        self.logger.info("Scraper assíncrono fechado")
+
+
+async def run_scraper(search_terms, max_pages=2, **kwargs):
+    """Executa o scraper assíncrono para uma lista de termos"""
+    async with AsyncAmazonScraper(**kwargs) as scraper:
+        return await scraper.scrape_search_terms(search_terms, max_pages)
+
+
+def main():
+    """Função principal para testar o scraper assíncrono"""
+    search_terms = ["cartucho HP 667", "cartucho HP 667XL", "cartucho HP 664", "cartucho HP 662"]
+
+    try:
+        products = asyncio.run(run_scraper(search_terms, max_pages=2, use_browser=True, debug=True))
+
+        if products:
+            pd.DataFrame(products).to_csv("resultados/produtos_amazon_async.csv", index=False, encoding='utf-8')
+            print(f"\n=== RESULTADOS DO SCRAPING ASSÍNCRONO ===")
+            print(f"Total de produtos: {len(products)}")
+            for i, product in enumerate(products[:5]):
+                print(f"\n--- Produto {i+1} ---")
+                print(f"Título: {product.get('title', 'N/A')}")
+                print(f"Preço: R$ {product.get('price', 'N/A')}")
+                print(f"Vendedor (detalhado): {product.get('seller_detailed', 'N/A')}")
+
+    except Exception as e:
+        print(f"Erro durante o scraping: {e}")
+
+if __name__ == "__main__":
+    main()
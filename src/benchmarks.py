@@ -0,0 +1,270 @@
+"""
+Microbenchmarks de desempenho do sistema
+Comparam a implementação anterior com a atual sobre dados gravados em data/
+"""
+import re
+import sys
+import timeit
+import pandas as pd
+from padroes_texto import (
+    INVALID_SELLER_KEYWORDS, DETAILED_SELLER_PATTERNS, PAGE_PRICE_PATTERNS,
+    SELLER_NAME_CLEANUP_PATTERN, seller_name_rejection
+)
+
+DATASET = 'data/base_dados.csv'
+
+
+def load_recorded_pages(path=DATASET):
+    """
+    Monta textos de página a partir dos produtos gravados em base_dados.csv
+    (título, descrição, preço e vendedor no formato exibido pela Amazon)
+    """
+    df = pd.read_csv(path)
+    pages = []
+    for _, row in df.iterrows():
+        pages.append(
+            f"{row['title']}\n"
+            f"R$ {str(row['price']).replace('.', ',')}\n"
+            f"{row['description']}\n"
+            f"Enviado por Amazon / Vendido por {row['seller']}\n"
+        )
+    return df, pages
+
+
+def report(name, before, after, items):
+    """Imprime o tempo antes/depois e o ganho"""
+    print(f"{name}:")
+    print(f"  antes:  {before * 1e6 / items:8.2f} µs/item")
+    print(f"  depois: {after * 1e6 / items:8.2f} µs/item")
+    print(f"  ganho:  {before / after:8.2f}x")
+
+
+def timed(func, repeat=5, number=20):
+    """Melhor tempo (s) de uma execução de func"""
+    return min(timeit.repeat(func, repeat=repeat, number=number)) / number
+
+
+def legacy_is_valid_seller_name(text):
+    """is_valid_seller_name original (varredura linear das palavras-chave, sem logs)"""
+    if not text or text.strip() == "":
+        return False
+    text = text.strip()
+    text_lower = text.lower()
+    for keyword in INVALID_SELLER_KEYWORDS:
+        if keyword in text_lower:
+            return False
+    if len(text) < 2:
+        return False
+    try:
+        float(text.replace(',', '.'))
+        return False
+    except ValueError:
+        pass
+    if not any(c.isalnum() for c in text):
+        return False
+    if len(text) > 100:
+        return False
+    return True
+
+
+def legacy_find_seller(page_text):
+    """Busca de vendedor do extract_detailed_seller original (regex compilada a cada chamada)"""
+    patterns = [
+        r'Vendido por\s+([^\n\r,]+?)(?:\s*$|\s*\(|\s*\|)',
+        r'Enviado por\s+([^/]+?)\s*/\s*Vendido por\s+([^\n\r,]+?)(?:\s*$|\s*\(|\s*\|)',
+        r'Sold by\s+([^\n\r,]+?)(?:\s*$|\s*\(|\s*\|)',
+        r'Shipped by\s+([^/]+?)\s*/\s*Sold by\s+([^\n\r,]+?)(?:\s*$|\s*\(|\s*\|)',
+        r'Vendedor:\s*([^\n\r,]+?)(?:\s*$|\s*\(|\s*\|)',
+        r'Seller:\s*([^\n\r,]+?)(?:\s*$|\s*\(|\s*\|)'
+    ]
+    found = []
+    for pattern in patterns:
+        match = re.search(pattern, page_text, re.IGNORECASE | re.MULTILINE)
+        if match:
+            found.append(re.sub(r'[^\w\s\-\.]', '', match.group(len(match.groups()))).strip())
+    return found
+
+
+def legacy_find_price(page_text):
+    """Busca de preço do extract_detailed_price original"""
+    for pattern in [r'R\$\s*(\d+[,.]?\d*)', r'(\d+[,.]?\d*)\s*reais', r'Preço:\s*R\$\s*(\d+[,.]?\d*)', r'Valor:\s*R\$\s*(\d+[,.]?\d*)']:
+        match = re.search(pattern, page_text, re.IGNORECASE)
+        if match:
+            return match.group(1)
+    return None
+
+
+def benchmark_padroes_texto():
+    """Padrões pré-compilados e autômato de palavras-chave vs. implementação original"""
+    print("=== PADRÕES DE TEXTO (scraper) ===")
+    df, pages = load_recorded_pages()
+
+    # Candidatos a nome de vendedor: vendedores gravados + linhas curtas das páginas
+    candidates = list(df['seller'].astype(str))
+    for page in pages:
+        candidates.extend(line for line in page.split('\n') if 0 < len(line) <= 100)
+
+    assert [legacy_is_valid_seller_name(c) for c in candidates] == [seller_name_rejection(c) is None for c in candidates]
+    before = timed(lambda: [legacy_is_valid_seller_name(c) for c in candidates])
+    after = timed(lambda: [seller_name_rejection(c) for c in candidates])
+    report(f"Validação de nome de vendedor ({len(candidates)} candidatos)", before, after, len(candidates))
+
+    def current_find_seller(page_text):
+        found = []
+        for pattern in DETAILED_SELLER_PATTERNS:
+            match = pattern.search(page_text)
+            if match:
+                found.append(SELLER_NAME_CLEANUP_PATTERN.sub('', match.group(len(match.groups()))).strip())
+        return found
+
+    assert [legacy_find_seller(p) for p in pages] == [current_find_seller(p) for p in pages]
+    before = timed(lambda: [legacy_find_seller(p) for p in pages])
+    after = timed(lambda: [current_find_seller(p) for p in pages])
+    report(f"Regex de vendedor no texto da página ({len(pages)} páginas)", before, after, len(pages))
+
+    def current_find_price(page_text):
+        for pattern in PAGE_PRICE_PATTERNS:
+            match = pattern.search(page_text)
+            if match:
+                return match.group(1)
+        return None
+
+    assert [legacy_find_price(p) for p in pages] == [current_find_price(p) for p in pages]
+    before = timed(lambda: [legacy_find_price(p) for p in pages])
+    after = timed(lambda: [current_find_price(p) for p in pages])
+    report(f"Regex de preço no texto da página ({len(pages)} páginas)", before, after, len(pages))
+
+
+def benchmark_features(copies=20):
+    """Features colunares vs. create_features aplicado linha a linha"""
+    print("=== FEATURES DO CLASSIFICADOR ===")
+    from classificador_ia import PiracyDetectionClassifier
+    df = pd.concat([pd.read_csv(DATASET)] * copies, ignore_index=True)
+    classifier = PiracyDetectionClassifier()
+
+    def legacy_features():
+        features = df.apply(classifier.create_features, axis=1)
+        X_text = df.apply(lambda row: f"{row.get('title', '')} {row.get('description', '')} {row.get('seller', '')}", axis=1)
+        return X_text, pd.DataFrame([f for f in features])
+
+    def current_features():
+        X_text = classifier.build_text(df)
+        return X_text, classifier.create_feature_frame(df, X_text)
+
+    legacy_text, legacy_numeric = legacy_features()
+    current_text, current_numeric = current_features()
+    assert legacy_text.tolist() == current_text.tolist()
+    pd.testing.assert_frame_equal(legacy_numeric, current_numeric)
+
+    before = timed(legacy_features, repeat=3, number=1)
+    after = timed(current_features, repeat=3, number=1)
+    report(f"Features de {len(df)} produtos", before, after, len(df))
+    print(f"  linhas/s: {len(df) / before:,.0f} -> {len(df) / after:,.0f}")
+
+
+def benchmark_palavras_chave(copies=20):
+    """Grupos de palavras-chave numa mesma busca vs. uma varredura por lista e por texto"""
+    print("=== GRUPOS DE PALAVRAS-CHAVE ===")
+    from classificador_ia import SUSPICIOUS_WORDS, ORIGINAL_WORDS, TEXT_KEYWORD_GROUPS
+    from padroes_texto import normalize_text
+    df = pd.concat([pd.read_csv(DATASET)] * copies, ignore_index=True)
+    texts = [f"{title} {description} {seller}" for title, description, seller in zip(df['title'], df['description'], df['seller'])]
+
+    def legacy_counts(texts, suspicious_words=SUSPICIOUS_WORDS, original_words=ORIGINAL_WORDS):
+        suspicious = [sum(1 for word in suspicious_words if word in text.lower()) for text in texts]
+        original = [sum(1 for word in original_words if word in text.lower()) for text in texts]
+        return suspicious, original
+
+    # Sem acentos nos textos e nas palavras, a busca agrupada conta o mesmo que a varredura original
+    plain_texts = [normalize_text(text) for text in texts]
+    plain_words = [list(dict.fromkeys(normalize_text(word) for word in words)) for words in (SUSPICIOUS_WORDS, ORIGINAL_WORDS)]
+    counts = TEXT_KEYWORD_GROUPS.count(plain_texts)
+    assert legacy_counts(plain_texts, *plain_words) == (
+        counts['has_suspicious_words'].tolist(), counts['has_original_words'].tolist()
+    )
+
+    before = timed(lambda: legacy_counts(texts), repeat=3, number=1)
+    after = timed(lambda: TEXT_KEYWORD_GROUPS.count(texts), repeat=3, number=1)
+    report(f"Contagem de palavras suspeitas/originais ({len(texts)} textos, sem distinção de acentos)", before, after, len(texts))
+
+
+def benchmark_floresta(sizes=(1, 100, 100000)):
+    """Floresta achatada em NumPy (uma chamada) vs. predict + predict_proba do scikit-learn"""
+    print("=== AVALIAÇÃO DA FLORESTA ===")
+    import logging
+    import numpy as np
+    import scipy.sparse as sp
+    from classificador_ia import PiracyDetectionClassifier
+    logging.disable(logging.INFO)
+    df = pd.read_csv(DATASET)
+    classifier = PiracyDetectionClassifier()
+    classifier.treinar_modelo(df)
+    X_text = classifier.build_text(df)
+    X = classifier.combine_features(classifier.vectorizer.transform(X_text), classifier.create_feature_frame(df, X_text))
+    model, predictor = classifier.model, classifier.predictor
+
+    def legacy_predict(X_batch):
+        return model.predict(X_batch), model.predict_proba(X_batch)
+
+    def current_predict(X_batch):
+        probabilities = predictor.predict_proba(X_batch)
+        return predictor.classes_.take(np.argmax(probabilities, axis=1), axis=0), probabilities
+
+    for size in sizes:
+        X_batch = sp.vstack([X] * (size // X.shape[0] + 1), format='csr')[:size]
+        legacy_labels, legacy_proba = legacy_predict(X_batch)
+        current_labels, current_proba = current_predict(X_batch)
+        assert (legacy_labels == current_labels).all() and np.array_equal(legacy_proba, current_proba)
+        repeat, number = (3, 1) if size >= 10000 else (5, 20)
+        before = timed(lambda: legacy_predict(X_batch), repeat=repeat, number=number)
+        after = timed(lambda: current_predict(X_batch), repeat=repeat, number=number)
+        report(f"Lote de {size} produtos ({len(model.estimators_)} árvores)", before, after, size)
+    logging.disable(logging.NOTSET)
+
+
+def benchmark_cascata(copies=200):
+    """Cascata (regras decidem os casos claros) vs. modelo em todos os produtos"""
+    print("=== PREDIÇÃO EM CASCATA ===")
+    import logging
+    from classificador_ia import PiracyDetectionClassifier
+    logging.disable(logging.INFO)
+    base = pd.read_csv(DATASET)
+    classifier = PiracyDetectionClassifier()
+    classifier.treinar_modelo(base)
+    df = pd.concat([base] * copies, ignore_index=True)
+    labels = classifier.label_products(df)
+
+    full = classifier.prever(df.copy())
+    cascade = classifier.prever_cascata(df.copy())
+    stats = classifier.cascade_stats
+    # Nas linhas enviadas ao modelo a cascata reproduz prever exatamente
+    model_rows = cascade['ai_source'] == 'modelo'
+    assert full.loc[model_rows, 'ai_prediction'].tolist() == cascade.loc[model_rows, 'ai_prediction'].tolist()
+    assert full.loc[model_rows, 'ai_probabilities'].tolist() == cascade.loc[model_rows, 'ai_probabilities'].tolist()
+    before = timed(lambda: classifier.prever(df.copy()), repeat=3, number=1)
+    after = timed(lambda: classifier.prever_cascata(df.copy()), repeat=3, number=1)
+    report(f"Predição de {len(df)} produtos", before, after, len(df))
+    print(f"  enviados ao modelo: {stats['sent_to_model']}/{stats['total']} ({stats['model_share']:.1%})")
+    print(f"  concordância com os rótulos heurísticos: {(full['ai_prediction'] == labels).mean():.3f} -> "
+          f"{(cascade['ai_prediction'] == labels).mean():.3f}")
+    logging.disable(logging.NOTSET)
+
+
+BENCHMARKS = {
+    'padroes_texto': benchmark_padroes_texto,
+    'features': benchmark_features,
+    'palavras_chave': benchmark_palavras_chave,
+    'floresta': benchmark_floresta,
+    'cascata': benchmark_cascata,
+}
+
+
+def main():
+    """Executa os benchmarks informados na linha de comando (ou todos)"""
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        BENCHMARKS[name]()
+        print()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Cache persistente de predições
+Guarda ai_prediction, ai_confidence e ai_probabilities num SQLite, com chave
+igual ao hash da versão do modelo e dos campos de entrada do classificador.
+Execuções repetidas só pontuam os anúncios que mudaram; quando o cache passa
+de max_entries, as entradas usadas há mais tempo são descartadas (LRU)
+"""
+import hashlib
+import json
+import time
+from persistencia import SQLiteStore
+
+# Campos lidos pelo classificador (texto e features numéricas)
+KEY_FIELDS = ['title', 'description', 'seller', 'price', 'suggested_price']
+
+# Limite de parâmetros por consulta (o SQLite aceita no mínimo 999)
+QUERY_CHUNK_SIZE = 500
+
+
+def prediction_keys(model_version, columns):
+    """
+    Chave de cada linha: hash da versão do modelo e dos campos de entrada
+    (columns: uma lista de textos por campo, na ordem de KEY_FIELDS, seguida
+    da confiança do vendedor quando a reputação dos vendedores está ativa)
+    """
+    prefix = f"{model_version}\x1e"
+    return [
+        hashlib.blake2b((prefix + '\x1f'.join(values)).encode('utf-8'), digest_size=16).hexdigest()
+        for values in zip(*columns)
+    ]
+
+
+class PredictionCache(SQLiteStore):
+    """Predições por chave em SQLite, com descarte LRU acima de max_entries"""
+
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS predictions ("
+        "key TEXT PRIMARY KEY, prediction TEXT, confidence REAL, probabilities TEXT, last_used REAL)",
+        "CREATE INDEX IF NOT EXISTS predictions_last_used ON predictions (last_used)"
+    )
+
+    def __init__(self, cache_file="resultados/cache_predicoes.sqlite", max_entries=200000):
+        super().__init__(cache_file)
+        self.cache_file = cache_file
+        self.max_entries = max_entries
+
+    def get_many(self, keys):
+        """Predições em cache: {chave: (predição, confiança, probabilidades)}"""
+        found = {}
+        unique_keys = list(dict.fromkeys(keys))
+        with self.connection as connection:
+            for start in range(0, len(unique_keys), QUERY_CHUNK_SIZE):
+                chunk = unique_keys[start:start + QUERY_CHUNK_SIZE]
+                placeholders = ','.join('?' * len(chunk))
+                rows = connection.execute(
+                    f"SELECT key, prediction, confidence, probabilities FROM predictions WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+                for key, prediction, confidence, probabilities in rows:
+                    found[key] = (prediction, confidence, json.loads(probabilities))
+                if rows:
+                    connection.execute(
+                        f"UPDATE predictions SET last_used = ? WHERE key IN ({','.join('?' * len(rows))})",
+                        [time.time()] + [row[0] for row in rows]
+                    )
+        return found
+
+    def put_many(self, keys, predictions, confidences, probabilities):
+        """Grava predições novas e descarta as menos usadas acima do limite"""
+        now = time.time()
+        with self.connection as connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO predictions VALUES (?, ?, ?, ?, ?)",
+                [
+                    (key, str(prediction), float(confidence), json.dumps(list(row_probabilities)), now)
+                    for key, prediction, confidence, row_probabilities in zip(keys, predictions, confidences, probabilities)
+                ]
+            )
+            excess = connection.execute("SELECT COUNT(*) FROM predictions").fetchone()[0] - self.max_entries
+            if excess > 0:
+                connection.execute(
+                    "DELETE FROM predictions WHERE key IN (SELECT key FROM predictions ORDER BY last_used LIMIT ?)", (excess,)
+                )
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM predictions").fetchone()[0]
+
+    def clear(self):
+        """Remove todas as predições"""
+        with self.connection as connection:
+            connection.execute("DELETE FROM predictions")
@@ -1,28 +1,191 @@
 import pandas as pd
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import TfidfVectorizer, HashingVectorizer
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.linear_model import LogisticRegression
+from sklearn.linear_model import LogisticRegression, SGDClassifier
 from sklearn.naive_bayes import MultinomialNB
 from sklearn.metrics import classification_report, confusion_matrix, accuracy_score
 from sklearn.preprocessing import StandardScaler
 import re
+import os
 import pickle
+import hashlib
+import uuid
+import multiprocessing
+from collections import deque
 import logging
 from datetime import datetime
+from padroes_texto import KeywordGroups
+from motor_regras import RuleEngine, RuleFrame, DEFAULT_HEURISTIC_RULES, DEFAULT_RISK_ANALYSIS, DEFAULT_CASCADE_RULES
+from monitor_deriva import reference_distribution
+from cache_predicoes import PredictionCache, prediction_keys, KEY_FIELDS
+from indice_catalogo import get_catalog_index
+from reputacao_vendedores import SellerReputationStore, DEFAULT_SELLER_REPUTATION
+import modelo_compacto
+
+# Features numéricas, na ordem usada pelo modelo
+FEATURE_COLUMNS = [
+    'price', 'title_length', 'description_length', 'has_price', 'price_ratio',
+    'word_count', 'has_suspicious_words', 'has_original_words', 'seller_trust_score'
+]
+
+# Campos do texto combinado (build_text), na ordem em que são unidos
+TEXT_FIELDS = ['title', 'description', 'seller']
+
+SUSPICIOUS_WORDS = [
+    'genérico', 'cópia', 'compatível', 'recondicionado', 'usado',
+    'refurbished', 'remanufactured', 'compatible', 'generic',
+    'não original', 'alternativo', 'substituto', 'imitação'
+]
+
+ORIGINAL_WORDS = [
+    'original', 'oficial', 'genuíno', 'autêntico', 'lacrado',
+    'novo', 'garantia', 'nota fiscal', 'certificado'
+]
+
+# Grupos contados numa mesma busca (sem distinção de acentos)
+TEXT_KEYWORD_GROUPS = KeywordGroups({
+    'has_suspicious_words': SUSPICIOUS_WORDS,
+    'has_original_words': ORIGINAL_WORDS
+})
+
+# Vendedores usados no score de confiança
+SELLER_KEYWORD_GROUPS = KeywordGroups({
+    'trusted': ['amazon', 'hp', 'oficial'],
+    'suspicious': ['marketplace', 'terceiros', 'vendedor externo']
+})
+
+# Predição em cascata: scores de regra que decidem o produto sem passar pelo
+# modelo (regras heurísticas mais as regras próprias da cascata)
+DEFAULT_CASCADE = {
+    "enabled": False,
+    "suspicious_score": 3,
+    "original_score": -2,
+    "rules": DEFAULT_CASCADE_RULES
+}
+
+# Cache persistente de predições (ver cache_predicoes)
+DEFAULT_PREDICTION_CACHE = {
+    "enabled": False,
+    "file": "resultados/cache_predicoes.sqlite",
+    "max_entries": 200000
+}
+
+# Famílias de modelo disponíveis para treinar_modelo e para a seleção de modelos
+MODEL_FAMILIES = {
+    'random_forest': RandomForestClassifier,
+    'logistic_regression': LogisticRegression,
+    'naive_bayes': MultinomialNB,
+    'sgd': SGDClassifier
+}
+
+def build_model(spec):
+    """Modelo não ajustado a partir de {"type": família, "params": {...}}"""
+    if spec['type'] not in MODEL_FAMILIES:
+        raise ValueError(f"Família de modelo desconhecida: {spec['type']}")
+    return MODEL_FAMILIES[spec['type']](**spec.get('params', {}))
+
+def file_digest(filename):
+    """Hash do conteúdo do arquivo (versão de modelos salvos sem model_version)"""
+    with open(filename, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()[:32]
+
+def latest_timestamp(df, column='data_cadastro'):
+    """Data mais recente da coluna (ISO 8601), ou None sem datas válidas"""
+    if column not in df.columns:
+        return None
+    latest = pd.to_datetime(df[column], errors='coerce').max()
+    return None if pd.isna(latest) else latest.isoformat()
+
+def iter_batches(source, batch_size=10000):
+    """
+    Lotes de no máximo batch_size linhas a partir de um DataFrame, de um
+    iterável de DataFrames ou do caminho de um CSV/Parquet (lido aos poucos)
+    """
+    if isinstance(source, str):
+        if source.endswith('.parquet'):
+            import pyarrow.parquet as pq
+            chunks = (batch.to_pandas() for batch in pq.ParquetFile(source).iter_batches(batch_size=batch_size))
+        else:
+            chunks = pd.read_csv(source, chunksize=batch_size)
+    elif isinstance(source, pd.DataFrame):
+        chunks = [source]
+    else:
+        chunks = source
+    
+    for chunk in chunks:
+        if len(chunk) <= batch_size:
+            yield chunk
+            continue
+        for start in range(0, len(chunk), batch_size):
+            yield chunk.iloc[start:start + batch_size].copy()
+
+# Classificador usado pelos processos da pontuação paralela. Com fork os filhos
+# herdam o modelo já carregado (memória compartilhada por copy-on-write); sem
+# fork cada processo monta o classificador com a configuração do pai e carrega
+# o arquivo do modelo uma única vez ao iniciar.
+_worker_classifier = None
+
+def _init_worker(model_file, config):
+    """Inicializa um processo de pontuação (só necessário sem fork)"""
+    global _worker_classifier
+    if _worker_classifier is None:
+        _worker_classifier = PiracyDetectionClassifier(config)
+        _worker_classifier.load_model(model_file)
+
+def _score_batch(batch):
+    """Pontua um lote no processo de trabalho"""
+    return _worker_classifier.prever(batch)
 
 class PiracyDetectionClassifier:
-    def __init__(self):
+    def __init__(self, config=None):
         """
         Inicializa o classificador de detecção de pirataria
+        
+        config: configurações do pipeline (seções heuristic_rules e risk_analysis);
+        sem elas valem as regras padrão de motor_regras
         """
         self.setup_logging()
+        config = config or {}
+        # Repassada aos processos da pontuação paralela sem fork
+        self.config = config
+        self.heuristic_rules = {**DEFAULT_HEURISTIC_RULES, **config.get('heuristic_rules', {})}
+        self.risk_analysis = {**DEFAULT_RISK_ANALYSIS, **config.get('risk_analysis', {})}
+        self.heuristic_engine = RuleEngine(self.heuristic_rules['rules'])
+        self.risk_engine = RuleEngine(self.risk_analysis['rules'])
+        self.cascade = {**DEFAULT_CASCADE, **config.get('ai', {}).get('cascade', {})}
+        self.cascade_engine = RuleEngine(self.heuristic_rules['rules'] + self.cascade['rules'])
+        self.cascade_stats = None
+        cache_settings = {**DEFAULT_PREDICTION_CACHE, **config.get('ai', {}).get('prediction_cache', {})}
+        self.prediction_cache = (
+            PredictionCache(cache_settings['file'], cache_settings['max_entries']) if cache_settings['enabled'] else None
+        )
+        # Reputação aprendida dos vendedores (seller_trust_score a partir do histórico)
+        reputation_settings = {**DEFAULT_SELLER_REPUTATION, **config.get('ai', {}).get('seller_reputation', {})}
+        self.seller_reputation = (
+            SellerReputationStore(reputation_settings['file'], reputation_settings['prior_listings'])
+            if reputation_settings['enabled'] else None
+        )
         self.vectorizer = TfidfVectorizer(max_features=1000, stop_words='english')
-        self.scaler = StandardScaler()
+        self.scaler = StandardScaler(with_mean=False)
         self.model = None
+        # Avaliador usado nas predições (floresta achatada em arrays NumPy, se possível)
+        self.predictor = None
         self.feature_names = []
         self.is_trained = False
+        # Produto mais recente visto no treino (data_cadastro) e distribuição de
+        # referência das features, usados pelo retreino incremental
+        self.trained_at = None
+        self.reference_stats = None
+        # Identifica o modelo nas chaves do cache de predições (muda a cada treino/atualização)
+        self.model_version = None
+        # Matriz esparsa (TF-IDF + bloco numérico escalado); modelos antigos usam a matriz densa
+        self.sparse_features = True
+        # Preço sugerido vindo do catálogo (price_ratio real); modelos antigos foram treinados sem ele
+        self.catalog_features = True
+        self.catalog_file = config.get('ai', {}).get('catalog_file', "data/catalogo.csv")
         
     def setup_logging(self):
         """Configura o sistema de logging"""
@@ -42,86 +205,159 @@ class PiracyDetectionClassifier:
         """
         self.logger.info("Criando dados de treinamento...")
         
-        # Aplicar regras heurísticas para criar labels
-        df['label'] = df.apply(self.apply_heuristic_rules, axis=1)
+        df = self.attach_catalog(df)
         
-        # Criar features
-        df['features'] = df.apply(self.create_features, axis=1)
+        # Aplicar regras heurísticas para criar labels
+        df['label'] = self.label_products(df)
         
         return df
     
+    def attach_catalog(self, df):
+        """
+        Acrescenta matched_pn, catalog_family, suggested_price e price_ratio
+        pelo índice do catálogo (ver indice_catalogo), a menos que
+        suggested_price já esteja preenchido ou o modelo seja anterior ao catálogo
+        """
+        if not self.catalog_features or 'suggested_price' in df.columns:
+            return df
+        catalog = get_catalog_index(self.catalog_file)
+        return df if catalog is None else catalog.annotate(df)
+    
+    def label_products(self, df):
+        """
+        Classifica todos os produtos pelas regras heurísticas (uma passada vetorizada)
+        """
+        score = self.heuristic_engine.score(df)
+        labels = np.select(
+            [score >= self.heuristic_rules['suspicious_threshold'], score <= self.heuristic_rules['original_threshold']],
+            ['SUSPEITO', 'ORIGINAL'],
+            default='COMPATIVEL'
+        )
+        return pd.Series(labels, index=df.index, dtype=object)
+    
+    def target_labels(self, df):
+        """
+        Rótulos para atualizar o modelo: a coluna label quando existe (produtos
+        rotulados manualmente) e as regras heurísticas nas demais linhas
+        """
+        labels = self.label_products(df)
+        if 'label' in df.columns:
+            labels = df['label'].where(df['label'].isin(['ORIGINAL', 'SUSPEITO', 'COMPATIVEL']), labels)
+        return labels
+    
+    def record_training(self, df, X_numeric):
+        """
+        Guarda a data do produto mais recente do treino (sem data_cadastro, o
+        momento do treino), a distribuição de referência das features e uma
+        nova versão do modelo
+        """
+        self.trained_at = latest_timestamp(df) or datetime.now().isoformat()
+        self.reference_stats = reference_distribution(X_numeric)
+        self.new_model_version()
+    
+    def new_model_version(self):
+        """Nova versão do modelo (invalida as predições em cache da anterior)"""
+        self.model_version = uuid.uuid4().hex
+    
     def apply_heuristic_rules(self, row):
         """
-        Aplica regras heurísticas para classificar produtos
+        Aplica regras heurísticas para classificar um produto (ver label_products)
         """
-        title = str(row.get('title', '')).lower()
-        description = str(row.get('description', '')).lower()
-        seller = str(row.get('seller', '')).lower()
-        price = row.get('price', 0)
+        return self.label_products(pd.DataFrame([row])).iloc[0]
+    
+    @staticmethod
+    def text_column(df, column):
+        """Coluna como texto, igual a str(row.get(column, '')) linha a linha"""
+        if column not in df.columns:
+            return pd.Series('', index=df.index, dtype=object)
+        return df[column].astype(object).map(str)
+    
+    def build_text(self, df):
+        """Texto combinado (título, descrição e vendedor) usado pelo TF-IDF"""
+        return self.text_column(df, 'title') + ' ' + self.text_column(df, 'description') + ' ' + self.text_column(df, 'seller')
+    
+    def create_feature_frame(self, df, text=None, frame=None, positions=None):
+        """
+        Cria as features numéricas de todas as linhas de uma vez (colunar)
         
-        # Palavras-chave suspeitas
-        suspicious_keywords = [
-            'genérico', 'cópia', 'compatível', 'recondicionado', 'usado',
-            'refurbished', 'remanufactured', 'compatible', 'generic',
-            'não original', 'alternativo', 'substituto', 'imitação',
-            'falso', 'fake', 'replica', 'copia', 'compativel'
-        ]
-        
-        # Palavras-chave de originalidade
-        original_keywords = [
-            'original', 'oficial', 'genuíno', 'autêntico', 'lacrado',
-            'novo', 'novo lacrado', 'garantia', 'nota fiscal'
-        ]
-        
-        # Vendedores confiáveis
-        trusted_sellers = [
-            'amazon', 'amazon.com.br', 'hp', 'hp brasil', 'oficial'
-        ]
-        
-        # Vendedores suspeitos
-        suspicious_sellers = [
-            'marketplace', 'terceiros', 'vendedor externo', 'loja genérica'
-        ]
-        
-        score = 0
-        
-        # Verificar palavras-chave suspeitas
-        for keyword in suspicious_keywords:
-            if keyword in title or keyword in description:
-                score += 2
-        
-        # Verificar palavras-chave de originalidade
-        for keyword in original_keywords:
-            if keyword in title or keyword in description:
-                score -= 1
-        
-        # Verificar vendedor
-        if any(trusted in seller for trusted in trusted_sellers):
-            score -= 1
-        elif any(suspicious in seller for suspicious in suspicious_sellers):
-            score += 2
-        
-        # Verificar preço (se muito baixo, pode ser suspeito)
-        if price and price < 30:  # Preço muito baixo
-            score += 1
-        elif price and price > 200:  # Preço muito alto
-            score += 0.5
-        
-        # Verificar descrição vazia ou muito curta
-        if len(description) < 50:
-            score += 1
-        
-        # Classificar baseado no score
-        if score >= 2:
-            return 'SUSPEITO'
-        elif score <= -1:
-            return 'ORIGINAL'
+        Produz exatamente os mesmos valores e tipos de create_features aplicado
+        linha a linha, sem montar um dicionário por produto. Com frame (RuleFrame
+        das regras heurísticas, em que df são as linhas positions), as palavras-chave
+        saem das máscaras já calculadas pelas regras, sem normalizar o texto de novo.
+        """
+        title = self.text_column(df, 'title')
+        description = self.text_column(df, 'description')
+        seller = self.text_column(df, 'seller')
+        if text is None:
+            text = title + ' ' + description + ' ' + seller
+        if frame is None:
+            keyword_counts = TEXT_KEYWORD_GROUPS.count(text.tolist())
         else:
-            return 'COMPATIVEL'
+            keyword_counts = self.rule_keyword_counts(TEXT_KEYWORD_GROUPS, frame, TEXT_FIELDS, positions)
+        
+        price = df['price'] if 'price' in df.columns else pd.Series(0, index=df.index)
+        suggested_price = df['suggested_price'] if 'suggested_price' in df.columns else pd.Series(0, index=df.index)
+        
+        if pd.api.types.is_numeric_dtype(price) and pd.api.types.is_numeric_dtype(suggested_price):
+            # NaN é "verdadeiro" em `if price`, então só o zero conta como ausente
+            has_price = price != 0
+            price_value = price.where(has_price, 0)
+            price_ratio = (price / suggested_price).where(has_price & (suggested_price != 0), 1.0)
+        else:
+            has_price = price.map(bool)
+            price_value = price.map(lambda p: p if p else 0)
+            price_ratio = pd.Series(
+                [p / s if p and s else 1.0 for p, s in zip(price, suggested_price)],
+                index=df.index
+            )
+        
+        seller_trust = self.seller_trust_scores(seller, frame, positions)
+        
+        features = pd.DataFrame({
+            'price': price_value,
+            'title_length': title.str.len(),
+            'description_length': description.str.len(),
+            'has_price': has_price.astype('int64'),
+            'price_ratio': price_ratio,
+            'word_count': pd.Series([len(t.split()) for t in text.tolist()], index=df.index, dtype='int64'),
+            'has_suspicious_words': keyword_counts['has_suspicious_words'],
+            'has_original_words': keyword_counts['has_original_words'],
+            'seller_trust_score': seller_trust
+        }, index=df.index)
+        
+        return features[FEATURE_COLUMNS].reset_index(drop=True)
+    
+    @staticmethod
+    def rule_keyword_counts(groups, frame, fields, positions):
+        """Contagem dos grupos de palavras nos campos, a partir das máscaras do RuleFrame (linhas positions)"""
+        found = {keyword: frame.contains_combined(fields, keyword)[positions] for keyword in groups.keywords}
+        return groups.count_found(found, len(positions))
+    
+    def seller_trust_scores(self, seller, frame=None, positions=None):
+        """
+        seller_trust_score de cada linha (seller: coluna de texto): confiança
+        pelo nome e, com a reputação ativa, suavizada pelo histórico do vendedor
+        (frame e positions como em create_feature_frame)
+        
+        Com a reputação ativa o valor muda a cada atualização do histórico: o
+        treino vê a confiança daquele momento e a pontuação, a atual. Essa
+        diferença aparece no PSI de seller_trust_score (reference_stats) e
+        dispara o retreino incremental como qualquer outra deriva.
+        """
+        if frame is None:
+            seller_counts = SELLER_KEYWORD_GROUPS.count(seller.tolist())
+        else:
+            seller_counts = self.rule_keyword_counts(SELLER_KEYWORD_GROUPS, frame, ['seller'], positions)
+        trust = np.select(
+            [seller_counts['trusted'] > 0, seller_counts['suspicious'] > 0], [1.0, 0.0], default=0.5
+        )
+        if self.seller_reputation is not None:
+            trust = self.seller_reputation.trust(seller.tolist(), trust)
+        return trust
     
     def create_features(self, row):
         """
-        Cria features para o modelo de ML
+        Cria features para o modelo de ML (uma linha; ver create_feature_frame)
         """
         title = str(row.get('title', ''))
         description = str(row.get('description', ''))
@@ -130,6 +366,7 @@ class PiracyDetectionClassifier:
         
         # Combinar texto
         text = f"{title} {description} {seller}"
+        keyword_counts = TEXT_KEYWORD_GROUPS.count_text(text)
         
         # Features numéricas
         features = {
@@ -139,8 +376,8 @@ class PiracyDetectionClassifier:
             'has_price': 1 if price else 0,
             'price_ratio': self.calculate_price_ratio(row),
             'word_count': len(text.split()),
-            'has_suspicious_words': self.count_suspicious_words(text),
-            'has_original_words': self.count_original_words(text),
+            'has_suspicious_words': keyword_counts['has_suspicious_words'],
+            'has_original_words': keyword_counts['has_original_words'],
             'seller_trust_score': self.calculate_seller_trust(seller)
         }
         
@@ -161,48 +398,56 @@ class PiracyDetectionClassifier:
         """
         Conta palavras suspeitas no texto
         """
-        suspicious_words = [
-            'genérico', 'cópia', 'compatível', 'recondicionado', 'usado',
-            'refurbished', 'remanufactured', 'compatible', 'generic',
-            'não original', 'alternativo', 'substituto', 'imitação'
-        ]
-        
-        text_lower = text.lower()
-        count = sum(1 for word in suspicious_words if word in text_lower)
-        return count
+        return TEXT_KEYWORD_GROUPS.count_text(text)['has_suspicious_words']
     
     def count_original_words(self, text):
         """
         Conta palavras que indicam originalidade
         """
-        original_words = [
-            'original', 'oficial', 'genuíno', 'autêntico', 'lacrado',
-            'novo', 'garantia', 'nota fiscal', 'certificado'
-        ]
-        
-        text_lower = text.lower()
-        count = sum(1 for word in original_words if word in text_lower)
-        return count
+        return TEXT_KEYWORD_GROUPS.count_text(text)['has_original_words']
     
     def calculate_seller_trust(self, seller):
         """
-        Calcula score de confiança do vendedor
+        Calcula score de confiança do vendedor (pelo nome; com a reputação
+        ativa, suavizado pela fração de anúncios suspeitos do vendedor)
         """
-        seller_lower = seller.lower()
+        counts = SELLER_KEYWORD_GROUPS.count_text(seller)
         
-        trusted_sellers = ['amazon', 'hp', 'oficial']
-        suspicious_sellers = ['marketplace', 'terceiros', 'vendedor externo']
-        
-        if any(trusted in seller_lower for trusted in trusted_sellers):
-            return 1.0
-        elif any(suspicious in seller_lower for suspicious in suspicious_sellers):
-            return 0.0
+        if counts['trusted']:
+            trust = 1.0
+        elif counts['suspicious']:
+            trust = 0.0
         else:
-            return 0.5
+            trust = 0.5
+        
+        if self.seller_reputation is not None:
+            return float(self.seller_reputation.trust([seller], [trust])[0])
+        return trust
     
-    def treinar_modelo(self, df):
+    def combine_features(self, X_text_vectorized, X_numeric, fit_scaler=False):
+        """
+        Junta o TF-IDF às features numéricas e normaliza
+        
+        No formato esparso só o bloco numérico passa pelo scaler (sem centralizar,
+        o que preservaria os zeros) e a matriz continua CSR do início ao fim. NaN
+        no bloco numérico vira 0, já que a floresta não aceita NaN em matriz
+        esparsa (a ausência de preço já é marcada por has_price). Modelos salvos
+        antes disso usam a matriz densa com o scaler sobre todas as colunas.
+        """
+        if not self.sparse_features:
+            X_combined = np.hstack([X_text_vectorized.toarray(), X_numeric.values])
+            return self.scaler.fit_transform(X_combined) if fit_scaler else self.scaler.transform(X_combined)
+        
+        numeric = X_numeric.values.astype(np.float64)
+        numeric = self.scaler.fit_transform(numeric) if fit_scaler else self.scaler.transform(numeric)
+        numeric = np.nan_to_num(numeric, nan=0.0)
+        return sp.hstack([X_text_vectorized, sp.csr_matrix(numeric)], format='csr')
+    
+    def treinar_modelo(self, df, model=None):
         """
         Treina o modelo de classificação
+        
+        model: estimador não ajustado (ver build_model); padrão Random Forest com 100 árvores
         """
         self.logger.info("Iniciando treinamento do modelo...")
         
@@ -210,27 +455,25 @@ class PiracyDetectionClassifier:
         df_training = self.create_training_data(df.copy())
         
         # Separar features e labels
-        X_text = df_training.apply(lambda row: f"{row.get('title', '')} {row.get('description', '')} {row.get('seller', '')}", axis=1)
-        X_numeric = pd.DataFrame([f for f in df_training['features']])
+        X_text = self.build_text(df_training)
+        X_numeric = self.create_feature_frame(df_training, X_text)
         y = df_training['label']
         
         # Vetorizar texto
         X_text_vectorized = self.vectorizer.fit_transform(X_text)
         
-        # Combinar features
-        X_combined = np.hstack([X_text_vectorized.toarray(), X_numeric.values])
-        
         # Dividir dados
-        X_train, X_test, y_train, y_test = train_test_split(
-            X_combined, y, test_size=0.2, random_state=42, stratify=y
+        train_idx, test_idx, y_train, y_test = train_test_split(
+            np.arange(len(y)), y, test_size=0.2, random_state=42, stratify=y
         )
         
-        # Normalizar features numéricas
-        X_train_scaled = self.scaler.fit_transform(X_train)
-        X_test_scaled = self.scaler.transform(X_test)
+        # Combinar e normalizar features (scaler ajustado só no treino)
+        self.scaler = StandardScaler(with_mean=False) if self.sparse_features else StandardScaler()
+        X_train_scaled = self.combine_features(X_text_vectorized[train_idx], X_numeric.iloc[train_idx], fit_scaler=True)
+        X_test_scaled = self.combine_features(X_text_vectorized[test_idx], X_numeric.iloc[test_idx])
         
-        # Treinar modelo (usando Random Forest)
-        self.model = RandomForestClassifier(n_estimators=100, random_state=42)
+        # Treinar modelo (todas as famílias aceitam CSR diretamente)
+        self.model = model if model is not None else RandomForestClassifier(n_estimators=100, random_state=42)
         self.model.fit(X_train_scaled, y_train)
         
         # Avaliar modelo
@@ -240,6 +483,8 @@ class PiracyDetectionClassifier:
         self.logger.info(f"Acurácia do modelo: {accuracy:.3f}")
         self.logger.info(f"Relatório de classificação:\n{classification_report(y_test, y_pred)}")
         
+        self.record_training(df_training, X_numeric)
+        self.predictor = self.compile_predictor(self.model)
         self.is_trained = True
         
         return accuracy
@@ -247,40 +492,215 @@ class PiracyDetectionClassifier:
     def prever(self, df):
         """
         Faz predições em novos dados
+        
+        Com o cache de predições ativo, só as linhas ainda não vistas por esta
+        versão do modelo (mesmos campos de entrada) são vetorizadas e pontuadas.
         """
         if not self.is_trained:
             raise ValueError("Modelo não foi treinado ainda")
         
         self.logger.info("Fazendo predições...")
         
-        # Criar features
-        df_features = df.copy()
-        df_features['features'] = df_features.apply(self.create_features, axis=1)
+        df = self.attach_catalog(df)
+        if self.prediction_cache is None:
+            predictions, confidence, probabilities = self.score_frame(df)
+        else:
+            predictions, confidence, probabilities = self.score_frame_cached(df)
+        
+        # Adicionar resultados ao DataFrame
+        df['ai_prediction'] = predictions
+        df['ai_confidence'] = confidence
+        df['ai_probabilities'] = probabilities
         
-        # Separar features
-        X_text = df_features.apply(lambda row: f"{row.get('title', '')} {row.get('description', '')} {row.get('seller', '')}", axis=1)
-        X_numeric = pd.DataFrame([f for f in df_features['features']])
+        return df
+    
+    def score_frame(self, df, frame=None, positions=None):
+        """
+        Predições, confianças e probabilidades (listas) das linhas do DataFrame
+        (frame e positions como em create_feature_frame)
+        """
+        # Criar features
+        X_text = self.build_text(df)
+        X_numeric = self.create_feature_frame(df, X_text, frame, positions)
         
         # Vetorizar texto
         X_text_vectorized = self.vectorizer.transform(X_text)
         
-        # Combinar features
-        X_combined = np.hstack([X_text_vectorized.toarray(), X_numeric.values])
+        # Combinar e normalizar features
+        X_scaled = self.combine_features(X_text_vectorized, X_numeric)
         
-        # Normalizar
-        X_scaled = self.scaler.transform(X_combined)
+        # Fazer predições (probabilidades calculadas uma única vez)
+        probabilities = self.predictor.predict_proba(X_scaled)
+        predictions = self.predictor.classes_.take(np.argmax(probabilities, axis=1), axis=0)
         
-        # Fazer predições
-        predictions = self.model.predict(X_scaled)
-        probabilities = self.model.predict_proba(X_scaled)
+        return predictions, np.max(probabilities, axis=1), probabilities.tolist()
+    
+    def score_frame_cached(self, df):
+        """score_frame consultando o cache antes e gravando nele as linhas novas"""
+        columns = [self.text_column(df, field).tolist() for field in KEY_FIELDS]
+        if self.seller_reputation is not None:
+            # A confiança aprendida do vendedor muda com o histórico e também faz parte da chave
+            columns.append([repr(float(trust)) for trust in self.seller_trust_scores(self.text_column(df, 'seller'))])
+        keys = prediction_keys(self.model_version, columns)
+        cached = self.prediction_cache.get_many(keys)
+        missing = np.array([key not in cached for key in keys], dtype=bool)
+        
+        predictions = np.empty(len(df), dtype=object)
+        confidence = np.zeros(len(df))
+        probabilities = [None] * len(df)
+        for position in np.flatnonzero(~missing):
+            predictions[position], confidence[position], probabilities[position] = cached[keys[position]]
+        
+        missing_positions = np.flatnonzero(missing)
+        if len(missing_positions):
+            scored = self.score_frame(df.iloc[missing_positions])
+            predictions[missing_positions] = scored[0]
+            confidence[missing_positions] = scored[1]
+            for position, row_probabilities in zip(missing_positions, scored[2]):
+                probabilities[position] = row_probabilities
+            self.prediction_cache.put_many([keys[position] for position in missing_positions], *scored)
+        
+        self.logger.info(f"Cache de predições: {len(df) - len(missing_positions)}/{len(df)} linhas reaproveitadas")
+        return predictions, confidence, probabilities
+    
+    def prever_cascata(self, df):
+        """
+        Faz predições em cascata: as regras heurísticas, mais as regras da
+        cascata (ex.: imagem de referência), decidem os produtos com score
+        claramente suspeito (>= suspicious_score) ou original (<= original_score)
+        e só a faixa incerta passa pela vetorização e pelo modelo
+        
+        As features da faixa incerta reaproveitam as palavras-chave já
+        procuradas pelas regras (mesmo RuleFrame), então o texto não é
+        normalizado duas vezes. Acrescenta ai_source ('regras' ou 'modelo'); os
+        limites usados e a proporção enviada ao modelo ficam em self.cascade_stats.
+        """
+        if not self.is_trained:
+            raise ValueError("Modelo não foi treinado ainda")
+        
+        df = self.attach_catalog(df)
+        frame = RuleFrame(df)
+        score = self.cascade_engine.score(df, frame).to_numpy()
+        predictions = np.select(
+            [score >= self.cascade['suspicious_score'], score <= self.cascade['original_score']],
+            ['SUSPEITO', 'ORIGINAL'],
+            default=''
+        ).astype(object)
+        to_model = predictions == ''
+        
+        # Produtos decididos pelas regras: confiança 1 e probabilidade toda na classe
+        confidence = np.ones(len(df))
+        probabilities = (predictions[:, None] == self.predictor.classes_[None, :]).astype(np.float64)
+        
+        model_positions = np.flatnonzero(to_model)
+        if len(model_positions):
+            subset = df.iloc[model_positions]
+            if self.prediction_cache is None:
+                scored = self.score_frame(subset, frame, model_positions)
+            else:
+                scored = self.score_frame_cached(subset)
+            predictions[model_positions] = scored[0]
+            confidence[model_positions] = scored[1]
+            probabilities[model_positions] = scored[2]
+        probabilities = probabilities.tolist()
         
-        # Adicionar resultados ao DataFrame
         df['ai_prediction'] = predictions
-        df['ai_confidence'] = np.max(probabilities, axis=1)
-        df['ai_probabilities'] = [prob.tolist() for prob in probabilities]
+        df['ai_confidence'] = confidence
+        df['ai_probabilities'] = probabilities
+        df['ai_source'] = np.where(to_model, 'modelo', 'regras')
+        
+        self.cascade_stats = {
+            'suspicious_score': self.cascade['suspicious_score'],
+            'original_score': self.cascade['original_score'],
+            'total': len(df),
+            'sent_to_model': len(model_positions),
+            'model_share': len(model_positions) / len(df) if len(df) else 0.0
+        }
+        self.logger.info(
+            f"Cascata: {len(model_positions)}/{len(df)} produtos enviados ao modelo "
+            f"({self.cascade_stats['model_share']:.1%}; regras decidem score >= "
+            f"{self.cascade['suspicious_score']} ou <= {self.cascade['original_score']})"
+        )
         
         return df
     
+    def prever_em_lotes(self, source, batch_size=10000):
+        """
+        Faz predições em lotes de tamanho fixo, gerando um DataFrame por lote
+        
+        source: DataFrame, iterável de DataFrames ou caminho de CSV/Parquet.
+        Só um lote fica em memória por vez, então o consumo não depende do
+        tamanho total da entrada.
+        """
+        if not self.is_trained:
+            raise ValueError("Modelo não foi treinado ainda")
+        
+        for batch in iter_batches(source, batch_size):
+            yield self.prever(batch)
+    
+    def prever_paralelo(self, source, n_jobs=None, batch_size=10000, model_file=None):
+        """
+        Faz predições em lotes distribuídos entre vários processos
+        
+        Os lotes voltam na ordem da entrada e no máximo 2 * n_jobs lotes ficam
+        em trânsito, mantendo a memória limitada. Com fork (Linux) os processos
+        compartilham o modelo carregado; nas demais plataformas model_file é
+        obrigatório e cada processo carrega o modelo uma vez, com a mesma
+        configuração (catálogo, reputação dos vendedores, cache de predições)
+        deste classificador.
+        """
+        global _worker_classifier
+        if not self.is_trained:
+            raise ValueError("Modelo não foi treinado ainda")
+        
+        n_jobs = n_jobs or os.cpu_count() or 1
+        use_fork = 'fork' in multiprocessing.get_all_start_methods()
+        if not use_fork and model_file is None:
+            raise ValueError("model_file é obrigatório para pontuação paralela sem fork")
+        
+        context = multiprocessing.get_context('fork' if use_fork else 'spawn')
+        if use_fork:
+            _worker_classifier = self
+        try:
+            with context.Pool(n_jobs, initializer=_init_worker, initargs=(model_file, self.config)) as pool:
+                pending = deque()
+                for batch in iter_batches(source, batch_size):
+                    pending.append(pool.apply_async(_score_batch, (batch,)))
+                    if len(pending) >= 2 * n_jobs:
+                        yield pending.popleft().get()
+                while pending:
+                    yield pending.popleft().get()
+        finally:
+            if use_fork:
+                _worker_classifier = None
+    
+    def salvar_predicoes_em_lotes(self, source, output_file, batch_size=10000, columns=None, n_jobs=1, model_file=None):
+        """
+        Pontua a entrada em lotes e grava as predições em CSV (um lote por vez)
+        
+        columns: colunas de entrada mantidas na saída (padrão: todas), além
+        das colunas de predição. Com n_jobs diferente de 1 os lotes são
+        pontuados em paralelo (ver prever_paralelo). Retorna o total de linhas gravadas.
+        """
+        if n_jobs == 1:
+            batches = self.prever_em_lotes(source, batch_size)
+        else:
+            batches = self.prever_paralelo(source, n_jobs, batch_size, model_file)
+        
+        out_dir = os.path.dirname(output_file)
+        if out_dir:
+            os.makedirs(out_dir, exist_ok=True)
+        
+        total = 0
+        for batch_number, scored in enumerate(batches):
+            if columns is not None:
+                scored = scored[[col for col in columns if col in scored.columns] + ['ai_prediction', 'ai_confidence', 'ai_probabilities']]
+            scored.to_csv(output_file, mode='w' if batch_number == 0 else 'a', header=batch_number == 0, index=False)
+            total += len(scored)
+            self.logger.info(f"Lote {batch_number + 1}: {total} linhas pontuadas")
+        
+        return total
+    
     def save_model(self, filename="resultados/modelo_deteccao_pirataria.pkl"):
         """
         Salva o modelo treinado
@@ -293,7 +713,11 @@ class PiracyDetectionClassifier:
             'vectorizer': self.vectorizer,
             'scaler': self.scaler,
             'feature_names': self.feature_names,
-            'trained_at': datetime.now().isoformat()
+            'sparse_features': self.sparse_features,
+            'catalog_features': self.catalog_features,
+            'trained_at': self.trained_at or datetime.now().isoformat(),
+            'reference_stats': self.reference_stats,
+            'model_version': self.model_version
         }
         
         with open(filename, 'wb') as f:
@@ -301,18 +725,59 @@ class PiracyDetectionClassifier:
         
         self.logger.info(f"Modelo salvo em {filename}")
     
+    @staticmethod
+    def compile_predictor(model):
+        """
+        Avaliador de predições para o modelo: florestas aleatórias viram arrays
+        planos avaliados em NumPy (mesmos resultados, sem o custo por chamada do
+        scikit-learn); outros modelos são usados diretamente
+        """
+        if isinstance(model, RandomForestClassifier):
+            return modelo_compacto.CompactForest.from_sklearn(model)
+        return model
+    
+    def save_compact_model(self, directory="resultados/modelo_deteccao_pirataria"):
+        """
+        Salva o modelo treinado no formato compacto (arrays NumPy + manifest.json),
+        que carrega por mmap sem desserializar objetos (ver modelo_compacto)
+        """
+        if not self.is_trained:
+            raise ValueError("Modelo não foi treinado ainda")
+        
+        modelo_compacto.save_compact_model(self, directory)
+        self.logger.info(f"Modelo compacto salvo em {directory}")
+    
     def load_model(self, filename="resultados/modelo_deteccao_pirataria.pkl"):
         """
-        Carrega um modelo treinado
+        Carrega um modelo treinado (.pkl ou diretório no formato compacto)
         """
+        if os.path.isdir(filename):
+            manifest, self.vectorizer, self.scaler, self.model = modelo_compacto.load_compact_model(filename)
+            self.predictor = self.model
+            self.feature_names = manifest['feature_names']
+            self.sparse_features = manifest['sparse_features']
+            self.catalog_features = manifest.get('catalog_features', False)
+            self.trained_at = manifest.get('trained_at')
+            self.reference_stats = manifest.get('reference_stats')
+            self.model_version = manifest.get('model_version') or file_digest(os.path.join(filename, modelo_compacto.MANIFEST_FILE))
+            self.is_trained = True
+            self.logger.info(f"Modelo compacto carregado de {filename}")
+            return
+        
         try:
             with open(filename, 'rb') as f:
                 model_data = pickle.load(f)
             
             self.model = model_data['model']
+            self.predictor = self.compile_predictor(self.model)
             self.vectorizer = model_data['vectorizer']
             self.scaler = model_data['scaler']
             self.feature_names = model_data['feature_names']
+            self.sparse_features = model_data.get('sparse_features', False)
+            self.catalog_features = model_data.get('catalog_features', False)
+            self.trained_at = model_data.get('trained_at')
+            self.reference_stats = model_data.get('reference_stats')
+            self.model_version = model_data.get('model_version') or file_digest(filename)
             self.is_trained = True
             
             self.logger.info(f"Modelo carregado de {filename}")
@@ -327,49 +792,108 @@ class PiracyDetectionClassifier:
         """
         self.logger.info("Analisando níveis de risco...")
         
-        def calculate_risk_score(row):
-            score = 0
-            
-            # Baseado na predição da IA
-            if row.get('ai_prediction') == 'SUSPEITO':
-                score += 3
-            elif row.get('ai_prediction') == 'COMPATIVEL':
-                score += 1
-            
-            # Baseado na confiança da IA
-            confidence = row.get('ai_confidence', 0)
-            if confidence < 0.7:
-                score += 1
-            
-            # Baseado no preço
-            price = row.get('price', 0)
-            if price and price < 30:
-                score += 2
-            elif price and price > 200:
-                score += 1
-            
-            # Baseado no vendedor
-            seller = str(row.get('seller', '')).lower()
-            if 'marketplace' in seller:
-                score += 1
-            
-            return score
-        
-        df['risk_score'] = df.apply(calculate_risk_score, axis=1)
+        df['risk_score'] = self.risk_engine.score(df)
         
         # Classificar níveis de risco
-        def classify_risk(score):
-            if score >= 4:
-                return 'ALTO'
-            elif score >= 2:
-                return 'MÉDIO'
-            else:
-                return 'BAIXO'
-        
-        df['risk_level'] = df['risk_score'].apply(classify_risk)
+        df['risk_level'] = np.select(
+            [df['risk_score'] >= self.risk_analysis['high_risk_threshold'], df['risk_score'] >= self.risk_analysis['medium_risk_threshold']],
+            ['ALTO', 'MÉDIO'],
+            default='BAIXO'
+        )
         
         return df
 
+class OnlinePiracyDetectionClassifier(PiracyDetectionClassifier):
+    """
+    Variante com aprendizado incremental
+    
+    O texto passa por um HashingVectorizer (sem vocabulário para ajustar, memória
+    fixa) e o modelo é um SGDClassifier com perda logística, então produtos
+    recém-rotulados entram no modelo com partial_fit, sem retreinar do zero.
+    """
+    # Classes fixas: um lote novo pode não trazer exemplos de todas
+    CLASSES = np.array(['COMPATIVEL', 'ORIGINAL', 'SUSPEITO'], dtype=object)
+    
+    def __init__(self, config=None, n_features=2 ** 18, epochs=5):
+        super().__init__(config)
+        self.vectorizer = HashingVectorizer(n_features=n_features, alternate_sign=False, stop_words='english')
+        self.model = self.new_model()
+        self.epochs = epochs
+    
+    @staticmethod
+    def new_model():
+        """SGDClassifier ainda não ajustado"""
+        return SGDClassifier(loss='log_loss', alpha=1e-5, random_state=42)
+    
+    def feature_matrix(self, df, update_scaler=False):
+        """Matriz esparsa do lote (com update_scaler o scaler absorve o lote antes)"""
+        X_text = self.build_text(df)
+        X_numeric = self.create_feature_frame(df, X_text)
+        if update_scaler:
+            self.scaler.partial_fit(X_numeric.values.astype(np.float64))
+        return self.combine_features(self.vectorizer.transform(X_text), X_numeric)
+    
+    def fit_epochs(self, X, y, epochs):
+        """Passadas de partial_fit em ordem embaralhada (reprodutível)"""
+        y = np.asarray(y, dtype=object)
+        rng = np.random.default_rng(42)
+        for _ in range(epochs):
+            order = rng.permutation(len(y))
+            self.model.partial_fit(X[order], y[order], classes=self.CLASSES)
+    
+    def treinar_modelo(self, df):
+        """
+        Treina o modelo do zero (várias passadas de partial_fit sobre o treino)
+        """
+        self.logger.info("Iniciando treinamento do modelo incremental...")
+        
+        df_training = self.create_training_data(df.copy()).reset_index(drop=True)
+        y = df_training['label']
+        train_idx, test_idx, y_train, y_test = train_test_split(
+            np.arange(len(y)), y, test_size=0.2, random_state=42, stratify=y
+        )
+        
+        self.scaler = StandardScaler(with_mean=False)
+        self.model = self.new_model()
+        self.sparse_features = True
+        X_train = self.feature_matrix(df_training.iloc[train_idx], update_scaler=True)
+        X_test = self.feature_matrix(df_training.iloc[test_idx])
+        self.fit_epochs(X_train, y_train, self.epochs)
+        self.record_training(df_training, self.create_feature_frame(df_training))
+        
+        y_pred = self.model.predict(X_test)
+        accuracy = accuracy_score(y_test, y_pred)
+        
+        self.logger.info(f"Acurácia do modelo: {accuracy:.3f}")
+        self.logger.info(f"Relatório de classificação:\n{classification_report(y_test, y_pred)}")
+        
+        self.predictor = self.compile_predictor(self.model)
+        self.is_trained = True
+        
+        return accuracy
+    
+    def atualizar_modelo(self, df, epochs=1):
+        """
+        Incorpora produtos novos ao modelo já treinado (partial_fit)
+        
+        Rótulos como em target_labels. Retorna a quantidade de produtos.
+        """
+        if not self.is_trained:
+            raise ValueError("Modelo não foi treinado ainda")
+        if not hasattr(self.model, 'partial_fit'):
+            raise ValueError("O modelo carregado não suporta aprendizado incremental")
+        if len(df) == 0:
+            return 0
+        
+        df = self.attach_catalog(df.reset_index(drop=True))
+        X = self.feature_matrix(df, update_scaler=True)
+        self.fit_epochs(X, self.target_labels(df), epochs)
+        self.predictor = self.compile_predictor(self.model)
+        self.new_model_version()
+        
+        self.logger.info(f"Modelo incremental atualizado com {len(df)} produtos")
+        return len(df)
+
 def main():
     """
     Função principal para testar o classificador
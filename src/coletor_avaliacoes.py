@@ -0,0 +1,274 @@
+"""
+Coletor incremental de avaliações da Amazon
+Percorre as avaliações de cada ASIN como um fluxo (mais recentes primeiro) e
+guarda um cursor por ASIN para que as próximas execuções busquem apenas
+avaliações novas
+"""
+import csv
+import json
+import logging
+import os
+import sys
+import time
+from datetime import datetime
+from amazon_webscraping import AmazonScraperV2
+from padroes_texto import RATING_PATTERN, parse_review_date
+
+REVIEWS_URL = "https://www.amazon.com.br/product-reviews/{asin}/?sortBy=recent&pageNumber={page}"
+
+REVIEW_FIELDS = [
+    'asin', 'review_id', 'review_date', 'rating', 'review_title',
+    'review_text', 'verified_purchase', 'scraped_at'
+]
+
+# Extrai todas as avaliações da página numa única chamada ao navegador
+REVIEWS_SCRIPT = """
+const text = (root, selector) => {
+    const node = root.querySelector(selector);
+    return node ? node.innerText.trim() : '';
+};
+return Array.from(document.querySelectorAll("[data-hook='review']")).map(review => ({
+    id: review.id,
+    date: text(review, "[data-hook='review-date']"),
+    rating: (review.querySelector("[data-hook='review-star-rating'] .a-icon-alt, [data-hook='cmps-review-star-rating'] .a-icon-alt") || {}).textContent || '',
+    title: text(review, "[data-hook='review-title'] span:not(.a-icon-alt)") || text(review, "[data-hook='review-title']"),
+    body: text(review, "[data-hook='review-body']"),
+    verified: !!review.querySelector("[data-hook='avp-badge']")
+}));
+"""
+
+
+class ReviewStore:
+    """
+    Armazenamento append-only das avaliações e cursor (high-water mark) por ASIN
+
+    O cursor guarda a data da avaliação mais recente já vista e os IDs vistos
+    nessa data, já que a Amazon só informa o dia da avaliação, além dos IDs
+    das avaliações cuja data não foi reconhecida (que a data do cursor não cobre).
+    Quando a coleta para em max_pages antes de alcançar a data do cursor, a data
+    fica onde estava e o cursor guarda em 'backfill' o trecho já coletado (datas
+    e IDs das pontas) e a página onde continuar na próxima execução.
+    """
+
+    def __init__(self, reviews_file="data/avaliacoes.csv", cursor_file="data/avaliacoes_cursor.json"):
+        self.reviews_file = reviews_file
+        self.cursor_file = cursor_file
+        self.cursors = {}
+        if os.path.exists(cursor_file):
+            with open(cursor_file, 'r', encoding='utf-8') as f:
+                self.cursors = json.load(f)
+
+    def get_cursor(self, asin):
+        """Cursor do ASIN ({'last_date', 'seen_ids', 'undated_ids', 'backfill'}) ou None se nunca coletado"""
+        return self.cursors.get(asin)
+
+    def append(self, reviews):
+        """Acrescenta avaliações ao final do arquivo (nunca reescreve linhas existentes)"""
+        if not reviews:
+            return
+        out_dir = os.path.dirname(self.reviews_file)
+        if out_dir:
+            os.makedirs(out_dir, exist_ok=True)
+        write_header = not os.path.exists(self.reviews_file)
+        with open(self.reviews_file, 'a', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=REVIEW_FIELDS)
+            if write_header:
+                writer.writeheader()
+            writer.writerows(reviews)
+
+    def advance_cursor(self, asin, reviews, complete=True, next_page=None):
+        """
+        Atualiza o cursor do ASIN com as avaliações recebidas e acrescenta os IDs
+        das avaliações sem data
+
+        complete: a coleta alcançou a data do cursor ou a última página. Só
+        então o cursor vai para a avaliação mais recente (do backfill, se havia
+        um); senão o trecho coletado e next_page ficam em 'backfill' para a
+        próxima execução.
+        """
+        cursor = self.cursors.get(asin) or {'last_date': None, 'seen_ids': []}
+
+        undated_ids = {r['review_id'] for r in reviews if not r['review_date']}
+        if undated_ids:
+            cursor['undated_ids'] = sorted(undated_ids | set(cursor.get('undated_ids', [])))
+
+        dated = [r for r in reviews if r['review_date']]
+        backfill = cursor.pop('backfill', None)
+        newest = date_mark(dated, max)
+        if backfill:
+            newest = merge_marks(newest, (backfill['newest_date'], backfill['newest_ids']), max)
+
+        if complete and newest:
+            newest_date, newest_ids = newest
+            if cursor['last_date'] is None or cursor['last_date'] < newest_date:
+                cursor['last_date'], cursor['seen_ids'] = newest_date, sorted(newest_ids)
+            elif cursor['last_date'] == newest_date:
+                cursor['seen_ids'] = sorted(set(newest_ids) | set(cursor['seen_ids']))
+        elif newest:
+            oldest = date_mark(dated, min)
+            page = next_page
+            if backfill:
+                oldest = merge_marks(oldest, (backfill['oldest_date'], backfill['oldest_ids']), min)
+                page = max(page, backfill['page'])
+            cursor['backfill'] = {
+                'newest_date': newest[0], 'newest_ids': sorted(newest[1]),
+                'oldest_date': oldest[0], 'oldest_ids': sorted(oldest[1]),
+                'page': page
+            }
+
+        if cursor['last_date'] is not None or cursor.get('undated_ids') or cursor.get('backfill'):
+            self.cursors[asin] = cursor
+
+    def save_cursors(self):
+        """Grava os cursores de forma atômica"""
+        out_dir = os.path.dirname(self.cursor_file)
+        if out_dir:
+            os.makedirs(out_dir, exist_ok=True)
+        tmp_file = self.cursor_file + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(self.cursors, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_file, self.cursor_file)
+
+
+def date_mark(reviews, pick):
+    """(data, IDs nessa data) da avaliação mais recente (pick=max) ou mais antiga (pick=min), ou None"""
+    if not reviews:
+        return None
+    date = pick(r['review_date'] for r in reviews)
+    return date, {r['review_id'] for r in reviews if r['review_date'] == date}
+
+
+def merge_marks(mark, other, pick):
+    """A mais recente/antiga de duas marcas (date_mark), juntando os IDs se a data for a mesma"""
+    if mark is None or other is None:
+        return other if mark is None else mark
+    if mark[0] == other[0]:
+        return mark[0], set(mark[1]) | set(other[1])
+    return mark if pick(mark[0], other[0]) == mark[0] else other
+
+
+class AmazonReviewScraper:
+    def __init__(self, scraper, store=None, max_pages=10, debug=False):
+        """
+        Inicializa o coletor de avaliações
+
+        scraper: AmazonScraperV2 já configurado (o driver é reaproveitado)
+        store: ReviewStore onde as avaliações e cursores são gravados
+        """
+        self.scraper = scraper
+        self.store = store or ReviewStore()
+        self.max_pages = max_pages
+        self.debug = debug
+        self.logger = logging.getLogger(__name__)
+
+    def fetch_page(self, asin, page):
+        """Avaliações brutas de uma página (uma única chamada ao navegador)"""
+        self.scraper.navigate(REVIEWS_URL.format(asin=asin, page=page))
+        time.sleep(2)  # Aguardar carregamento
+        return self.scraper.driver.execute_script(REVIEWS_SCRIPT) or []
+
+    def parse_review(self, asin, raw):
+        """Converte uma avaliação bruta no registro gravado"""
+        rating_match = RATING_PATTERN.search(raw.get('rating', ''))
+        return {
+            'asin': asin,
+            'review_id': raw.get('id', ''),
+            'review_date': parse_review_date(raw.get('date', '')),
+            'rating': float(rating_match.group(1).replace(',', '.')) if rating_match else None,
+            'review_title': raw.get('title', ''),
+            'review_text': raw.get('body', ''),
+            'verified_purchase': bool(raw.get('verified')),
+            'scraped_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        }
+
+    def stream_reviews(self, asin, progress=None):
+        """
+        Gera as avaliações do ASIN da mais recente para a mais antiga, página a
+        página, parando ao alcançar o cursor da última coleta
+
+        Avaliações com data não reconhecida não podem ser comparadas com a data
+        do cursor: são puladas se o ID já estiver entre os undated_ids. Com um
+        backfill pendente a leitura começa na página onde a execução anterior
+        parou (as avaliações novas do topo ficam para depois que ele terminar) e
+        pula as que ela já coletou, caso as páginas tenham se deslocado.
+        progress recebe 'complete' (alcançou o cursor ou a última página) e 'next_page'.
+        """
+        progress = progress if progress is not None else {}
+        progress['complete'] = False
+        cursor = self.store.get_cursor(asin) or {}
+        last_date = cursor.get('last_date')
+        seen_ids = set(cursor.get('seen_ids', []))
+        undated_ids = set(cursor.get('undated_ids', []))
+        backfill = cursor.get('backfill')
+
+        page = backfill['page'] if backfill else 1
+        for _ in range(self.max_pages):
+            raw_reviews = self.fetch_page(asin, page)
+            if not raw_reviews:
+                progress['complete'] = True
+                return
+
+            for raw in raw_reviews:
+                review = self.parse_review(asin, raw)
+                date, review_id = review['review_date'], review['review_id']
+                if not date:
+                    if review_id in undated_ids:
+                        continue
+                else:
+                    if last_date and date < last_date:
+                        progress['complete'] = True
+                        return
+                    if date == last_date and review_id in seen_ids:
+                        continue
+                    if backfill and (
+                        backfill['oldest_date'] < date < backfill['newest_date']
+                        or (date == backfill['newest_date'] and review_id in backfill['newest_ids'])
+                        or (date == backfill['oldest_date'] and review_id in backfill['oldest_ids'])
+                    ):
+                        continue
+                yield review
+            page += 1
+            progress['next_page'] = page
+
+    def collect(self, asin):
+        """Coleta as avaliações novas do ASIN e as grava no armazenamento"""
+        progress = {}
+        try:
+            new_reviews = list(self.stream_reviews(asin, progress))
+        except Exception as e:
+            # Sem gravar nada: o cursor fica onde estava e a próxima execução tenta de novo
+            self.logger.warning(f"Erro ao coletar avaliações de {asin}: {e}")
+            return []
+
+        # Gravar antes de avançar o cursor: uma falha aqui não perde avaliações
+        self.store.append(new_reviews)
+        self.store.advance_cursor(asin, new_reviews, progress['complete'], progress.get('next_page'))
+        if not progress['complete']:
+            self.logger.info(f"{asin}: coleta parou em {self.max_pages} páginas; continua da página {progress['next_page']} na próxima execução")
+
+        if self.debug:
+            self.logger.info(f"{len(new_reviews)} avaliações novas para {asin}")
+        return new_reviews
+
+    def collect_many(self, asins):
+        """Coleta avaliações novas de vários ASINs e grava os cursores"""
+        total = 0
+        for asin in dict.fromkeys(a for a in asins if a):
+            total += len(self.collect(asin))
+        self.store.save_cursors()
+        self.logger.info(f"Avaliações novas coletadas: {total}")
+        return total
+
+
+def main():
+    """Função principal para testar o coletor de avaliações (ASINs como argumentos)"""
+    scraper = AmazonScraperV2(headless=False, debug=True)
+    try:
+        collector = AmazonReviewScraper(scraper, max_pages=3, debug=True)
+        total = collector.collect_many(sys.argv[1:])
+        print(f"Avaliações novas: {total}")
+    finally:
+        scraper.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+"""
+Detecção de anúncios quase duplicados
+Assinaturas MinHash dos títulos e descrições e LSH (bandas de assinatura) para
+achar candidatos sem comparar todos os pares: cada produto cai num balde por
+banda, só os produtos do mesmo balde são comparados, e os pares com Jaccard
+estimado acima do limite são unidos num union-find. O resultado é um id de
+grupo por produto, em tempo aproximadamente linear no número de anúncios
+"""
+import re
+import zlib
+import numpy as np
+import pandas as pd
+from padroes_texto import normalize_text
+
+DEFAULT_DEDUPLICATION = {
+    "enabled": False,
+    "threshold": 0.7,
+    "num_perm": 128,
+    "bands": 32,
+    "shingle_size": 4,
+    "classify_per_cluster": False
+}
+
+WORD_PATTERN = re.compile(r'\w+')
+
+# Hashes por lote no cálculo das assinaturas (limita a matriz permutações x shingles)
+SIGNATURE_CHUNK_SHINGLES = 200000
+
+
+class UnionFind:
+    """Conjuntos disjuntos com compressão de caminho e união por tamanho"""
+
+    def __init__(self, n):
+        self.parent = list(range(n))
+        self.size = [1] * n
+
+    def add(self):
+        """Novo conjunto unitário; retorna o índice"""
+        self.parent.append(len(self.parent))
+        self.size.append(1)
+        return len(self.parent) - 1
+
+    def find(self, x):
+        root = x
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[x] != root:
+            self.parent[x], x = root, self.parent[x]
+        return root
+
+    def union(self, a, b):
+        a, b = self.find(a), self.find(b)
+        if a == b:
+            return a
+        if self.size[a] < self.size[b]:
+            a, b = b, a
+        self.parent[b] = a
+        self.size[a] += self.size[b]
+        return a
+
+
+class DuplicateDetector:
+    """
+    Agrupa anúncios quase duplicados por MinHash + LSH
+
+    Shingles: n-gramas de caracteres do título (shingle_size) e trigramas de
+    palavras da descrição. Com bands bandas de num_perm / bands linhas, pares
+    com Jaccard perto do limite já caem juntos em algum balde com alta
+    probabilidade; a confirmação usa a fração de posições iguais nas assinaturas.
+    """
+
+    def __init__(self, config=None):
+        config = config or {}
+        self.settings = {**DEFAULT_DEDUPLICATION, **config.get('deduplication', {})}
+        if self.settings['num_perm'] % self.settings['bands']:
+            raise ValueError("num_perm deve ser múltiplo de bands")
+        # Hash multiplica-e-desloca: (a * h + b) mod 2^64, 32 bits mais altos
+        rng = np.random.default_rng(42)
+        self.a = rng.integers(1, 2 ** 63, size=self.settings['num_perm'], dtype=np.uint64) | np.uint64(1)
+        self.b = rng.integers(0, 2 ** 63, size=self.settings['num_perm'], dtype=np.uint64)
+
+    def title_shingles(self, title):
+        """Hashes (CRC32, estáveis entre execuções) dos n-gramas de caracteres do título"""
+        k = self.settings['shingle_size']
+        title = ' '.join(WORD_PATTERN.findall(normalize_text(title)))
+        found = {title[i:i + k] for i in range(max(len(title) - k + 1, 1))} if title else set()
+        return [zlib.crc32(shingle.encode('utf-8')) for shingle in found]
+
+    @staticmethod
+    def description_shingles(description):
+        """Hashes dos trigramas de palavras da descrição (prefixados para não colidir com o título)"""
+        words = WORD_PATTERN.findall(normalize_text(description))
+        found = {'\x1f' + ' '.join(words[i:i + 3]) for i in range(len(words) - 2)}
+        return [zlib.crc32(shingle.encode('utf-8')) for shingle in found]
+
+    def minhash(self, shingle_lists):
+        """Assinaturas MinHash (uint32) de listas de hashes; listas vazias ficam com o valor máximo"""
+        lengths = np.array([len(s) for s in shingle_lists], dtype=np.int64)
+        signatures = np.full((len(shingle_lists), self.settings['num_perm']), np.iinfo(np.uint32).max, dtype=np.uint32)
+
+        # Lotes de listas: hashes concatenados e mínimo por lista com reduceat
+        rows = np.flatnonzero(lengths)
+        start = 0
+        while start < len(rows):
+            end = start + 1
+            total = lengths[rows[start]]
+            while end < len(rows) and total + lengths[rows[end]] <= SIGNATURE_CHUNK_SHINGLES:
+                total += lengths[rows[end]]
+                end += 1
+            chunk = rows[start:end]
+            hashes = np.fromiter((h for r in chunk for h in shingle_lists[r]), dtype=np.uint64, count=int(total))
+            permuted = ((self.a[:, None] * hashes[None, :] + self.b[:, None]) >> np.uint64(32)).astype(np.uint32)
+            offsets = np.concatenate([[0], np.cumsum(lengths[chunk])[:-1]])
+            signatures[chunk] = np.minimum.reduceat(permuted, offsets, axis=1).T
+            start = end
+        return signatures
+
+    def signatures(self, titles, descriptions):
+        """
+        Matriz de assinaturas MinHash (linhas x num_perm, uint32) e a máscara
+        de linhas sem texto (que não entram no LSH)
+
+        O MinHash da união é o mínimo dos MinHash das partes, então cada título
+        e cada descrição distintos são processados uma única vez.
+        """
+        title_ids = {title: i for i, title in enumerate(dict.fromkeys(titles))}
+        description_ids = {text: i for i, text in enumerate(dict.fromkeys(descriptions))}
+        title_shingles = [self.title_shingles(title) for title in title_ids]
+        description_shingles = [self.description_shingles(text) for text in description_ids]
+
+        title_rows = np.array([title_ids[title] for title in titles], dtype=np.int64)
+        description_rows = np.array([description_ids[text] for text in descriptions], dtype=np.int64)
+        signatures = np.minimum(self.minhash(title_shingles)[title_rows], self.minhash(description_shingles)[description_rows])
+        empty = (np.array([not s for s in title_shingles], dtype=bool)[title_rows]
+                 & np.array([not s for s in description_shingles], dtype=bool)[description_rows])
+        return signatures, empty
+
+    def candidate_pairs(self, signatures, empty):
+        """
+        Pares candidatos do LSH (pares repetidos entre bandas removidos)
+
+        Linhas com a mesma assinatura inteira são ligadas à primeira delas
+        (similaridade 1, sempre confirmadas). Entre assinaturas distintas, cada
+        balde de cada banda gera todos os seus pares: ligar só ao primeiro do
+        balde perderia os duplicados entre si quando o primeiro não passa na
+        confirmação.
+        """
+        rows = np.flatnonzero(~empty)
+        width = signatures.shape[1]
+        full = np.ascontiguousarray(signatures[rows]).view(np.dtype((np.void, signatures.dtype.itemsize * width))).ravel()
+        _, first, inverse = np.unique(full, return_index=True, return_inverse=True)
+        inverse = inverse.ravel()
+        linked = first[inverse] != np.arange(len(rows))
+        pairs = [np.column_stack([rows[first[inverse[linked]]], rows[linked]])]
+
+        distinct = rows[np.sort(first)]
+        n_rows = self.settings['num_perm'] // self.settings['bands']
+        for band in range(self.settings['bands']):
+            block = np.ascontiguousarray(signatures[distinct, band * n_rows:(band + 1) * n_rows])
+            keys = block.view(np.dtype((np.void, block.dtype.itemsize * n_rows))).ravel()
+            order = np.argsort(keys, kind='stable')
+            sorted_keys = keys[order]
+            # Fim do balde de cada posição na ordem por chave
+            starts = np.flatnonzero(np.concatenate([[True], sorted_keys[1:] != sorted_keys[:-1]]))
+            ends = np.repeat(np.append(starts[1:], len(keys)), np.diff(np.append(starts, len(keys))))
+            # Cada posição é pareada com as seguintes do mesmo balde
+            partners = ends - np.arange(len(keys)) - 1
+            left = np.repeat(np.arange(len(keys)), partners)
+            right = left + 1 + np.arange(partners.sum()) - np.repeat(np.cumsum(partners) - partners, partners)
+            pairs.append(np.column_stack([distinct[order[left]], distinct[order[right]]]))
+        pairs = np.concatenate(pairs)
+        if not len(pairs):
+            return np.zeros((0, 2), dtype=np.int64)
+        pairs = np.sort(pairs, axis=1)
+        # Par (a, b) como um único inteiro para remover repetidos com um sort 1D
+        codes = np.unique(pairs[:, 0] * len(signatures) + pairs[:, 1])
+        return np.column_stack([codes // len(signatures), codes % len(signatures)])
+
+    def cluster_ids(self, df):
+        """
+        Id do grupo de cada linha (0, 1, ... na ordem da primeira aparição) e o
+        número de pares confirmados
+        """
+        def column(field):
+            if field not in df.columns:
+                return [''] * len(df)
+            return df[field].astype(object).where(df[field].notna(), '').map(str).tolist()
+
+        return self.clusters(*self.signatures(column('title'), column('description')))
+
+    def clusters(self, signatures, empty):
+        """Grupos (como em cluster_ids) a partir das assinaturas: pares do LSH confirmados pela similaridade"""
+        pairs = self.candidate_pairs(signatures, empty)
+        similarity = (signatures[pairs[:, 0]] == signatures[pairs[:, 1]]).mean(axis=1) if len(pairs) else np.zeros(0)
+        confirmed = pairs[similarity >= self.settings['threshold']]
+
+        groups = UnionFind(len(signatures))
+        for a, b in confirmed.tolist():
+            groups.union(a, b)
+        roots = np.array([groups.find(i) for i in range(len(signatures))], dtype=np.int64)
+        _, ids = np.unique(roots, return_inverse=True)
+        # Renumera na ordem da primeira linha de cada grupo
+        _, first = np.unique(ids, return_index=True)
+        order = np.empty(len(first), dtype=np.int64)
+        order[np.argsort(first)] = np.arange(len(first))
+        return order[ids], len(confirmed)
+
+    def annotate(self, df):
+        """Acrescenta duplicate_cluster (id do grupo) e cluster_size (anúncios no grupo)"""
+        ids, _ = self.cluster_ids(df)
+        df['duplicate_cluster'] = ids
+        df['cluster_size'] = np.bincount(ids, minlength=1)[ids] if len(ids) else ids
+        return df
+
+
+def score_per_cluster(df, score):
+    """
+    Pontua um anúncio por grupo (o primeiro) com score(df) -> df e copia as
+    colunas de predição criadas por ele para os demais anúncios do grupo
+    """
+    representatives = ~df['duplicate_cluster'].duplicated()
+    scored = score(df[representatives.to_numpy()].copy())
+    columns = [c for c in scored.columns if c.startswith('ai_')]
+    by_cluster = scored.set_index('duplicate_cluster')[columns]
+    for column in columns:
+        df[column] = by_cluster[column].reindex(df['duplicate_cluster']).to_numpy()
+    return df
+
+
+def cluster_summary(df, min_size=2):
+    """
+    Grupos com pelo menos min_size anúncios, do maior para o menor: anúncios,
+    vendedores distintos, um título de exemplo, predição mais comum e, se já
+    houver análise de risco, o maior score
+    """
+    if 'duplicate_cluster' not in df.columns or len(df) == 0:
+        return pd.DataFrame()
+    repeated = df[df['cluster_size'] >= min_size]
+    if len(repeated) == 0:
+        return pd.DataFrame()
+    if 'seller' not in repeated.columns:
+        repeated = repeated.assign(seller='')
+    groups = repeated.groupby('duplicate_cluster')
+    summary = groups.agg(listings=('title', 'size'), sellers=('seller', 'nunique'), title=('title', 'first'))
+    if 'ai_prediction' in df.columns:
+        summary['ai_prediction'] = groups['ai_prediction'].agg(lambda s: s.mode().iloc[0])
+    if 'risk_score' in df.columns:
+        summary['max_risk_score'] = groups['risk_score'].max()
+    return summary.sort_values(['listings', 'sellers'], ascending=False).reset_index()
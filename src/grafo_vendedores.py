@@ -0,0 +1,224 @@
+"""
+Grafo de vendedores, anúncios e grupos de duplicatas
+Vendedores, anúncios (ASIN, senão URL ou título) e grupos de anúncios quase
+duplicados são nós; cada produto analisado liga o vendedor ao anúncio e o
+anúncio ao seu grupo. As componentes conexas (union-find persistente) revelam
+contas que compartilham anúncios ou títulos, e o risco dos anúncios suspeitos
+é propagado pelas arestas (multiplicação esparsa), para destacar no relatório
+as redes de vendedores de maior risco. O grafo fica em SQLite e cada execução
+só acrescenta os nós e arestas novos
+
+Uso: python src/grafo_vendedores.py [--top 20]
+"""
+import argparse
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from duplicatas import UnionFind
+from persistencia import SQLiteStore, load_config
+from reputacao_vendedores import SellerReputationStore, seller_key
+
+DEFAULT_SELLER_GRAPH = {
+    "enabled": False,
+    "file": "resultados/grafo_vendedores.sqlite",
+    "propagation": 0.5,
+    "iterations": 20,
+    "min_sellers": 2,
+    "ring_risk_threshold": 0.5
+}
+
+class SellerGraph(SQLiteStore):
+    """
+    Grafo persistente com union-find e propagação de risco
+
+    O risco a priori de um anúncio é 1 se a última predição foi SUSPEITO e 0
+    caso contrário. A propagação repete, nos anúncios,
+    risco = (1 - propagation) * a_priori + propagation * média dos vizinhos,
+    e nos vendedores e grupos só a média dos vizinhos: um vendedor herda o
+    risco dos anúncios que vende e, através deles, dos outros vendedores da
+    mesma rede.
+    """
+
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS nodes ("
+        "id INTEGER PRIMARY KEY, name TEXT UNIQUE, kind TEXT, parent INTEGER, size INTEGER, prior REAL)",
+        "CREATE TABLE IF NOT EXISTS edges (a INTEGER, b INTEGER, PRIMARY KEY (a, b)) WITHOUT ROWID"
+    )
+
+    def __init__(self, graph_file="resultados/grafo_vendedores.sqlite", propagation=0.5, iterations=20):
+        super().__init__(graph_file)
+        self.graph_file = graph_file
+        self.propagation = propagation
+        self.iterations = iterations
+        self.ids = None
+
+    def load(self):
+        """Carrega nós, union-find e arestas em memória (uma vez)"""
+        if self.ids is not None:
+            return
+        nodes = self.connection.execute("SELECT name, kind, parent, size, prior FROM nodes ORDER BY id").fetchall()
+        self.ids = {name: i for i, (name, _, _, _, _) in enumerate(nodes)}
+        self.kinds = [kind for _, kind, _, _, _ in nodes]
+        self.groups = UnionFind(0)
+        self.groups.parent = [parent for _, _, parent, _, _ in nodes]
+        self.groups.size = [size for _, _, _, size, _ in nodes]
+        self.prior = [prior for _, _, _, _, prior in nodes]
+        edges = np.array(self.connection.execute("SELECT a, b FROM edges").fetchall(), dtype=np.int64).reshape(-1, 2)
+        self.edge_a = edges[:, 0].tolist()
+        self.edge_b = edges[:, 1].tolist()
+        self.edge_set = set(zip(self.edge_a, self.edge_b))
+        self._saved = (len(nodes), list(self.groups.parent), list(self.groups.size), list(self.prior))
+
+    def node(self, name, kind):
+        """Id do nó, criando-o se for novo"""
+        node_id = self.ids.get(name)
+        if node_id is None:
+            node_id = self.ids[name] = self.groups.add()
+            self.kinds.append(kind)
+            self.prior.append(0.0)
+        return node_id
+
+    def add_edge(self, a, b):
+        """Aresta não direcionada (guardada uma vez, com a < b) e união das componentes"""
+        if a > b:
+            a, b = b, a
+        if a != b and (a, b) not in self.edge_set:
+            self.edge_set.add((a, b))
+            self.edge_a.append(a)
+            self.edge_b.append(b)
+            self.groups.union(a, b)
+
+    def update(self, df):
+        """
+        Acrescenta os produtos analisados (seller, identificação do anúncio,
+        ai_prediction e, se houver, duplicate_cluster) e grava só o que mudou
+
+        Retorna o número de arestas novas.
+        """
+        if len(df) == 0 or 'seller' not in df.columns:
+            return 0
+        self.load()
+        n_edges = len(self.edge_a)
+
+        sellers = df['seller'].astype(object).where(df['seller'].notna(), '').map(str)
+        seller_names = sellers.map({name: seller_key(name) for name in sellers.unique()}).tolist()
+        listings = SellerReputationStore.listing_keys(df).tolist()
+        suspicious = (df['ai_prediction'] == 'SUSPEITO').tolist() if 'ai_prediction' in df.columns else [False] * len(df)
+
+        # Grupo de duplicatas identificado pelo menor anúncio do grupo (estável entre execuções)
+        clusters = [None] * len(df)
+        if 'duplicate_cluster' in df.columns:
+            frame = pd.DataFrame({'cluster': df['duplicate_cluster'].to_numpy(), 'listing': listings})
+            frame = frame[frame['listing'] != '']
+            sizes = frame['cluster'].map(frame['cluster'].value_counts())
+            names = frame[sizes > 1].groupby('cluster')['listing'].min()
+            clusters = df['duplicate_cluster'].map(names).tolist()
+
+        for seller, listing, is_suspicious, cluster in zip(seller_names, listings, suspicious, clusters):
+            if not listing:
+                continue
+            listing_id = self.node('listing:' + listing, 'listing')
+            self.prior[listing_id] = 1.0 if is_suspicious else 0.0
+            if seller:
+                self.add_edge(self.node('seller:' + seller, 'seller'), listing_id)
+            if isinstance(cluster, str):
+                self.add_edge(self.node('cluster:' + cluster, 'cluster'), listing_id)
+
+        self.save(n_edges)
+        return len(self.edge_a) - n_edges
+
+    def save(self, n_edges):
+        """Grava nós novos, nós cujo pai/tamanho/risco mudou e as arestas a partir de n_edges"""
+        n_saved, parent, size, prior = self._saved
+        names = [None] * len(self.kinds)
+        for name, node_id in self.ids.items():
+            names[node_id] = name
+        current = (self.groups.parent, self.groups.size, self.prior)
+        changed = [
+            i for i in range(n_saved)
+            if current[0][i] != parent[i] or current[1][i] != size[i] or current[2][i] != prior[i]
+        ]
+        rows = [
+            (i, names[i], self.kinds[i], current[0][i], current[1][i], current[2][i])
+            for i in changed + list(range(n_saved, len(self.kinds)))
+        ]
+        with self.connection as connection:
+            connection.executemany("INSERT OR REPLACE INTO nodes VALUES (?, ?, ?, ?, ?, ?)", rows)
+            connection.executemany("INSERT OR IGNORE INTO edges VALUES (?, ?)", zip(self.edge_a[n_edges:], self.edge_b[n_edges:]))
+        self._saved = (len(self.kinds), list(self.groups.parent), list(self.groups.size), list(self.prior))
+
+    def components(self):
+        """Raiz da componente de cada nó"""
+        self.load()
+        return np.array([self.groups.find(i) for i in range(len(self.kinds))], dtype=np.int64)
+
+    def risk(self):
+        """Risco propagado de cada nó (iterações sobre a matriz de adjacência normalizada por linha)"""
+        self.load()
+        n = len(self.kinds)
+        prior = np.asarray(self.prior, dtype=np.float64)
+        if n == 0 or not self.edge_a:
+            return prior
+        a = np.asarray(self.edge_a, dtype=np.int64)
+        b = np.asarray(self.edge_b, dtype=np.int64)
+        adjacency = sp.csr_matrix((np.ones(2 * len(a)), (np.concatenate([a, b]), np.concatenate([b, a]))), shape=(n, n))
+        degree = np.asarray(adjacency.sum(axis=1)).ravel()
+        transition = sp.diags(1.0 / np.maximum(degree, 1)) @ adjacency
+        # Só os anúncios têm evidência própria; vendedores e grupos são a média dos vizinhos
+        anchor = np.where(np.asarray(self.kinds, dtype=object) == 'listing', self.propagation, 1.0)
+        risk = prior.copy()
+        for _ in range(self.iterations):
+            risk = (1 - anchor) * prior + anchor * (transition @ risk)
+        return risk
+
+    def rings(self, min_sellers=2):
+        """
+        Componentes com pelo menos min_sellers vendedores, do maior risco para
+        o menor: vendedores (os de maior risco primeiro), anúncios, grupos de
+        duplicatas, fração de anúncios suspeitos e risco (maior entre os vendedores)
+        """
+        self.load()
+        if not self.kinds:
+            return pd.DataFrame()
+        names = [None] * len(self.kinds)
+        for name, node_id in self.ids.items():
+            names[node_id] = name.split(':', 1)[1]
+        nodes = pd.DataFrame({
+            'component': self.components(),
+            'kind': self.kinds,
+            'name': names,
+            'prior': self.prior,
+            'risk': self.risk()
+        })
+        sellers = nodes[nodes['kind'] == 'seller'].sort_values('risk', ascending=False)
+        listings = nodes[nodes['kind'] == 'listing'].groupby('component')
+        summary = sellers.groupby('component').agg(
+            n_sellers=('name', 'size'),
+            sellers=('name', lambda s: ', '.join(s.head(5))),
+            risk=('risk', 'max')
+        )
+        summary = summary[summary['n_sellers'] >= min_sellers]
+        summary['listings'] = listings.size().reindex(summary.index).fillna(0).astype(int)
+        summary['suspicious_share'] = listings['prior'].mean().reindex(summary.index).fillna(0.0)
+        summary['clusters'] = (nodes['kind'] == 'cluster').groupby(nodes['component']).sum().reindex(summary.index).astype(int)
+        return summary.sort_values(['risk', 'n_sellers'], ascending=False).reset_index()
+
+
+def main():
+    """Lista as redes de vendedores de maior risco"""
+    config = load_config()
+    settings = {**DEFAULT_SELLER_GRAPH, **config.get('seller_graph', {})}
+    parser = argparse.ArgumentParser(description="Redes de vendedores no grafo vendedor-anúncio")
+    parser.add_argument('--top', type=int, default=20, help="redes listadas")
+    args = parser.parse_args()
+
+    graph = SellerGraph(settings['file'], settings['propagation'], settings['iterations'])
+    rings = graph.rings(settings['min_sellers'])
+    if len(rings) == 0:
+        print(f"Nenhuma rede com {settings['min_sellers']} ou mais vendedores em {settings['file']}")
+        return
+    with pd.option_context('display.width', 200, 'display.max_columns', None, 'display.max_colwidth', 80):
+        print(rings.head(args.top).round(3).to_string(index=False))
+
+if __name__ == "__main__":
+    main()
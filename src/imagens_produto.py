@@ -0,0 +1,253 @@
+"""
+Imagens dos produtos
+Baixa a imagem principal de cada anúncio (cache em disco por URL), calcula o
+hash perceptual (pHash: DCT da imagem reduzida a 32x32 em tons de cinza, 64
+bits) e procura, numa BK-tree, as imagens de referência a poucos bits de
+distância: fotos oficiais HP e fotos de anúncios piratas já confirmados. A
+mesma foto reaproveitada, recortada ou recomprimida por outro vendedor fica a
+poucos bits da original, e a BK-tree evita comparar com todas as referências
+
+Uso: python src/imagens_produto.py <url ou arquivo> [...]
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+import requests
+from PIL import Image
+from scipy.fft import dct
+from amazon_webscraping_async import USER_AGENT
+from persistencia import load_config
+
+DEFAULT_IMAGE_MATCHING = {
+    "enabled": False,
+    "cache_dir": "data/imagens",
+    "references_file": "data/imagens_referencia.csv",
+    "max_distance": 10,
+    "max_workers": 8,
+    "request_timeout": 15
+}
+
+# Lado da imagem reduzida e do bloco de baixas frequências usado no hash
+PHASH_IMAGE_SIZE = 32
+PHASH_SIZE = 8
+
+
+def phash(image):
+    """Hash perceptual de 64 bits (int) de uma imagem PIL"""
+    pixels = np.asarray(
+        image.convert('L').resize((PHASH_IMAGE_SIZE, PHASH_IMAGE_SIZE), Image.Resampling.LANCZOS), dtype=np.float64
+    )
+    low = dct(dct(pixels, axis=0, norm='ortho'), axis=1, norm='ortho')[:PHASH_SIZE, :PHASH_SIZE]
+    return int.from_bytes(np.packbits(low > np.median(low)).tobytes(), 'big')
+
+
+def hamming(a, b):
+    """Bits diferentes entre dois hashes"""
+    return bin(a ^ b).count('1')
+
+
+class BKTree:
+    """
+    Árvore BK sobre a distância de Hamming
+
+    Cada filho fica na aresta da sua distância ao pai; na busca, pela
+    desigualdade triangular, só as arestas entre d - raio e d + raio podem
+    levar a hashes dentro do raio.
+    """
+
+    def __init__(self):
+        self.root = None
+        self.size = 0
+
+    def add(self, value, item):
+        """Acrescenta o hash com o item associado (hashes iguais compartilham o nó)"""
+        self.size += 1
+        if self.root is None:
+            self.root = (value, [item], {})
+            return
+        node = self.root
+        while True:
+            distance = hamming(value, node[0])
+            if distance == 0:
+                node[1].append(item)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = (value, [item], {})
+                return
+            node = child
+
+    def search(self, value, radius):
+        """Itens a no máximo radius bits do hash, como (distância, item), do mais próximo ao mais distante"""
+        if self.root is None:
+            return []
+        found = []
+        stack = [self.root]
+        while stack:
+            node_value, items, children = stack.pop()
+            distance = hamming(value, node_value)
+            if distance <= radius:
+                found.extend((distance, item) for item in items)
+            stack.extend(child for edge, child in children.items() if distance - radius <= edge <= distance + radius)
+        return sorted(found, key=lambda match: match[0])
+
+    def __len__(self):
+        return self.size
+
+
+class ImageCache:
+    """
+    Imagens baixadas em disco (um arquivo por URL) e hashes já calculados
+    (hashes.json), para que execuções seguintes não baixem nem decodifiquem
+    de novo as mesmas fotos
+    """
+
+    def __init__(self, cache_dir="data/imagens", request_timeout=15, max_workers=8):
+        self.cache_dir = cache_dir
+        self.request_timeout = request_timeout
+        self.max_workers = max_workers
+        self.index_file = os.path.join(cache_dir, 'hashes.json')
+        self.hashes = {}
+        if os.path.exists(self.index_file):
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                self.hashes = json.load(f)
+        self.logger = logging.getLogger(__name__)
+
+    def path_for(self, url):
+        """Arquivo da imagem no cache"""
+        return os.path.join(self.cache_dir, hashlib.blake2b(url.encode('utf-8'), digest_size=16).hexdigest() + '.img')
+
+    def fetch(self, url):
+        """Caminho da imagem (baixada se ainda não estiver no cache), ou None se falhar"""
+        if os.path.exists(url):
+            return url
+        path = self.path_for(url)
+        if os.path.exists(path):
+            return path
+        try:
+            response = requests.get(url, headers={"User-Agent": USER_AGENT}, timeout=self.request_timeout)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            self.logger.warning(f"Erro ao baixar imagem {url}: {e}")
+            return None
+        os.makedirs(self.cache_dir, exist_ok=True)
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, 'wb') as f:
+            f.write(response.content)
+        os.replace(temporary, path)
+        return path
+
+    def hash_of(self, url):
+        """pHash da imagem da URL (ou arquivo local), ou None se não der para baixar/abrir"""
+        path = self.fetch(url)
+        if path is None:
+            return None
+        try:
+            with Image.open(path) as image:
+                return phash(image)
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Imagem inválida {url}: {e}")
+            return None
+
+    def hashes_for(self, urls):
+        """
+        pHash de cada URL ({url: int ou None}); só as URLs fora do índice são
+        baixadas e processadas, em paralelo (max_workers threads)
+        """
+        missing = [url for url in dict.fromkeys(urls) if url not in self.hashes]
+        if missing:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                for url, value in zip(missing, pool.map(self.hash_of, missing)):
+                    if value is not None:
+                        self.hashes[url] = f"{value:016x}"
+            self.save_index()
+        return {url: int(self.hashes[url], 16) if url in self.hashes else None for url in urls}
+
+    def save_index(self):
+        """Grava o índice de hashes"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        temporary = f"{self.index_file}.{os.getpid()}.tmp"
+        with open(temporary, 'w', encoding='utf-8') as f:
+            json.dump(self.hashes, f)
+        os.replace(temporary, self.index_file)
+
+
+class ImageMatcher:
+    """
+    Compara a imagem principal dos anúncios com as imagens de referência
+
+    references_file: CSV com as colunas image (URL ou caminho) e label
+    (ORIGINAL para fotos oficiais, SUSPEITO para fotos de anúncios piratas).
+    """
+
+    def __init__(self, config=None):
+        config = config or {}
+        self.settings = {**DEFAULT_IMAGE_MATCHING, **config.get('image_matching', {})}
+        self.cache = ImageCache(self.settings['cache_dir'], self.settings['request_timeout'], self.settings['max_workers'])
+        self.logger = logging.getLogger(__name__)
+        self.references = BKTree()
+        self.load_references(self.settings['references_file'])
+
+    def load_references(self, references_file):
+        """Monta a BK-tree com os hashes das imagens de referência"""
+        if not os.path.exists(references_file):
+            self.logger.warning(f"Imagens de referência {references_file} não encontradas; comparação de imagens indisponível")
+            return
+        references = pd.read_csv(references_file, dtype=str).dropna(subset=['image', 'label'])
+        hashes = self.cache.hashes_for(references['image'].tolist())
+        for image, label in zip(references['image'], references['label']):
+            if hashes[image] is not None:
+                self.references.add(hashes[image], (label.strip().upper(), image))
+        self.logger.info(f"{len(self.references)} imagens de referência carregadas de {references_file}")
+
+    def nearest(self, value):
+        """(distância, rótulo, referência) da referência mais próxima dentro de max_distance, ou None"""
+        matches = self.references.search(value, self.settings['max_distance'])
+        if not matches:
+            return None
+        distance, (label, image) = matches[0]
+        return distance, label, image
+
+    def annotate(self, df):
+        """
+        Acrescenta image_hash (hex), image_distance (bits até a referência mais
+        próxima, NaN se nenhuma), image_match (rótulo da referência ou '') e
+        image_reference a partir da coluna image_url
+        """
+        urls = [''] * len(df)
+        if 'image_url' in df.columns:
+            urls = df['image_url'].astype(object).where(df['image_url'].notna(), '').map(str).str.strip().tolist()
+        hashes = self.cache.hashes_for([url for url in urls if url])
+        nearest = {value: self.nearest(value) for value in set(hashes.values()) if value is not None}
+
+        rows = [(hashes[url], nearest.get(hashes[url])) if url else (None, None) for url in urls]
+        df['image_hash'] = [f"{value:016x}" if value is not None else '' for value, _ in rows]
+        df['image_distance'] = [float(match[0]) if match else np.nan for _, match in rows]
+        df['image_match'] = [match[1] if match else '' for _, match in rows]
+        df['image_reference'] = [match[2] if match else '' for _, match in rows]
+        return df
+
+
+def main():
+    """Mostra o pHash das imagens e as referências mais próximas"""
+    parser = argparse.ArgumentParser(description="Hash perceptual e busca nas imagens de referência")
+    parser.add_argument('images', nargs='+', help="URLs ou arquivos de imagem")
+    args = parser.parse_args()
+
+    matcher = ImageMatcher(load_config())
+    for image, value in matcher.cache.hashes_for(args.images).items():
+        if value is None:
+            print(f"{image}: não foi possível abrir a imagem")
+            continue
+        matches = matcher.references.search(value, matcher.settings['max_distance'])
+        print(f"{image}: {value:016x}")
+        for distance, (label, reference) in matches[:5]:
+            print(f"  {distance:2d} bits  {label:<9} {reference}")
+
+if __name__ == "__main__":
+    main()
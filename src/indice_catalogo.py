@@ -0,0 +1,273 @@
+"""
+Índice do catálogo oficial HP
+Carrega data/catalogo.csv uma vez e monta tabelas de consulta por PN e por
+(modelo, XL, cor), além de expressões regulares compiladas para encontrar PNs e
+modelos nos títulos e especificações, e um índice de n-gramas de caracteres
+para os títulos que não citam PN nem modelo de forma reconhecível. Cada produto
+recebe matched_pn, catalog_family, suggested_price e price_ratio numa única passada
+"""
+import logging
+import os
+import re
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import TfidfVectorizer
+from padroes_texto import build_trie_pattern, normalize_text
+
+CATALOG_COLUMNS = {
+    'PN': 'pn',
+    'Familia': 'family',
+    'Produto': 'product',
+    'Média de Páginas Impressas': 'page_yield',
+    'Preço Sugerido': 'suggested_price'
+}
+
+# Cores como aparecem nos anúncios e no catálogo (texto já normalizado)
+COLOR_PATTERNS = {
+    'preto': r'pret[oa]s?|prelo|black',
+    'colorido': r'tri-?colou?r|colorid[oa]s?|colou?r',
+    'ciano': r'cian[oa]|cyan',
+    'magenta': r'magenta',
+    'amarelo': r'amarel[oa]|yellow'
+}
+
+# Modelo no nome do produto do catálogo ("HP 667XL", "964XL", "HP GT53", "HP 60B")
+CATALOG_MODEL_PATTERN = re.compile(r'(?<![\w])(gt\s?\d{2}|\d{2,3}b?)(\s?xl)?(?![\w])')
+
+# Similaridade mínima (cosseno dos n-gramas) para aceitar o SKU mais próximo
+FUZZY_MIN_SIMILARITY = 0.6
+
+# Palavras com n-gramas guardados entre chamadas (o servidor do modelo vive por muito tempo)
+FUZZY_WORD_CACHE_SIZE = 50000
+
+
+def parse_decimal(value):
+    """Número no formato brasileiro ("1.234,9" -> 1234.9)"""
+    return float(str(value).strip().replace('.', '').replace(',', '.'))
+
+
+def compact_model(model):
+    """Modelo sem espaços ("gt 53" -> "gt53")"""
+    return re.sub(r'\s+', '', model)
+
+
+class FuzzyCatalogMatcher:
+    """
+    Vizinho mais próximo por n-gramas de caracteres (TF-IDF, 3 a 4 caracteres)
+
+    Com analyzer='char_wb' os n-gramas de um texto são a soma dos n-gramas de
+    cada palavra, então os títulos viram uma matriz títulos x palavras que,
+    multiplicada pela matriz palavras x n-gramas (cada palavra analisada uma
+    única vez), dá as mesmas contagens do TfidfVectorizer sem analisar título a
+    título. O resultado é comparado com os nomes do catálogo num único produto
+    esparso. Os n-gramas de cada palavra já analisada ficam guardados entre
+    chamadas até max_words (passando disso o cache recomeça na chamada
+    seguinte), mas as matrizes de cada chamada só têm as palavras dos seus
+    títulos, então o custo de um título não cresce com o cache.
+    """
+
+    def __init__(self, names, max_words=FUZZY_WORD_CACHE_SIZE):
+        self.vectorizer = TfidfVectorizer(analyzer='char_wb', ngram_range=(3, 4), sublinear_tf=True)
+        self.catalog_vectors = self.vectorizer.fit_transform([normalize_text(name) for name in names]).T.tocsc()
+        self.analyzer = self.vectorizer.build_analyzer()
+        self.vocabulary = self.vectorizer.vocabulary_
+        self.idf = self.vectorizer.idf_
+        self.max_words = max_words
+        self.words = {}
+
+    def word_ngrams(self, word):
+        """Índices dos n-gramas da palavra no vocabulário, analisados na primeira vez que ela aparece"""
+        ngrams = self.words.get(word)
+        if ngrams is None:
+            ngrams = self.words[word] = [self.vocabulary[ngram] for ngram in self.analyzer(word) if ngram in self.vocabulary]
+        return ngrams
+
+    def transform(self, titles):
+        """Matriz TF-IDF (CSR, norma l2) dos títulos, igual a vectorizer.transform"""
+        if len(self.words) > self.max_words:
+            self.words = {}
+        # Palavras desta chamada, numeradas na ordem em que aparecem
+        batch_words = {}
+        indptr = [0]
+        word_ids = []
+        for title in titles:
+            word_ids.extend(batch_words.setdefault(word, len(batch_words)) for word in title.split())
+            indptr.append(len(word_ids))
+        title_words = sp.csr_matrix(
+            (np.ones(len(word_ids)), np.asarray(word_ids, dtype=np.int64), np.asarray(indptr, dtype=np.int64)),
+            shape=(len(titles), len(batch_words))
+        )
+        ngrams = [self.word_ngrams(word) for word in batch_words]
+        ngram_lengths = [len(indices) for indices in ngrams]
+        ngram_matrix = sp.csr_matrix(
+            (np.ones(sum(ngram_lengths)), np.fromiter((i for indices in ngrams for i in indices), dtype=np.int64),
+             np.concatenate([[0], np.cumsum(ngram_lengths)]).astype(np.int64)),
+            shape=(len(batch_words), len(self.vocabulary))
+        )
+        counts = (title_words @ ngram_matrix).tocsr()
+        counts.sum_duplicates()
+        np.log(counts.data, counts.data)
+        counts.data += 1.0
+        counts.data *= self.idf[counts.indices]
+        norms = np.sqrt(np.asarray(counts.multiply(counts).sum(axis=1)).ravel())
+        norms[norms == 0] = 1.0
+        return sp.diags(1.0 / norms) @ counts
+
+    def nearest(self, titles):
+        """Linha do catálogo mais parecida com cada título (já normalizado) e a similaridade"""
+        if not titles:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        similarity = (self.transform(titles) @ self.catalog_vectors).tocsr()
+        rows = np.asarray(similarity.argmax(axis=1)).ravel()
+        return rows, similarity.max(axis=1).toarray().ravel()
+
+
+class CatalogIndex:
+    """
+    Consulta do catálogo por PN (núcleo de 5 caracteres, qualquer sufixo de
+    região: 3YM79AB e 3ym79al são o mesmo cartucho) e por (modelo, XL, cor)
+    """
+
+    def __init__(self, catalog, min_similarity=FUZZY_MIN_SIMILARITY):
+        self.catalog = catalog.drop_duplicates('pn').reset_index(drop=True)
+        self.min_similarity = min_similarity
+        self.fuzzy = FuzzyCatalogMatcher(self.catalog['product'])
+        self.by_pn = {pn[:5].lower(): row for row, pn in enumerate(self.catalog['pn'])}
+        self.pn_pattern = re.compile(r'(?<![\w])(' + build_trie_pattern(sorted(self.by_pn)) + r')[a-z]{2}(?![\w])')
+        self.color_patterns = {color: re.compile(r'(?<![\w])(?:' + pattern + r')(?![\w])') for color, pattern in COLOR_PATTERNS.items()}
+
+        # Chaves (modelo, XL, cor) a partir do nome de cada produto do catálogo
+        self.by_key = {}
+        for row, product in enumerate(self.catalog['product']):
+            mentions = self.models_in(normalize_text(product))
+            colors = self.colors_in(normalize_text(product))
+            if len(mentions) == 1 and len(colors) <= 1:
+                model, xl = mentions[0]
+                self.by_key.setdefault((model, xl, next(iter(colors), None)), row)
+        # Sem cor no anúncio vale o cartucho mais barato do modelo (razão de preço conservadora)
+        prices = self.catalog['suggested_price']
+        for (model, xl, _), row in sorted(self.by_key.items(), key=lambda item: prices[item[1]], reverse=True):
+            self.by_key[(model, xl, None)] = row
+        models = sorted({model for model, _, _ in self.by_key}, key=len, reverse=True)
+        self.model_pattern = re.compile(
+            r'(?<![\w])(' + '|'.join(re.escape(m).replace('gt', r'gt\s?') for m in models) + r')(\s?xl)?(?![\w])'
+        )
+
+    @classmethod
+    def load(cls, catalog_file="data/catalogo.csv"):
+        """Lê o CSV do catálogo (preços com vírgula decimal)"""
+        catalog = pd.read_csv(catalog_file, dtype=str).rename(columns=CATALOG_COLUMNS)
+        catalog['pn'] = catalog['pn'].str.strip().str.upper()
+        catalog['suggested_price'] = catalog['suggested_price'].map(parse_decimal)
+        return cls(catalog)
+
+    @staticmethod
+    def models_in(text):
+        """Modelos mencionados no texto do catálogo, como (modelo, xl)"""
+        return [(compact_model(model), bool(xl)) for model, xl in CATALOG_MODEL_PATTERN.findall(text)]
+
+    def colors_in(self, text):
+        """Cores mencionadas no texto"""
+        return {color for color, pattern in self.color_patterns.items() if pattern.search(text)}
+
+    def match_text(self, text, description=''):
+        """
+        Linhas do catálogo que correspondem ao anúncio (tupla vazia se nenhuma)
+
+        PNs no título, no modelo ou nas especificações têm prioridade; sem eles
+        vale o modelo mencionado (XL se alguma menção for XL) com a cor, ou o
+        cartucho mais barato do modelo quando o anúncio não diz a cor. Kits com
+        preto e colorido somam os dois cartuchos. A descrição só é usada se
+        trouxer um único PN.
+        """
+        rows = tuple(dict.fromkeys(self.by_pn[core] for core in self.pn_pattern.findall(text)))
+        if rows:
+            return rows
+
+        mentions = [(compact_model(model), bool(xl)) for model, xl in self.model_pattern.findall(text)]
+        if len({model for model, _ in mentions}) == 1:
+            model = mentions[0][0]
+            xl = any(is_xl for _, is_xl in mentions)
+            colors = self.colors_in(text)
+            if len(colors) <= 1:
+                row = self.by_key.get((model, xl, next(iter(colors), None)))
+                return () if row is None else (row,)
+            if colors == {'preto', 'colorido'}:
+                kit = (self.by_key.get((model, xl, 'preto')), self.by_key.get((model, xl, 'colorido')))
+                return () if None in kit else kit
+
+        description_cores = set(self.pn_pattern.findall(description))
+        if len(description_cores) == 1:
+            return (self.by_pn[description_cores.pop()],)
+        return ()
+
+    def annotate(self, df):
+        """
+        Acrescenta matched_pn, catalog_family, suggested_price e price_ratio
+        (sem correspondência: '' e preço sugerido 0, então price_ratio = 1.0
+        como no cálculo de calculate_price_ratio)
+
+        catalog_similarity traz a similaridade do título com o SKU mais próximo
+        e catalog_match indica a origem: 'exato' (PN ou modelo), 'aproximado'
+        (SKU mais próximo, com similaridade >= min_similarity) ou ''.
+        """
+        def column(field):
+            if field not in df.columns:
+                return [''] * len(df)
+            return df[field].astype(object).where(df[field].notna(), '').map(str).tolist()
+
+        # Títulos normalizados uma vez; anúncios repetidos são resolvidos uma vez.
+        # O modelo e o número da peça das especificações (spec_*) entram junto com o título
+        titles = column('title')
+        normalized = {title: normalize_text(title) for title in titles}
+        matches = {}
+        rows = []
+        for key in zip(titles, column('model'), column('spec_model'), column('spec_part_number'), column('description')):
+            if key not in matches:
+                title, model, spec_model, spec_part_number, description = key
+                text = f"{normalized[title]} {normalize_text(model)} {normalize_text(spec_model)} {spec_part_number.lower()}"
+                matches[key] = self.match_text(text, description.lower())
+            rows.append(matches[key])
+
+        # SKU mais próximo de cada título distinto, num único lote
+        nearest_rows, similarity = self.fuzzy.nearest(list(normalized.values()))
+        nearest = dict(zip(normalized, zip(nearest_rows.tolist(), similarity.tolist())))
+        sources = []
+        for position, title in enumerate(titles):
+            row, score = nearest[title]
+            if rows[position]:
+                sources.append('exato')
+            elif score >= self.min_similarity:
+                rows[position] = (row,)
+                sources.append('aproximado')
+            else:
+                sources.append('')
+        df['catalog_similarity'] = [nearest[title][1] for title in titles]
+        df['catalog_match'] = sources
+
+        pns = self.catalog['pn'].tolist()
+        families = self.catalog['family'].tolist()
+        prices = self.catalog['suggested_price'].to_numpy()
+        df['matched_pn'] = ['+'.join(pns[r] for r in match) for match in rows]
+        df['catalog_family'] = [families[match[0]] if match else '' for match in rows]
+        df['suggested_price'] = np.array([prices[list(match)].sum() if match else 0.0 for match in rows])
+
+        price = pd.to_numeric(df['price'], errors='coerce') if 'price' in df.columns else pd.Series(0.0, index=df.index)
+        has_ratio = (price != 0) & (df['suggested_price'] != 0)
+        df['price_ratio'] = (price / df['suggested_price']).where(has_ratio, 1.0)
+        return df
+
+
+_indexes = {}
+
+
+def get_catalog_index(catalog_file="data/catalogo.csv"):
+    """Índice do catálogo, carregado uma vez por arquivo (None se o arquivo não existir)"""
+    if catalog_file not in _indexes:
+        if not os.path.exists(catalog_file):
+            logging.getLogger(__name__).warning(f"Catálogo {catalog_file} não encontrado; preço sugerido indisponível")
+            _indexes[catalog_file] = None
+        else:
+            _indexes[catalog_file] = CatalogIndex.load(catalog_file)
+    return _indexes[catalog_file]
@@ -0,0 +1,330 @@
+"""
+Formato compacto do modelo de detecção de pirataria
+Um diretório com arrays NumPy planos (nós das árvores, limiares, probabilidades
+das folhas, vocabulário, idf e vetores do scaler) e um manifest.json com a
+versão do formato. Os arrays são abertos com mmap, então carregar o modelo não
+desserializa objetos e vários processos compartilham a mesma cópia em disco
+"""
+import json
+import os
+import re
+from collections import Counter
+from datetime import datetime
+import numpy as np
+import scipy.sparse as sp
+
+FORMAT_NAME = "modelo-deteccao-pirataria-compacto"
+FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+
+# Linhas avaliadas por vez (a matriz do bloco é densificada em float32)
+ROW_BLOCK_SIZE = 1024
+
+
+class CompactVectorizer:
+    """
+    Equivalente ao TfidfVectorizer ajustado (análise por palavras, unigramas)
+    a partir do vocabulário e do idf gravados
+    """
+
+    def __init__(self, terms_blob, terms_offsets, idf, settings):
+        self.terms_blob = terms_blob
+        self.terms_offsets = terms_offsets
+        self.idf = idf
+        self.token_pattern = re.compile(settings['token_pattern'])
+        self.lowercase = settings['lowercase']
+        self.norm = settings['norm']
+        self.use_idf = settings['use_idf']
+        self.sublinear_tf = settings['sublinear_tf']
+        self._vocabulary = None
+
+    @property
+    def vocabulary_(self):
+        """Vocabulário (termo -> coluna), montado no primeiro uso"""
+        if self._vocabulary is None:
+            blob = bytes(self.terms_blob)
+            self._vocabulary = {
+                blob[start:end].decode('utf-8'): index
+                for index, (start, end) in enumerate(zip(self.terms_offsets[:-1], self.terms_offsets[1:]))
+            }
+        return self._vocabulary
+
+    def transform(self, texts):
+        """Matriz TF-IDF (CSR) dos textos"""
+        vocabulary = self.vocabulary_
+        indptr = [0]
+        indices = []
+        data = []
+        for text in texts:
+            if self.lowercase:
+                text = text.lower()
+            counts = Counter(
+                vocabulary[token] for token in self.token_pattern.findall(text) if token in vocabulary
+            )
+            for column in sorted(counts):
+                indices.append(column)
+                data.append(counts[column])
+            indptr.append(len(indices))
+
+        data = np.asarray(data, dtype=np.float64)
+        indices = np.asarray(indices, dtype=np.int32)
+        indptr = np.asarray(indptr, dtype=np.int64)
+        if self.sublinear_tf:
+            np.log(data, data)
+            data += 1.0
+        if self.use_idf:
+            data *= self.idf[indices]
+        if self.norm == 'l2':
+            data /= np.repeat(self.row_norms(data, indptr), np.diff(indptr))
+        return sp.csr_matrix((data, indices, indptr), shape=(len(indptr) - 1, len(self.idf)))
+
+    @staticmethod
+    def row_norms(data, indptr):
+        """
+        Norma l2 de cada linha (1 nas linhas vazias), somando os quadrados na
+        mesma ordem sequencial do scikit-learn para obter resultados idênticos
+        """
+        lengths = np.diff(indptr)
+        sums = np.zeros(len(lengths), dtype=np.float64)
+        squares = data * data
+        for position in range(int(lengths.max(initial=0))):
+            rows = np.nonzero(lengths > position)[0]
+            sums[rows] += squares[indptr[rows] + position]
+        norms = np.sqrt(sums)
+        norms[norms == 0.0] = 1.0
+        return norms
+
+
+class CompactScaler:
+    """Equivalente ao StandardScaler ajustado (apenas transform)"""
+
+    def __init__(self, mean, scale, with_mean, with_std):
+        self.mean_ = mean
+        self.scale_ = scale
+        self.with_mean = with_mean
+        self.with_std = with_std
+
+    def transform(self, X):
+        X = np.array(X, dtype=np.float64)
+        if self.with_mean:
+            X -= self.mean_
+        if self.with_std:
+            X /= self.scale_
+        return X
+
+
+class CompactForest:
+    """
+    Floresta de árvores de decisão em arrays planos
+
+    Todas as árvores ficam nos mesmos arrays; children_left/children_right já
+    apontam para índices globais (-1 nas folhas) e roots guarda a raiz de cada
+    árvore. value traz as probabilidades normalizadas de cada nó.
+    """
+
+    def __init__(self, children_left, children_right, feature, threshold, missing_go_to_left, value, roots, classes):
+        self.children_left = children_left
+        self.children_right = children_right
+        self.feature = feature
+        self.threshold = threshold
+        self.missing_go_to_left = missing_go_to_left
+        self.value = value
+        self.roots = roots
+        self.classes_ = classes
+
+    @classmethod
+    def from_sklearn(cls, model):
+        """Achata um RandomForestClassifier ajustado"""
+        arrays = {name: [] for name in ['children_left', 'children_right', 'feature', 'threshold', 'missing_go_to_left', 'value']}
+        roots = []
+        offset = 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            roots.append(offset)
+            is_leaf = tree.children_left == -1
+            arrays['children_left'].append(np.where(is_leaf, -1, tree.children_left + offset))
+            arrays['children_right'].append(np.where(is_leaf, -1, tree.children_right + offset))
+            arrays['feature'].append(np.where(is_leaf, 0, tree.feature))
+            arrays['threshold'].append(tree.threshold)
+            missing = getattr(tree, 'missing_go_to_left', None)
+            arrays['missing_go_to_left'].append(np.zeros(tree.node_count, dtype=np.uint8) if missing is None else missing)
+            # Mesma normalização de DecisionTreeClassifier.predict_proba
+            value = tree.value[:, 0, :]
+            normalizer = value.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+            arrays['value'].append(value / normalizer)
+            offset += tree.node_count
+
+        return cls(
+            children_left=np.concatenate(arrays['children_left']).astype(np.int32),
+            children_right=np.concatenate(arrays['children_right']).astype(np.int32),
+            feature=np.concatenate(arrays['feature']).astype(np.int32),
+            threshold=np.concatenate(arrays['threshold']).astype(np.float64),
+            missing_go_to_left=np.concatenate(arrays['missing_go_to_left']).astype(np.uint8),
+            value=np.concatenate(arrays['value']).astype(np.float64),
+            roots=np.asarray(roots, dtype=np.int32),
+            classes=np.asarray(model.classes_)
+        )
+
+    def leaves(self, X_block):
+        """
+        Folha alcançada por cada linha do bloco em cada árvore (linhas x árvores)
+
+        Todos os pares (linha, árvore) descem juntos, um nível por iteração, e os
+        que chegam a uma folha saem do conjunto ativo: o número de operações
+        NumPy depende da profundidade e o trabalho, do tamanho real dos caminhos.
+        """
+        n_rows, n_columns = X_block.shape
+        n_trees = len(self.roots)
+        leaves = np.empty(n_rows * n_trees, dtype=np.int32)
+        position = np.arange(n_rows * n_trees)
+        node = np.tile(np.asarray(self.roots, dtype=np.int32), n_rows)
+        row_offset = np.repeat(np.arange(n_rows, dtype=np.int64) * n_columns, n_trees)
+        values = X_block.ravel()
+        while len(node):
+            left = self.children_left[node]
+            is_leaf = left == -1
+            if is_leaf.any():
+                leaves[position[is_leaf]] = node[is_leaf]
+                inner = ~is_leaf
+                position, node, left, row_offset = position[inner], node[inner], left[inner], row_offset[inner]
+                if not len(node):
+                    break
+            x = values[row_offset + self.feature[node]]
+            go_left = x <= self.threshold[node]
+            missing = np.isnan(x)
+            if missing.any():
+                go_left[missing] = self.missing_go_to_left[node[missing]].astype(bool)
+            node = np.where(go_left, left, self.children_right[node])
+        return leaves.reshape(n_rows, n_trees)
+
+    def predict_proba(self, X):
+        """Probabilidade de cada classe (média das árvores, como no scikit-learn)"""
+        n_rows = X.shape[0]
+        proba = np.zeros((n_rows, len(self.classes_)), dtype=np.float64)
+        for start in range(0, n_rows, ROW_BLOCK_SIZE):
+            block = X[start:start + ROW_BLOCK_SIZE]
+            block = block.toarray() if sp.issparse(block) else np.asarray(block)
+            # O scikit-learn compara as features em float32 com limiares float64
+            block = np.ascontiguousarray(block, dtype=np.float32)
+            leaves = self.leaves(block)
+            # Soma árvore a árvore, na mesma ordem do scikit-learn
+            block_proba = proba[start:start + len(block)]
+            for tree in range(leaves.shape[1]):
+                block_proba += self.value[leaves[:, tree]]
+        proba /= len(self.roots)
+        return proba
+
+    def predict(self, X):
+        """Classe mais provável de cada linha"""
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1), axis=0)
+
+
+def check_supported(classifier):
+    """Garante que o modelo pode ser representado no formato compacto"""
+    vectorizer = classifier.vectorizer
+    if (vectorizer.analyzer != 'word' or tuple(vectorizer.ngram_range) != (1, 1)
+            or vectorizer.tokenizer is not None or vectorizer.preprocessor is not None
+            or vectorizer.strip_accents is not None or vectorizer.binary or vectorizer.norm not in (None, 'l2')):
+        raise ValueError("Vetorizador não suportado pelo formato compacto (apenas palavras/unigramas, norma l2)")
+    if not hasattr(classifier.model, 'estimators_') or not hasattr(classifier.model.estimators_[0], 'tree_'):
+        raise ValueError("Formato compacto suporta apenas florestas de árvores de decisão")
+
+
+def save_compact_model(classifier, directory):
+    """Grava o classificador treinado no formato compacto (um diretório)"""
+    check_supported(classifier)
+    os.makedirs(directory, exist_ok=True)
+
+    forest = CompactForest.from_sklearn(classifier.model)
+    vectorizer = classifier.vectorizer
+    terms = sorted(vectorizer.vocabulary_, key=vectorizer.vocabulary_.get)
+    encoded = [term.encode('utf-8') for term in terms]
+    scaler = classifier.scaler
+    n_numeric = len(scaler.scale_)
+
+    arrays = {
+        'children_left': forest.children_left,
+        'children_right': forest.children_right,
+        'feature': forest.feature,
+        'threshold': forest.threshold,
+        'missing_go_to_left': forest.missing_go_to_left,
+        'value': forest.value,
+        'roots': forest.roots,
+        'terms_blob': np.frombuffer(b''.join(encoded), dtype=np.uint8),
+        'terms_offsets': np.concatenate([[0], np.cumsum([len(term) for term in encoded])]).astype(np.int64),
+        'idf': vectorizer.idf_.astype(np.float64),
+        'scaler_mean': (scaler.mean_ if scaler.mean_ is not None else np.zeros(n_numeric)).astype(np.float64),
+        'scaler_scale': (scaler.scale_ if scaler.scale_ is not None else np.ones(n_numeric)).astype(np.float64)
+    }
+    for name, array in arrays.items():
+        np.save(os.path.join(directory, f"{name}.npy"), np.ascontiguousarray(array))
+
+    manifest = {
+        'format': FORMAT_NAME,
+        'version': FORMAT_VERSION,
+        'created_at': datetime.now().isoformat(),
+        'trained_at': getattr(classifier, 'trained_at', None) or datetime.now().isoformat(),
+        'reference_stats': getattr(classifier, 'reference_stats', None),
+        'model_version': getattr(classifier, 'model_version', None),
+        'sparse_features': classifier.sparse_features,
+        'catalog_features': getattr(classifier, 'catalog_features', False),
+        'feature_names': list(classifier.feature_names),
+        'classes': [str(c) for c in forest.classes_],
+        'n_trees': int(len(forest.roots)),
+        'n_nodes': int(len(forest.feature)),
+        'vectorizer': {
+            'token_pattern': vectorizer.token_pattern,
+            'lowercase': vectorizer.lowercase,
+            'norm': vectorizer.norm,
+            'use_idf': vectorizer.use_idf,
+            'sublinear_tf': vectorizer.sublinear_tf
+        },
+        'scaler': {'with_mean': bool(scaler.with_mean), 'with_std': bool(scaler.with_std)}
+    }
+    # Manifesto por último: um diretório sem ele nunca é lido pela metade
+    tmp_file = os.path.join(directory, MANIFEST_FILE + '.tmp')
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_file, os.path.join(directory, MANIFEST_FILE))
+    return manifest
+
+
+def load_compact_model(directory):
+    """
+    Abre um modelo compacto: devolve (manifest, vetorizador, scaler, floresta)
+    com os arrays mapeados em memória (somente leitura)
+    """
+    with open(os.path.join(directory, MANIFEST_FILE), 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('format') != FORMAT_NAME:
+        raise ValueError(f"{directory} não contém um modelo compacto")
+    if manifest.get('version', 0) > FORMAT_VERSION:
+        raise ValueError(f"Versão {manifest['version']} do formato compacto não suportada (máximo {FORMAT_VERSION})")
+
+    def array(name):
+        return np.load(os.path.join(directory, f"{name}.npy"), mmap_mode='r')
+
+    vectorizer = CompactVectorizer(array('terms_blob'), array('terms_offsets'), array('idf'), manifest['vectorizer'])
+    scaler = CompactScaler(array('scaler_mean'), array('scaler_scale'), manifest['scaler']['with_mean'], manifest['scaler']['with_std'])
+    forest = CompactForest(
+        array('children_left'), array('children_right'), array('feature'), array('threshold'),
+        array('missing_go_to_left'), array('value'), array('roots'), np.asarray(manifest['classes'], dtype=object)
+    )
+    return manifest, vectorizer, scaler, forest
+
+
+def main():
+    """Converte um modelo .pkl para o formato compacto (origem e destino como argumentos)"""
+    import sys
+    from classificador_ia import PiracyDetectionClassifier
+
+    source = sys.argv[1] if len(sys.argv) > 1 else "resultados/modelo_deteccao_pirataria.pkl"
+    directory = sys.argv[2] if len(sys.argv) > 2 else os.path.splitext(source)[0]
+    classifier = PiracyDetectionClassifier()
+    classifier.load_model(source)
+    manifest = save_compact_model(classifier, directory)
+    print(f"Modelo compacto salvo em {directory} ({manifest['n_trees']} árvores, {manifest['n_nodes']} nós)")
+
+if __name__ == "__main__":
+    main()
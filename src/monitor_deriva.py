@@ -0,0 +1,66 @@
+"""
+Monitor de deriva das features
+Distribuição de referência das features numéricas (gravada junto com o modelo
+no treinamento) e o PSI (Population Stability Index) de dados novos em relação
+a ela, usado para disparar o retreino incremental
+"""
+import numpy as np
+
+# Faixas por quantis em cada feature
+N_BINS = 10
+
+# Proporção mínima por faixa (evita log(0) quando uma faixa fica vazia)
+MIN_PROPORTION = 1e-4
+
+# Referência usual: PSI < 0.1 estável, 0.1-0.2 moderado, > 0.2 deriva relevante
+DEFAULT_PSI_THRESHOLD = 0.2
+
+
+def bin_proportions(values, edges):
+    """Proporção de valores em cada faixa; a última posição é a proporção de NaN"""
+    values = np.asarray(values, dtype=np.float64)
+    missing = np.isnan(values)
+    counts = np.bincount(np.searchsorted(edges, values[~missing], side='right'), minlength=len(edges) + 1)
+    counts = np.append(counts, missing.sum())
+    return counts / max(len(values), 1)
+
+
+def reference_distribution(X_numeric, n_bins=N_BINS):
+    """
+    Limites das faixas (quantis) e proporções de cada coluna do DataFrame de
+    features, em listas simples para caber no pickle e no manifest.json
+    """
+    stats = {}
+    for column in X_numeric.columns:
+        values = X_numeric[column].to_numpy(dtype=np.float64)
+        finite = values[~np.isnan(values)]
+        if len(finite):
+            edges = np.unique(np.quantile(finite, np.linspace(0, 1, n_bins + 1)[1:-1]))
+        else:
+            edges = np.array([], dtype=np.float64)
+        stats[column] = {'edges': edges.tolist(), 'proportions': bin_proportions(values, edges).tolist()}
+    return stats
+
+
+def population_stability_index(expected, actual):
+    """PSI entre duas distribuições sobre as mesmas faixas"""
+    expected = np.maximum(np.asarray(expected, dtype=np.float64), MIN_PROPORTION)
+    actual = np.maximum(np.asarray(actual, dtype=np.float64), MIN_PROPORTION)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+def feature_drift(reference_stats, X_numeric):
+    """PSI de cada feature da referência nos dados novos"""
+    return {
+        column: population_stability_index(
+            stats['proportions'],
+            bin_proportions(X_numeric[column].to_numpy(dtype=np.float64), np.asarray(stats['edges'], dtype=np.float64))
+        )
+        for column, stats in reference_stats.items()
+        if column in X_numeric.columns
+    }
+
+
+def drifted_features(drift, threshold=DEFAULT_PSI_THRESHOLD):
+    """Features cujo PSI passou do limite, da maior deriva para a menor"""
+    return sorted((column for column, psi in drift.items() if psi > threshold), key=drift.get, reverse=True)
@@ -0,0 +1,302 @@
+"""
+Motor de regras heurísticas
+Regras declaradas no config.json (palavras-chave, vendedores, faixas de preço,
+tamanho da descrição...) compiladas em máscaras booleanas e somas ponderadas
+calculadas sobre o DataFrame inteiro de uma vez. Palavras-chave não distinguem
+acentos ("generico" e "genérico" são a mesma palavra)
+"""
+import numpy as np
+import pandas as pd
+from padroes_texto import JoinedText, normalize_text
+
+# Regras usadas para rotular os dados de treinamento
+DEFAULT_HEURISTIC_RULES = {
+    "suspicious_threshold": 2,
+    "original_threshold": -1,
+    "rules": [
+        {
+            "name": "palavras_suspeitas",
+            "type": "keywords",
+            "fields": ["title", "description"],
+            "keywords": [
+                "genérico", "cópia", "compatível", "recondicionado", "usado",
+                "refurbished", "remanufactured", "compatible", "generic",
+                "não original", "alternativo", "substituto", "imitação",
+                "falso", "fake", "replica", "copia", "compativel"
+            ],
+            "weight": 2
+        },
+        {
+            "name": "palavras_originais",
+            "type": "keywords",
+            "fields": ["title", "description"],
+            "keywords": [
+                "original", "oficial", "genuíno", "autêntico", "lacrado",
+                "novo", "novo lacrado", "garantia", "nota fiscal"
+            ],
+            "weight": -1
+        },
+        {
+            "name": "vendedor",
+            "type": "contains",
+            "fields": ["seller"],
+            "cases": [
+                {"keywords": ["amazon", "amazon.com.br", "hp", "hp brasil", "oficial"], "weight": -1},
+                {"keywords": ["marketplace", "terceiros", "vendedor externo", "loja genérica"], "weight": 2}
+            ]
+        },
+        {
+            "name": "faixa_preco",
+            "type": "bands",
+            "field": "price",
+            "skip_zero": True,
+            "bands": [
+                {"max": 30, "weight": 1},
+                {"min": 200, "weight": 0.5}
+            ]
+        },
+        {
+            "name": "descricao_curta",
+            "type": "bands",
+            "field": "description",
+            "measure": "length",
+            "bands": [
+                {"max": 50, "weight": 1}
+            ]
+        }
+    ]
+}
+
+# Regras somadas às heurísticas só na predição em cascata: sinais que o modelo
+# não recebe como feature ficam fora dos rótulos de treinamento
+DEFAULT_CASCADE_RULES = [
+    {
+        "name": "imagem_referencia",
+        "type": "category",
+        "field": "image_match",
+        "weights": {"SUSPEITO": 3, "ORIGINAL": -1}
+    }
+]
+
+# Regras do score de risco (aplicadas depois das predições da IA)
+DEFAULT_RISK_ANALYSIS = {
+    "high_risk_threshold": 4,
+    "medium_risk_threshold": 2,
+    "rules": [
+        {
+            "name": "predicao_ia",
+            "type": "category",
+            "field": "ai_prediction",
+            "weights": {"SUSPEITO": 3, "COMPATIVEL": 1}
+        },
+        {
+            "name": "baixa_confianca",
+            "type": "bands",
+            "field": "ai_confidence",
+            "bands": [
+                {"max": 0.7, "weight": 1}
+            ]
+        },
+        {
+            "name": "faixa_preco",
+            "type": "bands",
+            "field": "price",
+            "skip_zero": True,
+            "bands": [
+                {"max": 30, "weight": 2},
+                {"min": 200, "weight": 1}
+            ]
+        },
+        {
+            "name": "vendedor_marketplace",
+            "type": "contains",
+            "fields": ["seller"],
+            "cases": [
+                {"keywords": ["marketplace"], "weight": 1}
+            ]
+        },
+        {
+            "name": "imagem_referencia",
+            "type": "category",
+            "field": "image_match",
+            "weights": {"SUSPEITO": 2}
+        }
+    ]
+}
+
+
+class RuleFrame:
+    """
+    Colunas do DataFrame preparadas uma única vez para todas as regras de uma passada
+    """
+
+    def __init__(self, df):
+        self.df = df
+        self.size = len(df)
+        self.texts = {}
+        self.joined = {}
+        self.found = {}
+        self.combined = {}
+
+    def text(self, field):
+        """Coluna em minúsculas, igual a str(row.get(field, '')).lower() linha a linha"""
+        if field not in self.texts:
+            if field in self.df.columns:
+                self.texts[field] = [str(value).lower() for value in self.df[field].tolist()]
+            else:
+                self.texts[field] = [''] * self.size
+        return self.texts[field]
+
+    def joined_text(self, field):
+        """Textos da coluna normalizados (sem acentos) e concatenados para a busca de palavras"""
+        if field not in self.joined:
+            values = self.df[field].tolist() if field in self.df.columns else [''] * self.size
+            self.joined[field] = JoinedText([str(value) for value in values], normalize=True)
+        return self.joined[field]
+
+    def contains(self, field, keyword):
+        """Máscara das linhas em que a palavra (já normalizada) aparece no campo"""
+        if (field, keyword) not in self.found:
+            self.found[(field, keyword)] = self.joined_text(field).contains(keyword)
+        return self.found[(field, keyword)]
+
+    def contains_any(self, fields, keywords):
+        """Máscara das linhas em que alguma palavra aparece em algum dos campos"""
+        found = np.zeros(self.size, dtype=bool)
+        for keyword in keywords:
+            for field in fields:
+                found |= self.contains(field, keyword)
+        return found
+
+    def combined_text(self, fields):
+        """Textos normalizados dos campos unidos por espaço, sem normalizar de novo"""
+        fields = tuple(fields)
+        if fields not in self.combined:
+            columns = [self.joined_text(field).joined.split('\0') for field in fields]
+            self.combined[fields] = JoinedText([' '.join(parts) for parts in zip(*columns)])
+        return self.combined[fields]
+
+    def contains_combined(self, fields, keyword):
+        """
+        Máscara das linhas em que a palavra aparece nos campos unidos por espaço
+        (como title + ' ' + description + ' ' + seller)
+
+        Palavras sem espaço não atravessam a junção e reaproveitam as máscaras
+        de cada campo; só as demais são procuradas no texto combinado.
+        """
+        if ' ' not in keyword or len(fields) == 1:
+            return self.contains_any(fields, [keyword])
+        return self.combined_text(fields).contains(keyword)
+
+    def numeric(self, field, default=0):
+        """Coluna como float (valor padrão quando a coluna não existe)"""
+        if field not in self.df.columns:
+            return np.full(self.size, default, dtype=np.float64)
+        return pd.to_numeric(self.df[field], errors='coerce').to_numpy(dtype=np.float64)
+
+
+def keywords_rule(rule, frame):
+    """Peso vezes a quantidade de palavras presentes em algum dos campos"""
+    hits = np.zeros(frame.size, dtype=np.float64)
+    for keyword in rule['keywords']:
+        hits += frame.contains_any(rule['fields'], [keyword])
+    return hits * rule['weight']
+
+
+def contains_rule(rule, frame):
+    """Peso do primeiro caso cujas palavras aparecem em algum dos campos"""
+    scores = np.zeros(frame.size, dtype=np.float64)
+    assigned = np.zeros(frame.size, dtype=bool)
+    for case in rule['cases']:
+        found = frame.contains_any(rule['fields'], case['keywords']) & ~assigned
+        scores[found] += case['weight']
+        assigned |= found
+    return scores
+
+
+def bands_rule(rule, frame):
+    """
+    Peso da primeira faixa (limites exclusivos) em que o valor cai
+
+    Com "measure": "length" a faixa vale para o tamanho do texto; com
+    "skip_zero" o valor zero (ausente) não entra em nenhuma faixa.
+    """
+    if rule.get('measure') == 'length':
+        values = np.array([len(text) for text in frame.text(rule['field'])], dtype=np.float64)
+    else:
+        values = frame.numeric(rule['field'], rule.get('default', 0))
+
+    scores = np.zeros(frame.size, dtype=np.float64)
+    assigned = values == 0 if rule.get('skip_zero') else np.zeros(frame.size, dtype=bool)
+    for band in rule['bands']:
+        in_band = ~assigned
+        if 'min' in band:
+            in_band &= values > band['min']
+        if 'max' in band:
+            in_band &= values < band['max']
+        scores[in_band] += band['weight']
+        assigned |= in_band
+    return scores
+
+
+def category_rule(rule, frame):
+    """Peso associado ao valor exato do campo"""
+    if rule['field'] not in frame.df.columns:
+        return np.zeros(frame.size, dtype=np.float64)
+    return frame.df[rule['field']].map(rule['weights']).fillna(0).to_numpy(dtype=np.float64)
+
+
+RULE_TYPES = {
+    'keywords': keywords_rule,
+    'contains': contains_rule,
+    'bands': bands_rule,
+    'category': category_rule
+}
+
+
+def normalize_keywords(keywords):
+    """Palavras-chave sem acentos e sem repetição (a primeira ocorrência fica)"""
+    return list(dict.fromkeys(normalize_text(keyword) for keyword in keywords))
+
+
+def compile_rule(rule):
+    """Valida a regra e normaliza suas palavras-chave (sem alterar a configuração)"""
+    if rule.get('type') not in RULE_TYPES:
+        raise ValueError(f"Tipo de regra desconhecido em '{rule.get('name')}': {rule.get('type')}")
+    rule = dict(rule)
+    if 'keywords' in rule:
+        rule['keywords'] = normalize_keywords(rule['keywords'])
+    if 'cases' in rule:
+        rule['cases'] = [{**case, 'keywords': normalize_keywords(case['keywords'])} for case in rule['cases']]
+    return rule
+
+
+class RuleEngine:
+    """Conjunto de regras declarativas avaliado sobre o DataFrame inteiro"""
+
+    def __init__(self, rules):
+        rules = [compile_rule(rule) for rule in rules]
+        self.rules = rules
+        weights = [
+            weight
+            for rule in rules
+            for weight in [rule.get('weight', 0)]
+            + [case['weight'] for case in rule.get('cases', [])]
+            + [band['weight'] for band in rule.get('bands', [])]
+            + list(rule.get('weights', {}).values())
+        ]
+        self.integer_scores = all(float(weight).is_integer() for weight in weights)
+
+    def score(self, df, frame=None):
+        """
+        Soma ponderada das regras para cada linha
+
+        frame: RuleFrame de df montado pelo chamador, para reaproveitar depois
+        as máscaras de palavras-chave calculadas pelas regras
+        """
+        frame = frame if frame is not None else RuleFrame(df)
+        total = np.zeros(frame.size, dtype=np.float64)
+        for rule in self.rules:
+            total += RULE_TYPES[rule['type']](rule, frame)
+        score = pd.Series(total, index=df.index)
+        return score.astype('int64') if self.integer_scores else score
@@ -0,0 +1,369 @@
+"""
+Padrões de texto compartilhados pelo scraper e pelo classificador
+Expressões regulares pré-compiladas e busca de várias palavras-chave numa única passada
+"""
+import json
+import re
+import unicodedata
+from bisect import bisect_right
+from itertools import accumulate
+import numpy as np
+
+
+def build_trie_pattern(words):
+    """
+    Monta uma expressão regular em forma de trie a partir das palavras
+
+    Palavras com prefixo comum compartilham o mesmo ramo ("avaliaç(?:ão|ões)"),
+    então o motor de regex testa cada posição do texto descendo a árvore em vez
+    de tentar cada palavra separadamente.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = True
+
+    def build(node):
+        is_end = '' in node
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char != '']
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if is_end:
+            # Quantificador guloso: a palavra mais longa na posição é tentada primeiro
+            body = '(?:' + body + ')?'
+        return body
+
+    return build(trie)
+
+
+# Blocos de diacríticos combinantes (acentos separados da letra pela decomposição NFKD)
+COMBINING_MARKS_PATTERN = re.compile('[\u0300-\u036f\u1ab0-\u1aff\u1dc0-\u1dff\u20d0-\u20ff\ufe20-\ufe2f]+')
+
+
+def normalize_text(text):
+    """Minúsculas e sem acentos ("Número da Peça" -> "numero da peca")"""
+    return COMBINING_MARKS_PATTERN.sub('', unicodedata.normalize('NFKD', text.lower()))
+
+
+class KeywordMatcher:
+    """
+    Busca um conjunto de palavras-chave numa única passada sobre o texto
+
+    Equivale a testar `palavra in texto` para cada palavra, mas com um único
+    autômato compilado. O texto deve chegar já normalizado (ex.: minúsculo).
+    """
+
+    def __init__(self, keywords):
+        self.keywords = list(dict.fromkeys(keywords))
+        pattern = build_trie_pattern(self.keywords)
+        self.search_pattern = re.compile(pattern)
+        # Lookahead para encontrar ocorrências sobrepostas
+        self.scan_pattern = re.compile(f'(?=({pattern}))')
+        # Palavras contidas em cada palavra: se "novo lacrado" ocorre, "novo" também
+        self.implied = {
+            keyword: frozenset(other for other in self.keywords if other in keyword)
+            for keyword in self.keywords
+        }
+
+    def search(self, text):
+        """Primeira palavra-chave encontrada (mais à esquerda) ou None"""
+        match = self.search_pattern.search(text)
+        return match.group(0) if match else None
+
+    def contains_any(self, text):
+        """Indica se alguma palavra-chave ocorre no texto"""
+        return self.search_pattern.search(text) is not None
+
+    def find_all(self, text):
+        """Conjunto de palavras-chave presentes no texto"""
+        found = set()
+        for match in self.scan_pattern.finditer(text):
+            found |= self.implied[match.group(1)]
+        return found
+
+    def count(self, text):
+        """Quantidade de palavras-chave distintas presentes no texto"""
+        return len(self.find_all(text))
+
+
+class JoinedText:
+    """
+    Vários textos concatenados para buscar cada palavra uma única vez no conjunto
+
+    Equivale a testar `palavra in texto` em cada texto: a busca percorre o texto
+    concatenado e, a cada ocorrência, salta para o início do texto seguinte.
+    Com normalize=True o conjunto inteiro é normalizado (normalize_text) de uma vez.
+    """
+
+    def __init__(self, texts, normalize=False):
+        texts = list(texts)
+        if normalize:
+            texts = normalize_text('\0'.join(text.replace('\0', ' ') for text in texts)).split('\0')
+        self.ends = list(accumulate(len(text) + 1 for text in texts))
+        self.joined = '\0'.join(texts)
+        self.size = len(texts)
+
+    def contains(self, keyword):
+        """Máscara booleana dos textos que contêm a palavra"""
+        mask = np.zeros(self.size, dtype=bool)
+        position = self.joined.find(keyword)
+        while position != -1:
+            row = bisect_right(self.ends, position)
+            mask[row] = True
+            position = self.joined.find(keyword, self.ends[row])
+        return mask
+
+    def count(self, keywords):
+        """Quantas das palavras ocorrem em cada texto"""
+        counts = np.zeros(self.size, dtype=np.int64)
+        for keyword in keywords:
+            counts += self.contains(keyword)
+        return counts
+
+
+class KeywordGroups:
+    """
+    Vários grupos de palavras-chave contados numa mesma busca, sem distinção de acentos
+
+    As palavras de todos os grupos são normalizadas e deduplicadas uma vez;
+    cada texto é normalizado uma única vez e cada palavra é procurada uma única
+    vez, mesmo quando aparece em mais de um grupo. A contagem de um grupo é o
+    número de palavras distintas do grupo presentes no texto.
+    """
+
+    def __init__(self, groups):
+        self.groups = {
+            name: list(dict.fromkeys(normalize_text(keyword) for keyword in keywords))
+            for name, keywords in groups.items()
+        }
+        self.keywords = list(dict.fromkeys(keyword for keywords in self.groups.values() for keyword in keywords))
+        self.matcher = KeywordMatcher(self.keywords)
+
+    def presence(self, texts):
+        """Máscara booleana por palavra-chave (True nos textos em que ela aparece)"""
+        corpus = JoinedText(texts, normalize=True)
+        return {keyword: corpus.contains(keyword) for keyword in self.keywords}
+
+    def count(self, texts):
+        """Contagem de cada grupo para cada texto ({grupo: array de inteiros})"""
+        texts = list(texts)
+        return self.count_found(self.presence(texts), len(texts))
+
+    def count_found(self, found, size):
+        """Contagem de cada grupo a partir das máscaras por palavra-chave (ver presence)"""
+        counts = {name: np.zeros(size, dtype=np.int64) for name in self.groups}
+        for name, keywords in self.groups.items():
+            for keyword in keywords:
+                counts[name] += found[keyword]
+        return counts
+
+    def count_text(self, text):
+        """Contagem de cada grupo para um único texto"""
+        found = self.matcher.find_all(normalize_text(text))
+        return {name: sum(1 for keyword in keywords if keyword in found) for name, keywords in self.groups.items()}
+
+
+# Vendedor na listagem de busca
+LISTING_SOLD_BY_PATTERN = re.compile(r'Vendido por\s+([^\n\r]+)', re.IGNORECASE)
+LISTING_SHIPPED_SOLD_BY_PATTERN = re.compile(r'Enviado por\s+([^/]+)\s*/\s*Vendido por\s+([^\n\r]+)', re.IGNORECASE)
+
+# Vendedor no texto da página do produto (a última captura é o nome do vendedor)
+DETAILED_SELLER_PATTERNS = [
+    re.compile(pattern, re.IGNORECASE | re.MULTILINE)
+    for pattern in [
+        r'Vendido por\s+([^\n\r,]+?)(?:\s*$|\s*\(|\s*\|)',
+        r'Enviado por\s+([^/]+?)\s*/\s*Vendido por\s+([^\n\r,]+?)(?:\s*$|\s*\(|\s*\|)',
+        r'Sold by\s+([^\n\r,]+?)(?:\s*$|\s*\(|\s*\|)',
+        r'Shipped by\s+([^/]+?)\s*/\s*Sold by\s+([^\n\r,]+?)(?:\s*$|\s*\(|\s*\|)',
+        r'Vendedor:\s*([^\n\r,]+?)(?:\s*$|\s*\(|\s*\|)',
+        r'Seller:\s*([^\n\r,]+?)(?:\s*$|\s*\(|\s*\|)'
+    ]
+]
+SELLER_NAME_CLEANUP_PATTERN = re.compile(r'[^\w\s\-\.]')
+
+# Preço no texto da página do produto
+PAGE_PRICE_PATTERNS = [
+    re.compile(pattern, re.IGNORECASE)
+    for pattern in [
+        r'R\$\s*(\d+[,.]?\d*)',
+        r'(\d+[,.]?\d*)\s*reais',
+        r'Preço:\s*R\$\s*(\d+[,.]?\d*)',
+        r'Valor:\s*R\$\s*(\d+[,.]?\d*)'
+    ]
+]
+
+RATING_PATTERN = re.compile(r'(\d+[,.]\d+)')
+
+# Data das avaliações ("Avaliado no Brasil em 5 de março de 2024" / "Reviewed in ... on March 5, 2024")
+REVIEW_DATE_PT_PATTERN = re.compile(r'(\d{1,2}) de (\w+) de (\d{4})', re.IGNORECASE)
+REVIEW_DATE_EN_PATTERN = re.compile(r'([A-Za-z]+) (\d{1,2}), (\d{4})')
+MONTHS = {
+    'janeiro': 1, 'fevereiro': 2, 'marco': 3, 'abril': 4, 'maio': 5, 'junho': 6,
+    'julho': 7, 'agosto': 8, 'setembro': 9, 'outubro': 10, 'novembro': 11, 'dezembro': 12,
+    'january': 1, 'february': 2, 'march': 3, 'april': 4, 'may': 5, 'june': 6,
+    'july': 7, 'august': 8, 'september': 9, 'october': 10, 'november': 11, 'december': 12
+}
+
+# Textos que claramente não são nomes de vendedores
+INVALID_SELLER_KEYWORDS = [
+    'avaliação', 'review', 'rating', 'estrela', 'star',
+    'avaliações', 'reviews', 'disponível', 'available',
+    'preço', 'price', 'frete', 'shipping', 'entrega', 'delivery',
+    'mais vendidos', 'best sellers', 'escolha da amazon',
+    'amazon choice', 'patrocinado', 'sponsored',
+    'pesquisas relacionadas', 'related searches',
+    'anterior', 'próximo', 'next', 'previous',
+    'departamentos', 'departments', 'categoria', 'category',
+    'ver mais', 'see more', 'ver ofertas', 'see offers',
+    'produtos similares', 'similar products',
+    'outras opções', 'other options',
+    # Termos genéricos que não são nomes
+    'vendido por', 'enviado por', 'sold by', 'shipped by'
+]
+INVALID_SELLER_MATCHER = KeywordMatcher(INVALID_SELLER_KEYWORDS)
+
+
+def seller_name_rejection(text):
+    """
+    Motivo pelo qual o texto não é um nome de vendedor válido, ou None se for válido
+    """
+    if not text or text.strip() == "":
+        return "Nome vazio"
+
+    text = text.strip()
+
+    keyword = INVALID_SELLER_MATCHER.search(text.lower())
+    if keyword:
+        return f"Nome rejeitado por palavra-chave: '{keyword}'"
+
+    if len(text) < 2:
+        return "Nome rejeitado por ser muito curto"
+
+    try:
+        float(text.replace(',', '.'))
+        return "Nome rejeitado por ser apenas número"
+    except ValueError:
+        pass
+
+    if not any(c.isalnum() for c in text):
+        return "Nome rejeitado por não conter caracteres alfanuméricos"
+
+    if len(text) > 100:
+        return "Nome rejeitado por ser muito longo"
+
+    return None
+
+
+def parse_price_text(price_text):
+    """Converte um preço exibido ("R$ 1.234,56") em float, ou None se não for numérico"""
+    cleaned_price = price_text.replace("R$", "").replace(".", "").replace(",", ".").strip()
+    if cleaned_price and cleaned_price.replace(".", "").isdigit():
+        try:
+            return float(cleaned_price)
+        except ValueError:
+            return None
+    return None
+
+
+def parse_review_date(text):
+    """Data ISO (AAAA-MM-DD) de uma linha de data de avaliação, ou None"""
+    match = REVIEW_DATE_PT_PATTERN.search(text)
+    if match:
+        day, month, year = match.group(1), match.group(2), match.group(3)
+    else:
+        match = REVIEW_DATE_EN_PATTERN.search(text)
+        if not match:
+            return None
+        month, day, year = match.group(1), match.group(2), match.group(3)
+    month_number = MONTHS.get(normalize_text(month))
+    if not month_number:
+        return None
+    return f"{int(year):04d}-{month_number:02d}-{int(day):02d}"
+
+
+def find_price_in_text(page_text):
+    """Primeiro preço encontrado no texto da página pelos padrões conhecidos"""
+    for pattern in PAGE_PRICE_PATTERNS:
+        match = pattern.search(page_text)
+        if match:
+            price_text = match.group(1).replace(",", ".")
+            if price_text.replace(".", "").isdigit():
+                return float(price_text)
+    return None
+
+
+# Imagem principal da página do produto, na ordem de prioridade
+MAIN_IMAGE_SELECTORS = ["#landingImage", "#imgBlkFront", "#main-image", "#imgTagWrapperId img"]
+MAIN_IMAGE_ATTRIBUTES = ['data-old-hires', 'data-a-dynamic-image', 'src']
+
+
+def pick_main_image_url(attributes):
+    """
+    URL da imagem principal a partir dos atributos do <img> (nome -> valor)
+
+    Prefere a versão em alta resolução (data-old-hires), depois a maior das
+    variantes de data-a-dynamic-image ({"url": [largura, altura]}) e por fim o
+    src, ignorando imagens embutidas (data:).
+    """
+    if attributes.get('data-old-hires'):
+        return attributes['data-old-hires']
+    dynamic = attributes.get('data-a-dynamic-image')
+    if dynamic:
+        try:
+            variants = json.loads(dynamic)
+            if variants:
+                return max(variants, key=lambda url: variants[url][0] * variants[url][1])
+        except (ValueError, TypeError, IndexError):
+            pass
+    src = attributes.get('src') or ''
+    return src if src.startswith('http') else None
+
+
+# Chaves da tabela de especificações -> colunas tipadas
+SPEC_KEY_ALIASES = {
+    'spec_model': ['modelo', 'numero do modelo', 'nome do modelo', 'model', 'model number', 'item model number'],
+    'spec_part_number': ['numero da peca', 'numero de peca', 'part number', 'manufacturer part number', 'codigo do fabricante'],
+    'spec_manufacturer': ['fabricante', 'manufacturer'],
+    'spec_brand': ['marca', 'brand'],
+    'spec_color': ['cor', 'cor da tinta', 'color', 'ink color'],
+    'spec_page_yield': ['rendimento', 'rendimento de paginas', 'rendimento da pagina', 'page yield'],
+    'spec_compatible_printers': ['modelos de impressora compativeis', 'compatibilidade com impressoras', 'dispositivos compativeis', 'compatible devices'],
+    'spec_asin': ['asin']
+}
+SPEC_COLUMNS = list(SPEC_KEY_ALIASES)
+SPEC_KEY_LOOKUP = {alias: column for column, aliases in SPEC_KEY_ALIASES.items() for alias in aliases}
+SPEC_KEY_CLEANUP_PATTERN = re.compile(r'[\u200e\u200f:]+')
+INTEGER_PATTERN = re.compile(r'\d[\d.]*')
+
+
+def normalize_spec_key(key):
+    """Chave da tabela sem acentos, marcas invisíveis e dois-pontos"""
+    return ' '.join(normalize_text(SPEC_KEY_CLEANUP_PATTERN.sub(' ', key)).split())
+
+
+def normalize_specifications(specs):
+    """
+    Converte o dicionário de especificações em colunas tipadas (spec_*)
+
+    Chaves conhecidas (modelo, número da peça, fabricante...) viram colunas
+    fixas; o número da peça fica em maiúsculas sem espaços e o rendimento como
+    inteiro. Colunas sem valor ficam None para manter o esquema estável.
+    """
+    columns = dict.fromkeys(SPEC_COLUMNS)
+    for key, value in (specs or {}).items():
+        column = SPEC_KEY_LOOKUP.get(normalize_spec_key(key))
+        if column is None or columns[column] is not None:
+            continue
+        value = ' '.join(str(value).replace('\u200e', ' ').replace('\u200f', ' ').split())
+        if not value:
+            continue
+        if column == 'spec_part_number':
+            value = value.replace(' ', '').upper()
+        elif column == 'spec_page_yield':
+            match = INTEGER_PATTERN.search(value)
+            value = int(match.group(0).replace('.', '')) if match else None
+        columns[column] = value
+    return columns
@@ -0,0 +1,63 @@
+"""
+Persistência compartilhada
+Leitura do config.json (pipeline e utilitários de linha de comando) e a
+conexão SQLite usada pelos armazenamentos persistentes (cache de predições,
+reputação dos vendedores, grafo de vendedores)
+"""
+import copy
+import json
+import os
+import sqlite3
+
+
+def load_config(config_file="config.json", defaults=None):
+    """
+    Configurações do pipeline
+
+    Sem o arquivo, devolve uma cópia de defaults (vazio se não houver). Com
+    defaults, cada seção do arquivo é mesclada sobre a seção padrão, de modo
+    que chaves ausentes no config.json continuam com o valor padrão.
+    """
+    config = copy.deepcopy(defaults or {})
+    if not os.path.exists(config_file):
+        return config
+    with open(config_file, 'r', encoding='utf-8') as f:
+        loaded = json.load(f)
+    for section, values in loaded.items():
+        if isinstance(values, dict) and isinstance(config.get(section), dict):
+            config[section] = {**config[section], **values}
+        else:
+            config[section] = values
+    return config
+
+
+class SQLiteStore:
+    """
+    Base dos armazenamentos em SQLite
+
+    A conexão é aberta no primeiro uso (modo WAL, criando o diretório e as
+    tabelas de SCHEMA) e reaberta quando o objeto é usado num processo filho,
+    já que uma conexão SQLite não pode atravessar um fork.
+    """
+
+    # Comandos executados ao abrir a conexão (CREATE TABLE/INDEX IF NOT EXISTS)
+    SCHEMA = ()
+
+    def __init__(self, database_file):
+        self.database_file = database_file
+        self._connection = None
+        self._pid = None
+
+    @property
+    def connection(self):
+        """Conexão aberta no primeiro uso (e reaberta em processos filhos)"""
+        if self._connection is None or self._pid != os.getpid():
+            out_dir = os.path.dirname(self.database_file)
+            if out_dir:
+                os.makedirs(out_dir, exist_ok=True)
+            self._connection = sqlite3.connect(self.database_file, timeout=30, check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            for statement in self.SCHEMA:
+                self._connection.execute(statement)
+            self._pid = os.getpid()
+        return self._connection
@@ -4,9 +4,21 @@ from datetime import datetime
 import logging
 import os
 import json
+import asyncio
 from amazon_webscraping import AmazonScraperV2
-from classificador_ia import PiracyDetectionClassifier
+from amazon_webscraping_async import run_scraper
+from coletor_avaliacoes import AmazonReviewScraper, ReviewStore
+from classificador_ia import PiracyDetectionClassifier, OnlinePiracyDetectionClassifier, DEFAULT_CASCADE, DEFAULT_PREDICTION_CACHE
+from reputacao_vendedores import DEFAULT_SELLER_REPUTATION
+from indice_catalogo import get_catalog_index
+from motor_regras import DEFAULT_HEURISTIC_RULES, DEFAULT_RISK_ANALYSIS
+from servidor_modelo import ModelClient
+from retreino_incremental import IncrementalRetrainer, DEFAULT_RETRAINING
+from duplicatas import DuplicateDetector, DEFAULT_DEDUPLICATION, score_per_cluster, cluster_summary
+from grafo_vendedores import SellerGraph, DEFAULT_SELLER_GRAPH
+from imagens_produto import ImageMatcher, DEFAULT_IMAGE_MATCHING
 from gerador_relatorio_tecnico import GeradorRelatorioTecnico
+from persistencia import load_config
 from reportlab.lib.pagesizes import letter, A4
 from reportlab.lib import colors
 from reportlab.lib.units import inch
@@ -25,6 +37,8 @@ class IntegratedPiracyDetectionPipeline:
         self.load_config(config_file)
         self.scraper = None
         self.classifier = None
+        self.seller_graph = None
+        self.image_matcher = None
         self.setup_components()
         
     def setup_logging(self):
@@ -50,43 +64,74 @@ class IntegratedPiracyDetectionPipeline:
                     "cartucho HP 662"
                 ],
                 "max_pages": 2,
-                "headless": True
+                "headless": True,
+                "engine": "selenium",
+                "async": {
+                    "max_concurrency": 20,
+                    "per_host_limit": 4,
+                    "request_timeout": 20,
+                    "use_browser": True
+                }
+            },
+            "reviews": {
+                "enabled": False,
+                "max_pages": 5,
+                "reviews_file": "data/avaliacoes.csv",
+                "cursor_file": "data/avaliacoes_cursor.json"
             },
             "ai": {
                 "model_file": "resultados/modelo_deteccao_pirataria.pkl",
-                "confidence_threshold": 0.7
-            },
-            "risk_analysis": {
-                "high_risk_threshold": 4,
-                "medium_risk_threshold": 2
+                "catalog_file": "data/catalogo.csv",
+                "confidence_threshold": 0.7,
+                "server_url": None,
+                "online_learning": False,
+                "cascade": DEFAULT_CASCADE,
+                "prediction_cache": DEFAULT_PREDICTION_CACHE,
+                "seller_reputation": DEFAULT_SELLER_REPUTATION
             },
+            "heuristic_rules": DEFAULT_HEURISTIC_RULES,
+            "risk_analysis": DEFAULT_RISK_ANALYSIS,
+            "retraining": DEFAULT_RETRAINING,
+            "deduplication": DEFAULT_DEDUPLICATION,
+            "seller_graph": DEFAULT_SELLER_GRAPH,
+            "image_matching": DEFAULT_IMAGE_MATCHING,
             "output": {
                 "results_file": "resultados/resultados_deteccao_pirataria.csv",
                 "report_file": "resultados/relatorio_pirataria.html"
             }
         }
         
-        if os.path.exists(config_file):
-            with open(config_file, 'r', encoding='utf-8') as f:
-                self.config = json.load(f)
-        else:
-            self.config = default_config
+        if not os.path.exists(config_file):
             with open(config_file, 'w', encoding='utf-8') as f:
                 json.dump(default_config, f, indent=2, ensure_ascii=False)
+        self.config = load_config(config_file, default_config)
         
         self.logger.info(f"Configurações carregadas de {config_file}")
     
     def setup_components(self):
         """Configura os componentes do pipeline"""
         try:
-            # Inicializar scraper
-            self.scraper = AmazonScraperV2(
-                headless=self.config['scraping']['headless'],
-                debug=True
-            )
+            # Inicializar scraper (o motor assíncrono abre sua sessão a cada execução)
+            if self.config['scraping'].get('engine', 'selenium') != 'async':
+                self.scraper = AmazonScraperV2(
+                    headless=self.config['scraping']['headless'],
+                    debug=True
+                )
+            
+            # Inicializar classificador (hashing + SGD incremental, se configurado)
+            if self.config['ai'].get('online_learning', False):
+                self.classifier = OnlinePiracyDetectionClassifier(self.config)
+            else:
+                self.classifier = PiracyDetectionClassifier(self.config)
+            
+            # Grafo vendedor-anúncio (redes de vendedores), se configurado
+            graph_config = {**DEFAULT_SELLER_GRAPH, **self.config.get('seller_graph', {})}
+            if graph_config['enabled']:
+                self.seller_graph = SellerGraph(graph_config['file'], graph_config['propagation'], graph_config['iterations'])
             
-            # Inicializar classificador
-            self.classifier = PiracyDetectionClassifier()
+            # Imagens de referência (pHash em BK-tree), se configurado
+            if self.config.get('image_matching', {}).get('enabled', False):
+                self.image_matcher = ImageMatcher(self.config)
             
             # Tentar carregar modelo existente
             if os.path.exists(self.config['ai']['model_file']):
@@ -111,9 +156,11 @@ class IntegratedPiracyDetectionPipeline:
             # Etapa 1: Coletar dados existentes
             existing_data = self.load_existing_data()
             
-            # Etapa 2: Treinar modelo se necessário
+            # Etapa 2: Treinar modelo se necessário (ou atualizar com as linhas novas)
             if not self.classifier.is_trained:
                 self.train_model_with_existing_data(existing_data)
+            elif self.config.get('retraining', {}).get('enabled', False):
+                self.retrain_incrementally()
             
             # Etapa 3: Scraping de novos dados
             new_products = self.scrape_new_products()
@@ -121,6 +168,9 @@ class IntegratedPiracyDetectionPipeline:
                 self.logger.warning("Nenhum produto coletado no scraping. Encerrando pipeline.")
                 return pd.DataFrame()
             
+            # Etapa 3.1: Avaliações novas dos produtos coletados (incremental)
+            self.collect_reviews(new_products)
+            
             # Etapa 4: Análise com IA
             analyzed_products = self.analyze_products_with_ai(new_products)
             
@@ -130,6 +180,12 @@ class IntegratedPiracyDetectionPipeline:
             # Etapa 6: Salvar resultados
             self.save_results(risk_analyzed_products)
             
+            # Etapa 6.1: Atualizar a reputação dos vendedores com os produtos analisados
+            self.update_seller_reputation(risk_analyzed_products)
+            
+            # Etapa 6.2: Atualizar o grafo de vendedores
+            self.update_seller_graph(risk_analyzed_products)
+            
             # Etapa 7: Gerar relatório (HTML e PDF)
             self.generate_report(risk_analyzed_products)
             self.generate_pdf_report(risk_analyzed_products)
@@ -180,6 +236,14 @@ class IntegratedPiracyDetectionPipeline:
         else:
             self.logger.warning("Sem dados para treinamento")
     
+    def retrain_incrementally(self):
+        """Atualiza o modelo com as linhas novas da base de treino, se necessário"""
+        try:
+            result = IncrementalRetrainer(self.classifier, self.config).executar()
+            self.logger.info(f"Retreino incremental: {result['status']} ({result['new_rows']} linhas novas)")
+        except Exception as e:
+            self.logger.error(f"Erro no retreino incremental: {e}")
+    
     def scrape_new_products(self):
         """Executa scraping de novos produtos"""
         self.logger.info("Iniciando scraping de novos produtos...")
@@ -188,6 +252,17 @@ class IntegratedPiracyDetectionPipeline:
         search_terms = self.config['scraping']['search_terms']
         max_pages = self.config['scraping']['max_pages']
         
+        if self.config['scraping'].get('engine', 'selenium') == 'async':
+            async_config = self.config['scraping'].get('async', {})
+            all_products = asyncio.run(run_scraper(
+                search_terms,
+                max_pages,
+                headless=self.config['scraping']['headless'],
+                **async_config
+            ))
+            self.logger.info(f"Total de produtos coletados: {len(all_products)}")
+            return all_products
+        
         for term in search_terms:
             self.logger.info(f"Buscando: {term}")
             try:
@@ -203,6 +278,22 @@ class IntegratedPiracyDetectionPipeline:
         self.logger.info(f"Total de produtos coletados: {len(all_products)}")
         return all_products
     
+    def collect_reviews(self, products):
+        """Coleta apenas as avaliações novas desde a última execução de cada ASIN"""
+        reviews_config = self.config.get('reviews', {})
+        if not reviews_config.get('enabled', False):
+            return 0
+        if self.scraper is None:
+            self.logger.warning("Coleta de avaliações requer o scraper Selenium; etapa ignorada")
+            return 0
+        
+        store = ReviewStore(
+            reviews_config.get('reviews_file', 'data/avaliacoes.csv'),
+            reviews_config.get('cursor_file', 'data/avaliacoes_cursor.json')
+        )
+        collector = AmazonReviewScraper(self.scraper, store, max_pages=reviews_config.get('max_pages', 5))
+        return collector.collect_many(product.get('asin') for product in products)
+    
     def analyze_products_with_ai(self, products):
         """Analisa produtos com IA, filtrando produtos sem vendedor"""
         if not products:
@@ -255,15 +346,60 @@ class IntegratedPiracyDetectionPipeline:
         else:
             self.logger.warning("Campo price_detailed não encontrado nos dados")
         
-        # Fazer predições
-        if self.classifier.is_trained:
-            df = self.classifier.prever(df)
-        else:
+        # Agrupar anúncios quase duplicados (MinHash + LSH)
+        deduplication = self.config.get('deduplication', {})
+        if deduplication.get('enabled', False):
+            df = DuplicateDetector(self.config).annotate(df)
+            self.logger.info(f"Anúncios quase duplicados: {len(df)} produtos em {df['duplicate_cluster'].nunique()} grupos")
+        
+        # Comparar a imagem principal com as imagens de referência (usada pelas regras)
+        if self.image_matcher is not None:
+            df = self.image_matcher.annotate(df)
+            matched = df['image_match'].value_counts()
+            self.logger.info(f"Imagens de referência: {matched.get('ORIGINAL', 0)} originais, {matched.get('SUSPEITO', 0)} suspeitas")
+        
+        # Fazer predições (pelo servidor do modelo ou pelo classificador local, ver select_scorer)
+        score = self.select_scorer()
+        if score is None:
             self.logger.warning("Modelo não treinado, usando regras heurísticas")
-            df['ai_prediction'] = df.apply(self.classifier.apply_heuristic_rules, axis=1)
+            df['ai_prediction'] = self.classifier.label_products(df)
             df['ai_confidence'] = 0.5  # Confiança padrão
+            return df
         
-        return df
+        # Uma predição por grupo de duplicatas, copiada para os demais anúncios do grupo
+        if deduplication.get('classify_per_cluster', False) and 'duplicate_cluster' in df.columns:
+            return score_per_cluster(df, score)
+        return score(df)
+
+    def select_scorer(self):
+        """
+        Função de pontuação dos produtos
+        
+        O servidor do modelo (ai.server_url) só é usado se estiver no ar com o
+        mesmo ai.model_file e a mesma configuração de cascata do pipeline; caso
+        contrário a pontuação é local, em cascata se configurada. None se não
+        houver modelo treinado.
+        """
+        cascade = bool(self.classifier.cascade['enabled'])
+        server_url = self.config['ai'].get('server_url')
+        if server_url:
+            client = ModelClient(server_url)
+            health = client.saude()
+            model_file = os.path.abspath(self.config['ai']['model_file'])
+            if health is None:
+                self.logger.warning(f"Servidor do modelo em {server_url} fora do ar; pontuando localmente")
+            elif health.get('model_file') != model_file or health.get('cascade') != cascade:
+                self.logger.warning(
+                    f"Servidor do modelo em {server_url} usa {health.get('model_file')} (cascata: {health.get('cascade')}), "
+                    f"diferente do pipeline ({model_file}, cascata: {cascade}); pontuando localmente"
+                )
+            else:
+                self.logger.info(f"Usando servidor do modelo em {server_url}")
+                return client.prever_df
+        if not self.classifier.is_trained:
+            return None
+        return self.classifier.prever_cascata if cascade else self.classifier.prever
+    
     def analisar_niveis_risco(self, df):
         """Analisa níveis de risco dos produtos"""
         if len(df) == 0:
@@ -303,6 +439,31 @@ class IntegratedPiracyDetectionPipeline:
         self.logger.info(f"  Produtos suspeitos: {suspicious_products}")
         self.logger.info(f"  Produtos de alto risco: {high_risk_products}")
     
+    def update_seller_reputation(self, df):
+        """Incorpora os produtos analisados aos agregados por vendedor (se a reputação estiver ativa)"""
+        store = self.classifier.seller_reputation
+        if store is None or len(df) == 0:
+            return
+        try:
+            if 'suggested_price' not in df.columns:
+                # Modelos anteriores ao catálogo: razão de preço só para os agregados
+                catalog = get_catalog_index(self.config['ai'].get('catalog_file', "data/catalogo.csv"))
+                df = catalog.annotate(df.copy()) if catalog is not None else df
+            updated = store.update(df)
+            self.logger.info(f"Reputação atualizada para {updated} vendedores ({len(store)} no total)")
+        except Exception as e:
+            self.logger.error(f"Erro ao atualizar a reputação dos vendedores: {e}")
+    
+    def update_seller_graph(self, df):
+        """Acrescenta os produtos analisados ao grafo vendedor-anúncio (se ativo)"""
+        if self.seller_graph is None or len(df) == 0:
+            return
+        try:
+            new_edges = self.seller_graph.update(df)
+            self.logger.info(f"Grafo de vendedores: {new_edges} arestas novas ({len(self.seller_graph.edge_a)} no total)")
+        except Exception as e:
+            self.logger.error(f"Erro ao atualizar o grafo de vendedores: {e}")
+    
     def generate_report(self, df):
         """Gera relatório HTML"""
         if len(df) == 0:
@@ -389,6 +550,10 @@ class IntegratedPiracyDetectionPipeline:
             <h2>Resumo por Predição da IA</h2>
             {self.generate_prediction_summary(df)}
             
+            {self.generate_duplicate_table(df)}
+            
+            {self.generate_ring_table()}
+            
             <h2>Todos os Produtos Analisados</h2>
             {self.generate_full_table(df)}
         </body>
@@ -444,6 +609,63 @@ class IntegratedPiracyDetectionPipeline:
         html += "</table>"
         return html
     
+    def generate_duplicate_table(self, df):
+        """Gera tabela dos grupos de anúncios quase duplicados (reincidentes)"""
+        summary = cluster_summary(df)
+        if len(summary) == 0:
+            return ""
+        
+        html = "<h2>Anúncios Duplicados</h2>"
+        html += "<table><tr><th>Título (exemplo)</th><th>Anúncios</th><th>Vendedores</th><th>Predição IA</th><th>Maior Score de Risco</th></tr>"
+        
+        for _, row in summary.head(20).iterrows():
+            html += f"""
+            <tr>
+                <td>{row['title']}</td>
+                <td>{row['listings']}</td>
+                <td>{row['sellers']}</td>
+                <td>{row.get('ai_prediction', 'N/A')}</td>
+                <td>{row.get('max_risk_score', 'N/A')}</td>
+            </tr>
+            """
+        
+        html += "</table>"
+        return html
+    
+    def generate_ring_table(self):
+        """Gera tabela das redes de vendedores de maior risco (grafo vendedor-anúncio)"""
+        if self.seller_graph is None:
+            return ""
+        graph_config = {**DEFAULT_SELLER_GRAPH, **self.config.get('seller_graph', {})}
+        try:
+            rings = self.seller_graph.rings(graph_config['min_sellers'])
+        except Exception as e:
+            self.logger.error(f"Erro ao calcular as redes de vendedores: {e}")
+            return ""
+        if len(rings) == 0:
+            return ""
+        rings = rings[rings['risk'] >= graph_config['ring_risk_threshold']]
+        if len(rings) == 0:
+            return "<h2>Redes de Vendedores</h2><p>Nenhuma rede de vendedores de alto risco encontrada.</p>"
+        
+        html = "<h2>Redes de Vendedores</h2>"
+        html += "<table><tr><th>Vendedores</th><th>Contas</th><th>Anúncios</th><th>Grupos de Duplicatas</th><th>% Suspeitos</th><th>Risco</th></tr>"
+        
+        for _, row in rings.head(20).iterrows():
+            html += f"""
+            <tr class="high-risk">
+                <td>{row['sellers']}</td>
+                <td>{row['n_sellers']}</td>
+                <td>{row['listings']}</td>
+                <td>{row['clusters']}</td>
+                <td>{row['suspicious_share'] * 100:.1f}%</td>
+                <td>{row['risk']:.2f}</td>
+            </tr>
+            """
+        
+        html += "</table>"
+        return html
+    
     def generate_full_table(self, df):
         """Gera tabela completa de produtos"""
         if len(df) == 0:
@@ -0,0 +1,39 @@
+"""
+Pontuação em lote com memória limitada
+Lê um CSV/Parquet aos poucos, aplica o modelo salvo lote a lote e grava as
+predições em CSV, sem carregar a entrada inteira em memória
+
+Uso: python src/pontuar_em_lote.py data/historico.csv resultados/historico_pontuado.csv --batch-size 50000 --jobs 0
+"""
+import argparse
+import time
+from classificador_ia import PiracyDetectionClassifier
+from persistencia import load_config
+
+
+def main():
+    """Pontua o arquivo de entrada e grava o resultado"""
+    config = load_config()
+    parser = argparse.ArgumentParser(description="Pontuação em lote de produtos com o modelo de detecção de pirataria")
+    parser.add_argument('input_file', help="CSV ou Parquet com os produtos")
+    parser.add_argument('output_file', help="CSV de saída com as predições")
+    parser.add_argument('--model', default=config.get('ai', {}).get('model_file', "resultados/modelo_deteccao_pirataria.pkl"))
+    parser.add_argument('--batch-size', type=int, default=10000, help="linhas por lote (limita o uso de memória)")
+    parser.add_argument('--columns', nargs='*', help="colunas de entrada mantidas na saída (padrão: todas)")
+    parser.add_argument('--jobs', type=int, default=1, help="processos de pontuação (0 = todos os núcleos)")
+    args = parser.parse_args()
+
+    classifier = PiracyDetectionClassifier(config)
+    classifier.load_model(args.model)
+
+    start = time.time()
+    total = classifier.salvar_predicoes_em_lotes(
+        args.input_file, args.output_file, args.batch_size, args.columns,
+        n_jobs=args.jobs or None, model_file=args.model
+    )
+    elapsed = time.time() - start
+    print(f"{total} produtos pontuados em {elapsed:.1f}s ({total / max(elapsed, 1e-9):,.0f} linhas/s)")
+    print(f"Predições salvas em {args.output_file}")
+
+if __name__ == "__main__":
+    main()
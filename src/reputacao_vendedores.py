@@ -0,0 +1,227 @@
+"""
+Reputação dos vendedores
+Agregados persistentes por vendedor (SQLite): anúncios distintos, quantos foram
+classificados SUSPEITO, histograma da razão de preço (para a mediana), primeira
+e última aparição. A cada execução do pipeline só os anúncios analisados entram
+na atualização: um anúncio já visto troca a sua contribuição antiga pela nova,
+sem reler o histórico. Na pontuação, os agregados ficam num dicionário em
+memória e o score de confiança do vendedor é uma consulta O(1)
+
+Uso: python src/reputacao_vendedores.py [--top 20]
+"""
+import argparse
+import json
+import re
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from padroes_texto import normalize_text
+from persistencia import SQLiteStore, load_config
+
+DEFAULT_SELLER_REPUTATION = {
+    "enabled": False,
+    "file": "resultados/reputacao_vendedores.sqlite",
+    "prior_listings": 5
+}
+
+# Faixas de 0.05 da razão preço/preço sugerido; a última acumula as razões >= 3
+RATIO_BIN_WIDTH = 0.05
+RATIO_BINS = 61
+
+# Limite de parâmetros por consulta (o SQLite aceita no mínimo 999)
+QUERY_CHUNK_SIZE = 500
+
+SPACES_PATTERN = re.compile(r'\s+')
+
+
+def seller_key(name):
+    """Nome do vendedor normalizado (sem acentos, minúsculo, espaços simples)"""
+    return SPACES_PATTERN.sub(' ', normalize_text(str(name))).strip()
+
+
+def histogram_median(histogram):
+    """Mediana aproximada (interpolada dentro da faixa) a partir do histograma; None se vazio"""
+    counts = np.asarray(histogram, dtype=np.float64)
+    total = counts.sum()
+    if total == 0:
+        return None
+    cumulative = np.cumsum(counts)
+    position = int(np.searchsorted(cumulative, total / 2))
+    before = cumulative[position - 1] if position else 0.0
+    return float((position + (total / 2 - before) / counts[position]) * RATIO_BIN_WIDTH)
+
+
+class SellerReputationStore(SQLiteStore):
+    """
+    Agregados por vendedor em SQLite
+
+    A tabela seller_listings guarda a última contribuição de cada anúncio
+    (suspeito ou não, faixa da razão de preço), para que reanalisar o mesmo
+    anúncio substitua a contribuição em vez de contá-lo de novo.
+    """
+
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS sellers ("
+        "seller TEXT PRIMARY KEY, listings INTEGER, suspicious INTEGER, ratio_histogram TEXT, "
+        "first_seen TEXT, last_seen TEXT)",
+        "CREATE TABLE IF NOT EXISTS seller_listings ("
+        "seller TEXT, listing TEXT, suspicious INTEGER, ratio_bin INTEGER, PRIMARY KEY (seller, listing))"
+    )
+
+    def __init__(self, store_file="resultados/reputacao_vendedores.sqlite", prior_listings=5):
+        super().__init__(store_file)
+        self.store_file = store_file
+        self.prior_listings = prior_listings
+        self._sellers = None
+
+    @staticmethod
+    def listing_keys(df):
+        """Identificador de cada anúncio: ASIN, senão URL, senão título"""
+        keys = pd.Series('', index=df.index, dtype=object)
+        for column in ['title', 'url', 'asin']:
+            if column in df.columns:
+                values = df[column].astype(object).where(df[column].notna(), '').map(str).str.strip()
+                keys = (column + ':' + values).where(values != '', keys)
+        return keys
+
+    def update(self, df, seen_at=None):
+        """
+        Incorpora os anúncios analisados (colunas seller e ai_prediction; a
+        razão de preço só conta se suggested_price vier do catálogo)
+
+        Retorna o número de vendedores atualizados.
+        """
+        if len(df) == 0 or 'seller' not in df.columns or 'ai_prediction' not in df.columns:
+            return 0
+        seen_at = seen_at or datetime.now().isoformat()
+
+        sellers = df['seller'].astype(object).where(df['seller'].notna(), '').map(str)
+        batch = pd.DataFrame({
+            'seller': sellers.map({name: seller_key(name) for name in sellers.unique()}).to_numpy(dtype=object),
+            'listing': self.listing_keys(df).to_numpy(dtype=object),
+            'suspicious': (df['ai_prediction'] == 'SUSPEITO').to_numpy(dtype=np.int64)
+        })
+        batch['ratio_bin'] = -1
+        if 'suggested_price' in df.columns and 'price_ratio' in df.columns:
+            ratios = pd.to_numeric(df['price_ratio'], errors='coerce').to_numpy(dtype=np.float64)
+            has_ratio = (pd.to_numeric(df['suggested_price'], errors='coerce') > 0).to_numpy() & np.isfinite(ratios)
+            bins = np.minimum((np.maximum(ratios[has_ratio], 0) / RATIO_BIN_WIDTH).astype(np.int64), RATIO_BINS - 1)
+            batch.loc[has_ratio, 'ratio_bin'] = bins
+        batch = batch[(batch['seller'] != '') & (batch['listing'] != '')]
+        batch = batch.drop_duplicates(['seller', 'listing'], keep='last')
+        if len(batch) == 0:
+            return 0
+        rows = list(zip(batch['seller'].tolist(), batch['listing'].tolist(), batch['suspicious'].tolist(), batch['ratio_bin'].tolist()))
+        sellers = list(dict.fromkeys(row[0] for row in rows))
+
+        with self.connection as connection:
+            # Só os anúncios do lote (tabela temporária + chave primária) e os vendedores afetados são lidos
+            connection.execute("CREATE TEMP TABLE IF NOT EXISTS batch_listings (seller TEXT, listing TEXT)")
+            connection.execute("DELETE FROM batch_listings")
+            connection.executemany("INSERT INTO batch_listings VALUES (?, ?)", [row[:2] for row in rows])
+            previous = {
+                (seller, listing): (suspicious, bin_index)
+                for seller, listing, suspicious, bin_index in connection.execute(
+                    "SELECT l.seller, l.listing, l.suspicious, l.ratio_bin FROM batch_listings b "
+                    "JOIN seller_listings l ON l.seller = b.seller AND l.listing = b.listing"
+                )
+            }
+            aggregates = {}
+            for start in range(0, len(sellers), QUERY_CHUNK_SIZE):
+                chunk = sellers[start:start + QUERY_CHUNK_SIZE]
+                placeholders = ','.join('?' * len(chunk))
+                for seller, listings, suspicious, histogram, first_seen, last_seen in connection.execute(
+                    f"SELECT * FROM sellers WHERE seller IN ({placeholders})", chunk
+                ):
+                    aggregates[seller] = [listings, suspicious, json.loads(histogram), first_seen, last_seen]
+
+            # Diferença entre a contribuição nova e a antiga de cada anúncio
+            for seller, listing, suspicious, bin_index in rows:
+                aggregate = aggregates.setdefault(seller, [0, 0, [0] * RATIO_BINS, seen_at, seen_at])
+                old = previous.get((seller, listing))
+                if old is None:
+                    aggregate[0] += 1
+                else:
+                    aggregate[1] -= old[0]
+                    if old[1] >= 0:
+                        aggregate[2][old[1]] -= 1
+                aggregate[1] += suspicious
+                if bin_index >= 0:
+                    aggregate[2][bin_index] += 1
+                aggregate[3] = min(aggregate[3], seen_at)
+                aggregate[4] = max(aggregate[4], seen_at)
+
+            connection.executemany(
+                "INSERT OR REPLACE INTO seller_listings VALUES (?, ?, ?, ?)", rows
+            )
+            connection.executemany(
+                "INSERT OR REPLACE INTO sellers VALUES (?, ?, ?, ?, ?, ?)",
+                [(seller, a[0], a[1], json.dumps(a[2]), a[3], a[4]) for seller, a in aggregates.items()]
+            )
+        self._sellers = None
+        return len(sellers)
+
+    @property
+    def sellers(self):
+        """Agregados de todos os vendedores em memória (recarregados após update)"""
+        if self._sellers is None:
+            self._sellers = {}
+            for seller, listings, suspicious, histogram, first_seen, last_seen in self.connection.execute("SELECT * FROM sellers"):
+                self._sellers[seller] = {
+                    'listings': listings,
+                    'suspicious_share': suspicious / listings if listings else 0.0,
+                    'median_price_ratio': histogram_median(json.loads(histogram)),
+                    'first_seen': first_seen,
+                    'last_seen': last_seen
+                }
+        return self._sellers
+
+    def lookup(self, seller):
+        """Agregados do vendedor, ou None se nunca visto"""
+        return self.sellers.get(seller_key(seller))
+
+    def trust(self, sellers, prior_scores):
+        """
+        Score de confiança de cada vendedor: 1 - fração de anúncios suspeitos,
+        suavizada em direção ao score a priori (regras por nome) com peso de
+        prior_listings anúncios; vendedores nunca vistos ficam com o score a priori
+        """
+        known = self.sellers
+        scores = np.asarray(prior_scores, dtype=np.float64).copy()
+        by_name = {}
+        for position, seller in enumerate(sellers):
+            if seller not in by_name:
+                by_name[seller] = known.get(seller_key(seller))
+            stats = by_name[seller]
+            if stats is not None:
+                listings = stats['listings']
+                scores[position] = (
+                    self.prior_listings * scores[position] + listings * (1.0 - stats['suspicious_share'])
+                ) / (self.prior_listings + listings)
+        return scores
+
+    def __len__(self):
+        return len(self.sellers)
+
+
+def main():
+    """Lista os vendedores com maior fração de anúncios suspeitos"""
+    config = load_config()
+    settings = {**DEFAULT_SELLER_REPUTATION, **config.get('ai', {}).get('seller_reputation', {})}
+    parser = argparse.ArgumentParser(description="Reputação dos vendedores")
+    parser.add_argument('--top', type=int, default=20, help="vendedores listados")
+    parser.add_argument('--min-listings', type=int, default=1, help="mínimo de anúncios do vendedor")
+    args = parser.parse_args()
+
+    store = SellerReputationStore(settings['file'], settings['prior_listings'])
+    table = pd.DataFrame.from_dict(store.sellers, orient='index')
+    if len(table) == 0:
+        print(f"Nenhum vendedor em {settings['file']}")
+        return
+    table = table[table['listings'] >= args.min_listings]
+    table = table.sort_values(['suspicious_share', 'listings'], ascending=False).head(args.top)
+    with pd.option_context('display.width', 200, 'display.max_columns', None):
+        print(table.round(3).to_string())
+
+if __name__ == "__main__":
+    main()
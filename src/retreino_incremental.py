@@ -0,0 +1,221 @@
+"""
+Retreino incremental do modelo
+Seleciona as linhas da base de treino cadastradas depois do trained_at do
+modelo e atualiza o modelo só com elas: novas árvores na floresta (warm_start,
+com uma amostra das linhas antigas para não esquecer classes) ou partial_fit no
+modelo incremental. A atualização é revalidada num holdout e revertida se a
+acurácia cair. O monitor de deriva (PSI das features) antecipa o retreino
+quando a distribuição dos produtos novos muda
+
+Uso: python src/retreino_incremental.py [--force]
+"""
+import argparse
+import copy
+import logging
+import time
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score
+from classificador_ia import PiracyDetectionClassifier, OnlinePiracyDetectionClassifier, latest_timestamp
+from monitor_deriva import feature_drift, drifted_features, reference_distribution
+from persistencia import load_config
+
+DEFAULT_RETRAINING = {
+    "enabled": False,
+    "training_file": "data/base_dados.csv",
+    "min_new_rows": 20,
+    "trigger_new_rows": 500,
+    "psi_threshold": 0.2,
+    "new_trees": 20,
+    "replay_rows": 1000,
+    "holdout_fraction": 0.2,
+    "max_accuracy_drop": 0.02
+}
+
+
+class IncrementalRetrainer:
+    """
+    Atualiza um classificador já treinado com as linhas novas da base de treino
+
+    Dispara com trigger_new_rows linhas novas, ou antes disso (a partir de
+    min_new_rows) se alguma feature tiver PSI acima de psi_threshold.
+    """
+
+    def __init__(self, classifier, config=None):
+        self.classifier = classifier
+        config = config or {}
+        self.settings = {**DEFAULT_RETRAINING, **config.get('retraining', {})}
+        self.model_file = config.get('ai', {}).get('model_file', "resultados/modelo_deteccao_pirataria.pkl")
+        self.logger = logging.getLogger(__name__)
+
+    def new_rows_mask(self, df):
+        """Linhas com data_cadastro posterior ao trained_at do modelo"""
+        if 'data_cadastro' not in df.columns or not self.classifier.trained_at:
+            return pd.Series(False, index=df.index)
+        trained_at = pd.Timestamp(self.classifier.trained_at)
+        return pd.to_datetime(df['data_cadastro'], errors='coerce') > trained_at
+
+    def check_drift(self, df_new):
+        """PSI de cada feature das linhas novas em relação à referência do modelo"""
+        if not self.classifier.reference_stats or len(df_new) == 0:
+            return {}
+        return feature_drift(self.classifier.reference_stats, self.classifier.create_feature_frame(df_new))
+
+    def retrain_reason(self, n_new, drift, force=False):
+        """Motivo para retreinar agora, ou None"""
+        if n_new == 0:
+            return None
+        if force:
+            return "retreino forçado"
+        if n_new >= self.settings['trigger_new_rows']:
+            return f"{n_new} linhas novas"
+        drifted = drifted_features(drift, self.settings['psi_threshold'])
+        if drifted and n_new >= self.settings['min_new_rows']:
+            return f"deriva em {', '.join(drifted)}"
+        return None
+
+    def split_holdout(self, df_old, df_new):
+        """
+        Separa o holdout: uma fração das linhas novas e a mesma quantidade de
+        linhas antigas, para medir também o quanto o modelo esquece do que já
+        sabia
+
+        Retorna (linhas novas da atualização, linhas antigas disponíveis para
+        replay, holdout); as linhas do holdout ficam fora das outras duas.
+        """
+        rng = np.random.default_rng(42)
+        n_holdout = max(1, int(round(len(df_new) * self.settings['holdout_fraction'])))
+        holdout_new = np.zeros(len(df_new), dtype=bool)
+        holdout_new[rng.permutation(len(df_new))[:n_holdout]] = True
+        holdout_old = np.zeros(len(df_old), dtype=bool)
+        holdout_old[rng.permutation(len(df_old))[:n_holdout]] = True
+        holdout = pd.concat([df_new[holdout_new], df_old[holdout_old]], ignore_index=True)
+        return df_new[~holdout_new], df_old[~holdout_old], holdout
+
+    def accuracy(self, df):
+        """Acurácia do modelo atual nos rótulos de target_labels"""
+        predictions = self.classifier.prever(df.copy())['ai_prediction']
+        return accuracy_score(self.classifier.target_labels(df), predictions)
+
+    def warm_start_forest(self, df_update, replay_pool):
+        """
+        Acrescenta new_trees árvores à floresta, ajustadas nas linhas novas mais
+        uma amostra de replay_pool (linhas antigas fora do holdout); vetorizador
+        e scaler ficam congelados
+        """
+        classifier = self.classifier
+        model = classifier.model
+        n_replay = min(len(replay_pool), self.settings['replay_rows'])
+        replay = replay_pool.sample(n=n_replay, random_state=42) if n_replay else replay_pool.iloc[:0]
+        df_fit = pd.concat([df_update, replay], ignore_index=True)
+
+        labels = classifier.target_labels(df_fit)
+        missing = set(model.classes_) - set(labels)
+        if missing:
+            raise ValueError(f"Lote sem exemplos de {sorted(missing)}; aumente replay_rows")
+
+        X_text = classifier.build_text(df_fit)
+        X = classifier.combine_features(classifier.vectorizer.transform(X_text), classifier.create_feature_frame(df_fit, X_text))
+        model.set_params(warm_start=True, n_estimators=len(model.estimators_) + self.settings['new_trees'])
+        model.fit(X, labels)
+        model.set_params(warm_start=False)
+        classifier.predictor = classifier.compile_predictor(model)
+        classifier.new_model_version()
+
+    def update_model(self, df_update, replay_pool):
+        """Aplica a atualização adequada ao tipo do modelo"""
+        model = self.classifier.model
+        if hasattr(model, 'partial_fit') and isinstance(self.classifier, OnlinePiracyDetectionClassifier):
+            self.classifier.atualizar_modelo(df_update)
+        elif isinstance(model, RandomForestClassifier):
+            self.warm_start_forest(df_update, replay_pool)
+        else:
+            raise ValueError("Retreino incremental requer o modelo .pkl (floresta ou modelo incremental)")
+
+    def snapshot(self):
+        """Estado do classificador para reverter a atualização"""
+        c = self.classifier
+        return copy.deepcopy((c.model, c.scaler, c.trained_at, c.reference_stats, c.model_version))
+
+    def restore(self, state):
+        """Volta ao estado salvo por snapshot"""
+        c = self.classifier
+        c.model, c.scaler, c.trained_at, c.reference_stats, c.model_version = state
+        c.predictor = c.compile_predictor(c.model)
+
+    def executar(self, force=False):
+        """
+        Verifica a base de treino e retreina se necessário
+
+        Retorna um resumo (dict) com linhas novas, deriva por feature, motivo,
+        acurácias no holdout e o status: sem_retreino, aceito, revertido ou ignorado.
+        """
+        if not self.classifier.is_trained:
+            raise ValueError("Modelo não foi treinado ainda")
+
+        store = self.classifier.attach_catalog(pd.read_csv(self.settings['training_file']))
+        new_mask = self.new_rows_mask(store).to_numpy()
+        df_new = store[new_mask].reset_index(drop=True)
+        df_old = store[~new_mask].reset_index(drop=True)
+        drift = self.check_drift(df_new)
+        result = {'new_rows': len(df_new), 'drift': drift, 'reason': self.retrain_reason(len(df_new), drift, force)}
+
+        if result['reason'] is None:
+            self.logger.info(f"Retreino desnecessário ({len(df_new)} linhas novas)")
+            return {**result, 'status': 'sem_retreino'}
+
+        self.logger.info(f"Retreino incremental: {result['reason']}")
+        df_update, replay_pool, holdout = self.split_holdout(df_old, df_new)
+        state = self.snapshot()
+        result['accuracy_before'] = self.accuracy(holdout)
+
+        start = time.time()
+        try:
+            self.update_model(df_update, replay_pool)
+        except ValueError as e:
+            self.restore(state)
+            self.logger.warning(f"Retreino ignorado: {e}")
+            return {**result, 'status': 'ignorado', 'error': str(e)}
+        result['elapsed'] = time.time() - start
+        result['accuracy_after'] = self.accuracy(holdout)
+
+        if result['accuracy_after'] < result['accuracy_before'] - self.settings['max_accuracy_drop']:
+            self.restore(state)
+            self.logger.warning(
+                f"Retreino revertido: acurácia no holdout caiu de {result['accuracy_before']:.3f} para {result['accuracy_after']:.3f}"
+            )
+            return {**result, 'status': 'revertido'}
+
+        # Todas as linhas novas (inclusive as do holdout) passam a ser conhecidas
+        self.classifier.trained_at = latest_timestamp(df_new) or self.classifier.trained_at
+        self.classifier.reference_stats = reference_distribution(self.classifier.create_feature_frame(store))
+        self.classifier.save_model(self.model_file)
+        self.logger.info(
+            f"Retreino aceito em {result['elapsed']:.1f}s: acurácia no holdout "
+            f"{result['accuracy_before']:.3f} -> {result['accuracy_after']:.3f}"
+        )
+        return {**result, 'status': 'aceito'}
+
+
+def main():
+    """Verifica a base de treino e atualiza o modelo salvo se necessário"""
+    config = load_config()
+    parser = argparse.ArgumentParser(description="Retreino incremental do modelo de detecção de pirataria")
+    parser.add_argument('--force', action='store_true', help="retreina com qualquer quantidade de linhas novas")
+    args = parser.parse_args()
+
+    online = config.get('ai', {}).get('online_learning', False)
+    classifier = OnlinePiracyDetectionClassifier(config) if online else PiracyDetectionClassifier(config)
+    classifier.load_model(config.get('ai', {}).get('model_file', "resultados/modelo_deteccao_pirataria.pkl"))
+
+    retrainer = IncrementalRetrainer(classifier, config)
+    result = retrainer.executar(force=args.force)
+    print(f"Linhas novas: {result['new_rows']} | status: {result['status']}")
+    for column in drifted_features(result['drift'], retrainer.settings['psi_threshold']):
+        print(f"  deriva em {column}: PSI {result['drift'][column]:.3f}")
+    if 'accuracy_after' in result:
+        print(f"Acurácia no holdout: {result['accuracy_before']:.3f} -> {result['accuracy_after']:.3f}")
+
+if __name__ == "__main__":
+    main()
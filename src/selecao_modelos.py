@@ -0,0 +1,217 @@
+"""
+Seleção de modelos com validação cruzada
+Avalia várias famílias de modelo e hiperparâmetros com k-fold estratificado,
+distribuindo os pares (candidato, fold) entre processos. Texto e features
+numéricas são calculados uma vez; o TF-IDF e o scaler são ajustados uma vez por
+fold e as matrizes resultantes ficam em cache para todos os candidatos. Gera um
+ranking com acurácia, tempo de treino, latência de pontuação e tamanho do
+modelo, e escolhe o modelo mais rápido que atinge a acurácia mínima
+
+Uso: python src/selecao_modelos.py [--jobs 0] [--save]
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import pickle
+import time
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import StratifiedKFold
+from sklearn.preprocessing import StandardScaler
+from classificador_ia import PiracyDetectionClassifier, build_model
+from persistencia import load_config
+
+DEFAULT_MODEL_SELECTION = {
+    "n_folds": 5,
+    "min_accuracy": 0.85,
+    "n_jobs": 0,
+    "leaderboard_file": "resultados/leaderboard_modelos.csv",
+    "candidates": [
+        {"name": "rf_100", "type": "random_forest", "params": {"n_estimators": 100, "random_state": 42}},
+        {"name": "rf_50_d20", "type": "random_forest", "params": {"n_estimators": 50, "max_depth": 20, "random_state": 42}},
+        {"name": "logreg_c1", "type": "logistic_regression", "params": {"C": 1.0, "max_iter": 1000}},
+        {"name": "logreg_c10", "type": "logistic_regression", "params": {"C": 10.0, "max_iter": 1000}},
+        {"name": "nb_a01", "type": "naive_bayes", "params": {"alpha": 0.1}},
+        {"name": "nb_a1", "type": "naive_bayes", "params": {"alpha": 1.0}},
+        {"name": "sgd_log", "type": "sgd", "params": {"loss": "log_loss", "alpha": 1e-4, "random_state": 42}}
+    ]
+}
+
+# Folds já vetorizados, compartilhados com os processos de avaliação
+_worker_folds = None
+
+
+def _init_worker(folds):
+    """Inicializa um processo de avaliação com as matrizes dos folds"""
+    global _worker_folds
+    _worker_folds = folds
+
+
+def _evaluate_task(task):
+    """Avalia um candidato num fold (no processo de trabalho)"""
+    candidate_index, spec, fold_index = task
+    return candidate_index, fold_index, evaluate_candidate(spec, _worker_folds[fold_index])
+
+
+def evaluate_candidate(spec, fold):
+    """
+    Treina o candidato no fold e mede acurácia, tempo de treino, latência
+    (lote do fold e uma linha) pelo mesmo avaliador usado em prever, e o
+    tamanho do modelo serializado
+    """
+    X_train, y_train, X_test, y_test = fold
+    model = build_model(spec)
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_time = time.perf_counter() - start
+
+    predictor = PiracyDetectionClassifier.compile_predictor(model)
+    start = time.perf_counter()
+    probabilities = predictor.predict_proba(X_test)
+    batch_time = time.perf_counter() - start
+    predictions = predictor.classes_.take(np.argmax(probabilities, axis=1), axis=0)
+
+    single_row = X_test[:1]
+    start = time.perf_counter()
+    for _ in range(20):
+        predictor.predict_proba(single_row)
+    row_time = (time.perf_counter() - start) / 20
+
+    return {
+        'accuracy': accuracy_score(y_test, predictions),
+        'fit_time_s': fit_time,
+        'latency_ms_1k': batch_time / X_test.shape[0] * 1000 * 1000,
+        'latency_ms_row': row_time * 1000,
+        'size_kb': len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL)) / 1024
+    }
+
+
+class ModelSelector:
+    """Validação cruzada dos candidatos e escolha do modelo"""
+
+    def __init__(self, config=None):
+        config = config or {}
+        self.settings = {**DEFAULT_MODEL_SELECTION, **config.get('model_selection', {})}
+        self.classifier = PiracyDetectionClassifier(config)
+        self.logger = logging.getLogger(__name__)
+
+    def build_folds(self, df):
+        """
+        Rótulos, texto e features numéricas calculados uma vez; TF-IDF e scaler
+        ajustados só no treino de cada fold. Retorna a lista de
+        (X_train, y_train, X_test, y_test) em CSR
+        """
+        c = self.classifier
+        df = c.create_training_data(df.copy()).reset_index(drop=True)
+        y = df['label'].to_numpy(dtype=object)
+        X_text = c.build_text(df)
+        X_numeric = c.create_feature_frame(df, X_text)
+
+        n_folds = min(self.settings['n_folds'], int(pd.Series(y).value_counts().min()))
+        if n_folds < 2:
+            raise ValueError("Dados insuficientes para validação cruzada (alguma classe tem menos de 2 exemplos)")
+        if n_folds < self.settings['n_folds']:
+            self.logger.warning(f"Usando {n_folds} folds: a menor classe tem {n_folds} exemplos")
+
+        folds = []
+        splitter = StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=42)
+        for train_idx, test_idx in splitter.split(np.zeros(len(y)), y):
+            vectorizer = clone(c.vectorizer)
+            c.scaler = StandardScaler(with_mean=False)
+            X_train = c.combine_features(vectorizer.fit_transform(X_text.iloc[train_idx]), X_numeric.iloc[train_idx], fit_scaler=True)
+            X_test = c.combine_features(vectorizer.transform(X_text.iloc[test_idx]), X_numeric.iloc[test_idx])
+            folds.append((X_train, y[train_idx], X_test, y[test_idx]))
+        return folds
+
+    def evaluate(self, df, n_jobs=None):
+        """Ranking dos candidatos (médias dos folds), do escolhido para o último"""
+        folds = self.build_folds(df)
+        candidates = self.settings['candidates']
+        tasks = [(i, spec, f) for i, spec in enumerate(candidates) for f in range(len(folds))]
+        n_jobs = n_jobs if n_jobs is not None else self.settings['n_jobs']
+        n_jobs = min(n_jobs or os.cpu_count() or 1, len(tasks))
+
+        self.logger.info(f"Avaliando {len(candidates)} candidatos em {len(folds)} folds ({n_jobs} processos)")
+        if n_jobs == 1:
+            _init_worker(folds)
+            results = [_evaluate_task(task) for task in tasks]
+        else:
+            context = multiprocessing.get_context('fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn')
+            with context.Pool(n_jobs, initializer=_init_worker, initargs=(folds,)) as pool:
+                results = pool.map(_evaluate_task, tasks)
+
+        scores = pd.DataFrame([{'candidate': i, 'fold': f, **metrics} for i, f, metrics in results])
+        leaderboard = scores.groupby('candidate').agg(
+            accuracy=('accuracy', 'mean'),
+            accuracy_std=('accuracy', 'std'),
+            fit_time_s=('fit_time_s', 'mean'),
+            latency_ms_1k=('latency_ms_1k', 'median'),
+            latency_ms_row=('latency_ms_row', 'median'),
+            size_kb=('size_kb', 'mean')
+        )
+        leaderboard.insert(0, 'name', [candidates[i]['name'] for i in leaderboard.index])
+        leaderboard.insert(1, 'type', [candidates[i]['type'] for i in leaderboard.index])
+        leaderboard.insert(2, 'params', [json.dumps(candidates[i].get('params', {})) for i in leaderboard.index])
+        return self.rank(leaderboard.reset_index(drop=True))
+
+    def rank(self, leaderboard):
+        """
+        Ordena o ranking: primeiro quem atinge min_accuracy, do mais rápido
+        (latência por 1000 linhas) para o mais lento; depois os demais por
+        acurácia. O primeiro da lista é o escolhido
+        """
+        leaderboard['meets_bar'] = leaderboard['accuracy'] >= self.settings['min_accuracy']
+        leaderboard['_order'] = np.where(leaderboard['meets_bar'], leaderboard['latency_ms_1k'], -leaderboard['accuracy'])
+        leaderboard = leaderboard.sort_values(['meets_bar', '_order', 'fit_time_s'], ascending=[False, True, True])
+        leaderboard = leaderboard.drop(columns='_order').reset_index(drop=True)
+        leaderboard['selected'] = leaderboard.index == 0
+        if not leaderboard['meets_bar'].any():
+            self.logger.warning(f"Nenhum candidato atingiu {self.settings['min_accuracy']:.3f}; escolhido o mais preciso")
+        return leaderboard
+
+    def selected_spec(self, leaderboard):
+        """Especificação do candidato escolhido"""
+        name = leaderboard.loc[leaderboard['selected'], 'name'].iloc[0]
+        return next(spec for spec in self.settings['candidates'] if spec['name'] == name)
+
+    def save_leaderboard(self, leaderboard, filename=None):
+        """Grava o ranking em CSV"""
+        filename = filename or self.settings['leaderboard_file']
+        out_dir = os.path.dirname(filename)
+        if out_dir:
+            os.makedirs(out_dir, exist_ok=True)
+        leaderboard.to_csv(filename, index=False)
+        self.logger.info(f"Ranking de modelos salvo em {filename}")
+
+
+def main():
+    """Avalia os candidatos, grava o ranking e (com --save) treina e salva o escolhido"""
+    config = load_config()
+    parser = argparse.ArgumentParser(description="Seleção de modelos com validação cruzada")
+    parser.add_argument('--data', default='data/base_dados.csv', help="CSV de treino")
+    parser.add_argument('--jobs', type=int, help="processos de avaliação (0 = todos os núcleos)")
+    parser.add_argument('--save', action='store_true', help="treina o modelo escolhido com todos os dados e salva")
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.data)
+    selector = ModelSelector(config)
+    leaderboard = selector.evaluate(df, args.jobs)
+    selector.save_leaderboard(leaderboard)
+    with pd.option_context('display.width', 200, 'display.max_columns', None):
+        print(leaderboard.drop(columns='params').round(4).to_string(index=False))
+
+    spec = selector.selected_spec(leaderboard)
+    print(f"\nEscolhido: {spec['name']} ({spec['type']})")
+    if args.save:
+        classifier = PiracyDetectionClassifier(config)
+        accuracy = classifier.treinar_modelo(df, model=build_model(spec))
+        model_file = config.get('ai', {}).get('model_file', "resultados/modelo_deteccao_pirataria.pkl")
+        classifier.save_model(model_file)
+        print(f"Modelo salvo em {model_file} (acurácia no teste: {accuracy:.3f})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+"""
+Servidor local do modelo de detecção de pirataria
+Mantém o modelo carregado num processo de longa duração (HTTP em localhost) e
+agrupa requisições simultâneas em micro-lotes, para que consumidores como o
+pipeline, o dashboard ou scripts avulsos pontuem produtos sem importar o
+scikit-learn nem carregar o arquivo do modelo a cada execução
+
+Uso: python src/servidor_modelo.py --port 8765
+"""
+import argparse
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from persistencia import load_config
+
+PREDICTION_COLUMNS = ['ai_prediction', 'ai_confidence', 'ai_probabilities']
+# Devolvidas quando o classificador as cria (ai_source vem da predição em cascata)
+OPTIONAL_COLUMNS = ['ai_source']
+
+DEFAULT_MODEL_FILE = "resultados/modelo_deteccao_pirataria.pkl"
+
+
+class MicroBatcher:
+    """
+    Agrupa pedidos que chegam dentro de uma pequena janela de tempo numa
+    única chamada ao classificador (uma thread dedicada faz as predições)
+    """
+
+    def __init__(self, classifier, batch_window=0.01, max_batch_size=256):
+        self.classifier = classifier
+        self.batch_window = batch_window
+        self.max_batch_size = max_batch_size
+        self.requests = queue.Queue()
+        self.logger = logging.getLogger(__name__)
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def submit(self, products, timeout=30):
+        """Pontua os produtos (lista de dicts) e devolve uma predição por produto"""
+        request = {'products': products, 'done': threading.Event(), 'result': None, 'error': None}
+        self.requests.put(request)
+        if not request['done'].wait(timeout):
+            raise TimeoutError("Tempo esgotado aguardando a predição")
+        if request['error'] is not None:
+            raise request['error']
+        return request['result']
+
+    def collect_batch(self):
+        """Primeiro pedido da fila mais os que chegarem dentro da janela"""
+        batch = [self.requests.get()]
+        size = len(batch[0]['products'])
+        deadline = time.monotonic() + self.batch_window
+        while size < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = self.requests.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(request)
+            size += len(request['products'])
+        return batch
+
+    def score_requests(self, batch):
+        """
+        Predições de cada pedido do lote (uma lista por pedido)
+
+        Cada pedido vira o seu próprio DataFrame, e só pedidos com as mesmas
+        colunas e tipos são concatenados numa chamada ao classificador: a
+        predição de um pedido não depende de quais outros caíram no mesmo lote
+        (colunas ausentes em um pedido não viram NaN nos outros, e o
+        suggested_price de um pedido não desliga o catálogo dos demais).
+        """
+        import pandas as pd
+
+        frames = [pd.DataFrame(request['products']) for request in batch]
+        groups = {}
+        for position, frame in enumerate(frames):
+            signature = tuple((column, str(dtype)) for column, dtype in frame.dtypes.items())
+            groups.setdefault(signature, []).append(position)
+
+        results = [None] * len(batch)
+        for positions in groups.values():
+            df = pd.concat([frames[position] for position in positions], ignore_index=True)
+            scored = self.score(df)
+            columns = PREDICTION_COLUMNS + [column for column in OPTIONAL_COLUMNS if column in scored.columns]
+            predictions = [
+                {'ai_prediction': row[0], 'ai_confidence': float(row[1]), 'ai_probabilities': row[2],
+                 **dict(zip(columns[len(PREDICTION_COLUMNS):], row[len(PREDICTION_COLUMNS):]))}
+                for row in scored[columns].itertuples(index=False)
+            ]
+            start = 0
+            for position in positions:
+                end = start + len(frames[position])
+                results[position] = predictions[start:end]
+                start = end
+        return results
+
+    def score(self, df):
+        """Predição em cascata se configurada no classificador, como no pipeline"""
+        if self.classifier.cascade['enabled']:
+            return self.classifier.prever_cascata(df)
+        return self.classifier.prever(df)
+
+    def run(self):
+        """Laço da thread de predição"""
+        while True:
+            batch = self.collect_batch()
+            try:
+                for request, result in zip(batch, self.score_requests(batch)):
+                    request['result'] = result
+            except Exception as e:
+                self.logger.error(f"Erro ao pontuar lote: {e}")
+                for request in batch:
+                    request['error'] = e
+            for request in batch:
+                request['done'].set()
+
+
+class ModelRequestHandler(BaseHTTPRequestHandler):
+    """POST /prever {"products": [...]} e GET /saude"""
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == '/saude':
+            self.send_json(200, {
+                'status': 'ok',
+                'model_file': self.server.model_file,
+                'cascade': bool(self.server.batcher.classifier.cascade['enabled'])
+            })
+        else:
+            self.send_json(404, {'error': 'Rota não encontrada'})
+
+    def do_POST(self):
+        if self.path != '/prever':
+            self.send_json(404, {'error': 'Rota não encontrada'})
+            return
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            products = json.loads(self.rfile.read(length))['products']
+        except (ValueError, KeyError) as e:
+            self.send_json(400, {'error': f"Requisição inválida: {e}"})
+            return
+        if not products:
+            self.send_json(200, {'predictions': []})
+            return
+        try:
+            self.send_json(200, {'predictions': self.server.batcher.submit(products)})
+        except Exception as e:
+            self.send_json(500, {'error': str(e)})
+
+    def log_message(self, format, *args):
+        logging.getLogger(__name__).debug(format % args)
+
+
+def create_server(model_file=None, host='127.0.0.1', port=8765, batch_window=0.01, max_batch_size=256, config=None):
+    """
+    Carrega o modelo e cria o servidor HTTP (ainda sem atender requisições)
+
+    config: configurações do pipeline (catálogo, reputação, cache de predições,
+    cascata e regras valem como no pipeline); sem model_file vale ai.model_file
+    """
+    from classificador_ia import PiracyDetectionClassifier
+
+    config = config or {}
+    model_file = model_file or config.get('ai', {}).get('model_file', DEFAULT_MODEL_FILE)
+    classifier = PiracyDetectionClassifier(config)
+    classifier.load_model(model_file)
+    server = ThreadingHTTPServer((host, port), ModelRequestHandler)
+    server.daemon_threads = True
+    server.model_file = os.path.abspath(model_file)
+    server.batcher = MicroBatcher(classifier, batch_window, max_batch_size)
+    return server
+
+
+class ModelClient:
+    """
+    Cliente do servidor do modelo (apenas biblioteca padrão, sem scikit-learn)
+    """
+
+    def __init__(self, server_url="http://127.0.0.1:8765", timeout=30):
+        self.server_url = server_url.rstrip('/')
+        self.timeout = timeout
+
+    def saude(self):
+        """Estado do servidor (modelo carregado e se aplica a cascata), ou None se estiver fora do ar"""
+        try:
+            with urllib.request.urlopen(f"{self.server_url}/saude", timeout=2) as response:
+                return json.loads(response.read()) if response.status == 200 else None
+        except (urllib.error.URLError, OSError, ValueError):
+            return None
+
+    def disponivel(self):
+        """Indica se o servidor está no ar"""
+        return self.saude() is not None
+
+    def prever(self, products):
+        """Predições para uma lista de produtos (dicts com title, description, seller, price...)"""
+        body = json.dumps({'products': products}, ensure_ascii=False, default=str).encode('utf-8')
+        request = urllib.request.Request(
+            f"{self.server_url}/prever", data=body,
+            headers={'Content-Type': 'application/json; charset=utf-8'}
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.loads(response.read())['predictions']
+
+    def prever_df(self, df):
+        """Acrescenta as colunas de predição a um DataFrame, como PiracyDetectionClassifier.prever"""
+        predictions = self.prever(df.to_dict(orient='records'))
+        for column in PREDICTION_COLUMNS:
+            df[column] = [prediction[column] for prediction in predictions]
+        for column in OPTIONAL_COLUMNS:
+            if predictions and column in predictions[0]:
+                df[column] = [prediction[column] for prediction in predictions]
+        return df
+
+
+def main():
+    """Sobe o servidor do modelo"""
+    parser = argparse.ArgumentParser(description="Servidor local do modelo de detecção de pirataria")
+    parser.add_argument('--config', default="config.json", help="configurações do pipeline")
+    parser.add_argument('--model', default=None, help="arquivo do modelo (padrão: ai.model_file da configuração)")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--batch-window-ms', type=float, default=10, help="janela para agrupar requisições")
+    parser.add_argument('--max-batch-size', type=int, default=256)
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    server = create_server(args.model, args.host, args.port, args.batch_window_ms / 1000, args.max_batch_size, config)
+    print(f"Servidor do modelo em http://{args.host}:{args.port} (Ctrl+C para encerrar)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""
+Configuração dos testes: módulos de src/ importáveis e cada teste rodando
+num diretório temporário (logs/ e resultados/ não tocam os do projeto)
+"""
+import os
+import sys
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+DATA_FILE = os.path.join(ROOT, 'data', 'base_dados.csv')
+CATALOG_FILE = os.path.join(ROOT, 'data', 'catalogo.csv')
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    """Diretório temporário com logs/ (os módulos gravam logs relativos ao diretório atual)"""
+    (tmp_path / 'logs').mkdir()
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture(scope='session')
+def products():
+    """Produtos da base de dados do projeto"""
+    return pd.read_csv(DATA_FILE)
+
+
+@pytest.fixture
+def trained_classifier(products):
+    """Fábrica de classificadores treinados numa amostra da base (config opcional)"""
+    from classificador_ia import PiracyDetectionClassifier
+    from sklearn.ensemble import RandomForestClassifier
+
+    def build(config=None):
+        classifier = PiracyDetectionClassifier(config)
+        classifier.catalog_file = CATALOG_FILE
+        classifier.treinar_modelo(products.copy(), RandomForestClassifier(n_estimators=20, random_state=0))
+        return classifier
+
+    return build
@@ -0,0 +1,33 @@
+import asyncio
+import pytest
+from amazon_webscraping_async import ChromeDevToolsClient
+
+
+class FakeChromeClient(ChromeDevToolsClient):
+    """Cliente CDP com respostas fixas e uma página que nunca dispara o load"""
+
+    def __init__(self):
+        super().__init__(session=None)
+        self.closed = []
+
+    async def send(self, method, params=None, session_id=None):
+        if method == "Target.createTarget":
+            return {'targetId': 'T1'}
+        if method == "Target.attachToTarget":
+            return {'sessionId': 'S1'}
+        if method == "Target.closeTarget":
+            self.closed.append(params['targetId'])
+        return {}
+
+
+def test_render_timeout_discards_the_load_waiter():
+    client = FakeChromeClient()
+
+    async def render_twice():
+        for _ in range(2):
+            with pytest.raises(asyncio.TimeoutError):
+                await client.render("https://www.amazon.com.br/dp/B0TEST", timeout=0.01)
+
+    asyncio.run(render_twice())
+    assert client.event_waiters == {}
+    assert client.closed == ['T1', 'T1']
@@ -0,0 +1,66 @@
+import multiprocessing
+import pandas as pd
+from conftest import CATALOG_FILE
+
+
+def cached_config(workdir):
+    return {'ai': {
+        'prediction_cache': {'enabled': True, 'file': str(workdir / 'cache.sqlite')},
+        'seller_reputation': {'enabled': True, 'file': str(workdir / 'reputacao.sqlite')}
+    }}
+
+
+def test_prediction_cache_is_invalidated_by_reputation_updates(trained_classifier, products, workdir):
+    classifier = trained_classifier(cached_config(workdir))
+    batch = products.head(20)[['title', 'description', 'seller', 'price']]
+
+    classifier.prever(batch.copy())
+    assert len(classifier.prediction_cache) == 20
+    classifier.prever(batch.copy())
+    assert len(classifier.prediction_cache) == 20
+
+    # Todos os anúncios do lote passam a contar como suspeitos: a confiança dos vendedores cai
+    before = classifier.seller_trust_scores(classifier.text_column(batch, 'seller'))
+    classifier.seller_reputation.update(batch.assign(ai_prediction='SUSPEITO', asin=[f"A{i}" for i in range(20)]))
+    after = classifier.seller_trust_scores(classifier.text_column(batch, 'seller'))
+    assert (after < before).all()
+
+    rescored = classifier.prever(batch.copy())
+    assert len(classifier.prediction_cache) == 40
+    expected, confidence, _ = classifier.score_frame(classifier.attach_catalog(batch.copy()))
+    assert rescored['ai_prediction'].tolist() == list(expected)
+    assert rescored['ai_confidence'].tolist() == list(confidence)
+
+
+def test_spawned_workers_score_with_the_parent_config(trained_classifier, products, workdir, monkeypatch):
+    config = {'ai': {
+        'catalog_file': CATALOG_FILE,
+        'seller_reputation': {'enabled': True, 'file': str(workdir / 'reputacao.sqlite')}
+    }}
+    classifier = trained_classifier(config)
+    classifier.seller_reputation.update(products.assign(ai_prediction='SUSPEITO', asin=[f"A{i}" for i in range(len(products))]))
+    model_file = str(workdir / 'modelo.pkl')
+    classifier.save_model(model_file)
+
+    # Sem fork cada processo monta o próprio classificador a partir do arquivo do modelo
+    monkeypatch.setattr(multiprocessing, 'get_all_start_methods', lambda: ['spawn'])
+    parallel = pd.concat(classifier.prever_paralelo(products.copy(), n_jobs=2, batch_size=40, model_file=model_file))
+
+    expected = classifier.prever(products.copy())
+    assert parallel['ai_prediction'].tolist() == expected['ai_prediction'].tolist()
+    assert parallel['ai_confidence'].tolist() == expected['ai_confidence'].tolist()
+
+
+def test_cascade_matches_prever_on_the_rows_sent_to_the_model(trained_classifier, products):
+    classifier = trained_classifier()
+
+    full = classifier.prever(products.copy())
+    cascade = classifier.prever_cascata(products.copy())
+
+    model_rows = cascade['ai_source'] == 'modelo'
+    assert 0 < model_rows.sum() < len(products)
+    assert cascade.loc[model_rows, 'ai_prediction'].tolist() == full.loc[model_rows, 'ai_prediction'].tolist()
+    assert cascade.loc[model_rows, 'ai_probabilities'].tolist() == full.loc[model_rows, 'ai_probabilities'].tolist()
+    classes = list(classifier.predictor.classes_)
+    for label, probabilities in zip(cascade.loc[~model_rows, 'ai_prediction'], cascade.loc[~model_rows, 'ai_probabilities']):
+        assert probabilities == [float(label == c) for c in classes]
@@ -0,0 +1,77 @@
+import csv
+from coletor_avaliacoes import AmazonReviewScraper, ReviewStore
+
+
+class FakeReviewScraper(AmazonReviewScraper):
+    """Coletor com páginas fixas no lugar do navegador"""
+
+    def __init__(self, store, pages, max_pages=5):
+        super().__init__(scraper=None, store=store, max_pages=max_pages)
+        self.pages = pages
+
+    def fetch_page(self, asin, page):
+        return self.pages[page - 1] if page <= len(self.pages) else []
+
+
+def review(review_id, date):
+    return {'id': review_id, 'date': date, 'rating': '5,0 de 5 estrelas', 'title': review_id, 'body': '', 'verified': True}
+
+
+def stored_ids(store):
+    with open(store.reviews_file, newline='', encoding='utf-8') as f:
+        return [row['review_id'] for row in csv.DictReader(f)]
+
+
+def open_store(workdir):
+    return ReviewStore(str(workdir / 'avaliacoes.csv'), str(workdir / 'cursor.json'))
+
+
+def test_cursor_resumes_where_the_last_run_stopped(workdir):
+    first_run = [
+        [review('R5', 'Avaliado no Brasil em 10 de março de 2025'), review('R4', 'Avaliado no Brasil em 10 de março de 2025')],
+        [review('R3', 'Avaliado no Brasil em 2 de fevereiro de 2025'), review('R2', 'data em formato desconhecido')]
+    ]
+    FakeReviewScraper(open_store(workdir), first_run).collect_many(['B0TEST'])
+
+    # Nova avaliação no topo, uma do mesmo dia do cursor, e as antigas (inclusive a sem data) de novo
+    second_run = [
+        [review('R7', 'Avaliado no Brasil em 12 de março de 2025'), review('R6', 'Avaliado no Brasil em 10 de março de 2025'),
+         review('R5', 'Avaliado no Brasil em 10 de março de 2025')],
+        [review('R4', 'Avaliado no Brasil em 10 de março de 2025'), review('R2', 'data em formato desconhecido'),
+         review('R3', 'Avaliado no Brasil em 2 de fevereiro de 2025')]
+    ]
+    store = open_store(workdir)
+    assert FakeReviewScraper(store, second_run).collect_many(['B0TEST']) == 2
+
+    assert stored_ids(store) == ['R5', 'R4', 'R3', 'R2', 'R7', 'R6']
+    assert open_store(workdir).get_cursor('B0TEST') == {'last_date': '2025-03-12', 'seen_ids': ['R7'], 'undated_ids': ['R2']}
+
+
+def test_pages_with_only_undated_reviews_are_not_collected_twice(workdir):
+    pages = [[review('R1', 'sem data'), review('R2', '')]]
+    FakeReviewScraper(open_store(workdir), pages).collect_many(['B0TEST'])
+    store = open_store(workdir)
+
+    assert FakeReviewScraper(store, pages).collect_many(['B0TEST']) == 0
+    assert stored_ids(store) == ['R1', 'R2']
+
+
+def test_runs_cut_by_max_pages_backfill_instead_of_skipping(workdir):
+    dated = {f"R{day}": review(f"R{day}", f"Avaliado no Brasil em {day} de março de 2025") for day in range(1, 9)}
+    FakeReviewScraper(open_store(workdir), [[dated['R1']]]).collect_many(['B0TEST'])
+
+    # Seis avaliações chegam entre as coletas, três páginas de duas, e cada execução lê uma página só
+    pages = [[dated['R7'], dated['R6']], [dated['R5'], dated['R4']], [dated['R3'], dated['R2']], [dated['R1']]]
+    store = open_store(workdir)
+    assert FakeReviewScraper(store, pages, max_pages=1).collect_many(['B0TEST']) == 2
+    assert store.get_cursor('B0TEST')['last_date'] == '2025-03-01'
+    assert store.get_cursor('B0TEST')['backfill']['page'] == 2
+
+    # R8 chega no meio do backfill e desloca as páginas em uma avaliação
+    pages = [[dated['R8'], dated['R7']], [dated['R6'], dated['R5']], [dated['R4'], dated['R3']], [dated['R2'], dated['R1']]]
+    for _ in range(6):
+        FakeReviewScraper(open_store(workdir), pages, max_pages=1).collect_many(['B0TEST'])
+
+    store = open_store(workdir)
+    assert sorted(stored_ids(store), key=lambda review_id: int(review_id[1:])) == [f"R{day}" for day in range(1, 9)]
+    assert store.get_cursor('B0TEST') == {'last_date': '2025-03-08', 'seen_ids': ['R8']}
@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd
+from duplicatas import DuplicateDetector, UnionFind, score_per_cluster
+
+
+def listings():
+    return pd.DataFrame({
+        'title': [
+            'Cartucho HP 667 Preto Original 3YM79AB',
+            'Cartucho Hp 667 preto original 3ym79ab',
+            'CARTUCHO HP 667 PRETO ORIGINAL - 3YM79AB',
+            'Cartucho HP 664XL Colorido F6V30AB',
+            'Toner compatível Brother TN-1060',
+            'Cartucho HP 664XL colorido F6V30AB original'
+        ],
+        'description': ['Rende 120 páginas'] * 3 + ['', 'Toner genérico', ''],
+        'seller': ['A', 'B', 'C', 'D', 'E', 'F']
+    })
+
+
+def test_near_duplicates_share_a_cluster():
+    df = DuplicateDetector().annotate(listings())
+
+    clusters = df['duplicate_cluster'].tolist()
+    assert clusters[0] == clusters[1] == clusters[2]
+    assert len({clusters[0], clusters[3], clusters[4]}) == 3
+    assert df['cluster_size'].tolist()[:3] == [3, 3, 3]
+    assert df['cluster_size'].iloc[4] == 1
+    # Ids renumerados na ordem da primeira aparição
+    assert clusters[0] == 0
+
+
+def test_lsh_candidates_match_brute_force_above_threshold():
+    detector = DuplicateDetector({'deduplication': {'threshold': 0.5}})
+    rng = np.random.default_rng(0)
+    words = ['cartucho', 'hp', '667', '664', 'xl', 'preto', 'colorido', 'original', 'tinta', 'kit', 'combo', 'novo']
+    titles = [' '.join(rng.choice(words, size=rng.integers(3, 7))) for _ in range(300)]
+    signatures, empty = detector.signatures(titles, [''] * len(titles))
+
+    candidates = {tuple(pair) for pair in detector.candidate_pairs(signatures, empty).tolist()}
+    similarity = (signatures[:, None, :] == signatures[None, :, :]).mean(axis=2)
+    close = {(a, b) for a, b in zip(*np.nonzero(np.triu(similarity >= 0.8, k=1)))}
+
+    # Pares muito parecidos caem no mesmo balde de alguma banda (com altíssima probabilidade)
+    linked = UnionFind(len(titles))
+    for a, b in candidates:
+        linked.union(a, b)
+    assert all(linked.find(a) == linked.find(b) for a, b in close)
+
+
+def test_score_per_cluster_copies_the_representative_prediction():
+    df = DuplicateDetector().annotate(listings())
+    scored = []
+
+    def score(frame):
+        scored.append(len(frame))
+        frame['ai_prediction'] = ['SUSPEITO' if 'compatível' in title else 'ORIGINAL' for title in frame['title']]
+        return frame
+
+    df = score_per_cluster(df, score)
+
+    assert scored == [df['duplicate_cluster'].nunique()]
+    assert df.groupby('duplicate_cluster')['ai_prediction'].nunique().max() == 1
+
+
+def brute_force_clusters(signatures, threshold):
+    """Componentes conexas de todos os pares com similaridade de assinatura >= threshold"""
+    similarity = (signatures[:, None, :] == signatures[None, :, :]).mean(axis=2)
+    groups = UnionFind(len(signatures))
+    for a, b in zip(*np.nonzero(np.triu(similarity >= threshold, k=1))):
+        groups.union(a, b)
+    roots = [groups.find(i) for i in range(len(signatures))]
+    return [roots.index(root) for root in roots]
+
+
+def partition(ids):
+    """Grupos como primeira linha de cada grupo (compara agrupamentos com ids diferentes)"""
+    ids = list(ids)
+    return [ids.index(group) for group in ids]
+
+
+def test_duplicates_are_clustered_when_the_bucket_leader_is_a_false_positive():
+    detector = DuplicateDetector()
+    rng = np.random.default_rng(0)
+    signatures = rng.integers(0, 2 ** 32, size=(3, 128), dtype=np.uint32)
+    # Linha 0 só coincide com as outras na banda 0 e é a primeira do balde; as linhas 1 e 2
+    # coincidem na banda 0 e em 3 de 4 posições das demais (similaridade 97/128), sem outra banda inteira
+    signatures[1:, :4] = signatures[0, :4]
+    signatures[2, 4:] = signatures[1, 4:]
+    signatures[2, 4::4] += 1
+    empty = np.zeros(3, dtype=bool)
+
+    ids, confirmed = detector.clusters(signatures, empty)
+
+    assert confirmed == 1
+    assert partition(ids) == [0, 1, 1] == brute_force_clusters(signatures, detector.settings['threshold'])
+
+
+def test_clusters_match_brute_force_jaccard():
+    detector = DuplicateDetector()
+    rng = np.random.default_rng(1)
+    words = ['cartucho', 'hp', '667', '664', 'xl', 'preto', 'colorido', 'original', 'tinta', 'kit', 'combo', 'novo']
+    bases = [' '.join(rng.choice(words, size=8)) for _ in range(40)]
+    # Variações de cada título base (palavras trocadas ou removidas) e cópias exatas
+    titles = []
+    for base in bases:
+        for _ in range(int(rng.integers(1, 6))):
+            variant = base.split()
+            variant[int(rng.integers(len(variant)))] = str(rng.choice(words))
+            titles.append(' '.join(variant[:len(variant) - int(rng.integers(0, 2))]))
+    titles += titles[:20]
+    signatures, empty = detector.signatures(titles, [''] * len(titles))
+
+    ids, _ = detector.clusters(signatures, empty)
+
+    assert max(ids) < len(titles) - 1
+    assert partition(ids) == brute_force_clusters(signatures, detector.settings['threshold'])
@@ -0,0 +1,36 @@
+import pandas as pd
+from grafo_vendedores import SellerGraph
+
+
+def analyzed(rows):
+    return pd.DataFrame(rows, columns=['seller', 'asin', 'ai_prediction'])
+
+
+def test_sellers_sharing_listings_form_a_ring(workdir):
+    graph_file = str(workdir / 'grafo.sqlite')
+    graph = SellerGraph(graph_file)
+    graph.update(analyzed([
+        ('Loja A', 'B01', 'SUSPEITO'), ('Loja B', 'B01', 'SUSPEITO'),
+        ('Loja B', 'B02', 'SUSPEITO'), ('Loja C', 'B02', 'COMPATIVEL'),
+        ('Loja D', 'B03', 'ORIGINAL')
+    ]))
+    # Execução seguinte: só acrescenta, e liga a Loja E à mesma rede
+    graph.update(analyzed([('Loja E', 'B02', 'SUSPEITO')]))
+
+    rings = SellerGraph(graph_file).rings(min_sellers=2)
+
+    assert len(rings) == 1
+    assert rings['n_sellers'].iloc[0] == 4
+    assert set(rings['sellers'].iloc[0].split(', ')) == {'loja a', 'loja b', 'loja c', 'loja e'}
+    assert rings['listings'].iloc[0] == 2
+
+
+def test_risk_propagates_from_suspicious_listings(workdir):
+    graph = SellerGraph(str(workdir / 'grafo.sqlite'), propagation=0.5, iterations=50)
+    graph.update(analyzed([('Loja A', 'B01', 'SUSPEITO'), ('Loja B', 'B02', 'ORIGINAL')]))
+
+    propagated = graph.risk()
+    risk = {name: propagated[node_id] for name, node_id in graph.ids.items()}
+
+    assert risk['seller:loja a'] > 0.5 > risk['seller:loja b']
+    assert risk['listing:asin:B01'] > risk['listing:asin:B02']
@@ -0,0 +1,72 @@
+import random
+import numpy as np
+import pandas as pd
+from PIL import Image, ImageDraw, ImageFilter
+from imagens_produto import BKTree, ImageMatcher, hamming, phash
+
+
+def synthetic_image(seed):
+    rng = np.random.default_rng(seed)
+    image = Image.fromarray((rng.random((8, 8)) * 255).astype(np.uint8)).resize((400, 400), Image.Resampling.BICUBIC).convert('RGB')
+    ImageDraw.Draw(image).ellipse([int(rng.integers(0, 200)), int(rng.integers(0, 200)), 300, 350], fill=(200, 30, 30))
+    return image
+
+
+def test_bk_tree_search_matches_brute_force():
+    generator = random.Random(0)
+    values = [generator.getrandbits(64) for _ in range(2000)]
+    # Vizinhos próximos e hashes repetidos
+    values += [value ^ (1 << generator.randrange(64)) for value in values[:500]] + values[:50]
+    tree = BKTree()
+    for position, value in enumerate(values):
+        tree.add(value, position)
+
+    for _ in range(100):
+        query = generator.choice(values) ^ (generator.getrandbits(64) & generator.getrandbits(64) & generator.getrandbits(64))
+        for radius in (0, 4, 12):
+            expected = sorted((hamming(query, value), position) for position, value in enumerate(values) if hamming(query, value) <= radius)
+            assert sorted(tree.search(query, radius)) == expected
+    assert len(tree) == len(values)
+
+
+def test_phash_is_stable_under_resizing_and_blur():
+    original = synthetic_image(1)
+    resized = original.resize((250, 250))
+    blurred = original.crop((8, 8, 392, 392)).filter(ImageFilter.GaussianBlur(1))
+
+    assert hamming(phash(original), phash(resized)) <= 2
+    assert hamming(phash(original), phash(blurred)) <= 8
+    assert min(hamming(phash(original), phash(synthetic_image(seed))) for seed in range(2, 12)) > 10
+
+
+def test_matcher_labels_listings_by_nearest_reference(workdir):
+    references = []
+    for seed, label in [(1, 'ORIGINAL'), (2, 'SUSPEITO')]:
+        path = workdir / f'ref{seed}.png'
+        synthetic_image(seed).save(path)
+        references.append((str(path), label))
+    pd.DataFrame(references, columns=['image', 'label']).to_csv(workdir / 'referencias.csv', index=False)
+    synthetic_image(2).resize((300, 300)).save(workdir / 'anuncio.jpg', quality=70)
+    synthetic_image(99).save(workdir / 'outro.png')
+
+    matcher = ImageMatcher({'image_matching': {'cache_dir': str(workdir / 'cache'), 'references_file': str(workdir / 'referencias.csv')}})
+    df = matcher.annotate(pd.DataFrame({'image_url': [str(workdir / 'anuncio.jpg'), str(workdir / 'outro.png'), None]}))
+
+    assert df['image_match'].tolist() == ['SUSPEITO', '', '']
+    assert df['image_reference'].iloc[0] == references[1][0]
+    assert df['image_hash'].iloc[2] == ''
+
+
+def test_image_match_settles_the_cascade_but_not_the_training_labels(trained_classifier, products):
+    classifier = trained_classifier({'ai': {'cascade': {'enabled': True}}})
+    listings = products.head(20).copy()
+    matched = listings.assign(image_match='SUSPEITO')
+
+    # O modelo não recebe a imagem: os rótulos de treino não podem depender dela
+    assert classifier.label_products(matched).tolist() == classifier.label_products(listings).tolist()
+    # Na cascata a foto de um anúncio pirata (+3) decide pelas regras quem não tinha score negativo
+    cascade = classifier.prever_cascata(matched)
+    settled = (classifier.heuristic_engine.score(listings) >= 0).to_numpy()
+    assert settled.any()
+    assert (cascade['ai_source'][settled] == 'regras').all()
+    assert (cascade['ai_prediction'][settled] == 'SUSPEITO').all()
@@ -0,0 +1,32 @@
+import pandas as pd
+from conftest import CATALOG_FILE
+from indice_catalogo import CatalogIndex, FuzzyCatalogMatcher
+
+
+def test_specification_columns_drive_the_match():
+    catalog = CatalogIndex.load(CATALOG_FILE)
+    df = pd.DataFrame({
+        'title': ['Cartucho de tinta para impressora', 'Cartucho de tinta preto', 'Cartucho de tinta para impressora'],
+        'price': [70.0, 180.0, 70.0],
+        'spec_part_number': ['3YM79AB', None, None],
+        'spec_model': [None, 'HP 667XL', None]
+    })
+
+    annotated = catalog.annotate(df)
+
+    assert annotated['matched_pn'].tolist()[:2] == ['3YM79AB', '3YM81AB']
+    assert annotated['catalog_match'].tolist()[:2] == ['exato', 'exato']
+    # Mesmo título sem especificações não herda a correspondência da primeira linha
+    assert annotated['matched_pn'].iloc[2] != '3YM79AB'
+
+
+def test_fuzzy_word_cache_is_bounded():
+    catalog = CatalogIndex.load(CATALOG_FILE)
+    matcher = FuzzyCatalogMatcher(catalog.catalog['product'], max_words=5)
+    batches = [['cartucho hp 667 preto original'], ['tinta colorida xl compativel generica'], ['cartucho 664 tricolor']]
+
+    for titles in batches:
+        transformed = matcher.transform(titles)
+        expected = matcher.vectorizer.transform(titles)
+        assert abs(transformed - expected).max() < 1e-12
+        assert len(matcher.words) <= matcher.max_words + len(titles[0].split())
@@ -0,0 +1,43 @@
+import pandas as pd
+from retreino_incremental import IncrementalRetrainer
+
+
+def test_holdout_is_disjoint_from_update_and_replay(products):
+    retrainer = IncrementalRetrainer(classifier=None, config={'retraining': {'holdout_fraction': 0.3}})
+    df_old, df_new = products.iloc[:60], products.iloc[60:]
+
+    df_update, replay_pool, holdout = retrainer.split_holdout(df_old, df_new)
+
+    held_out = set(holdout['id'])
+    assert held_out.isdisjoint(df_update['id'])
+    assert held_out.isdisjoint(replay_pool['id'])
+    assert len(holdout) == 2 * 12
+    assert set(df_update['id']) | set(replay_pool['id']) | held_out == set(products['id'])
+
+
+def test_retraining_never_fits_on_holdout_rows(trained_classifier, products, workdir):
+    classifier = trained_classifier()
+    dates = pd.to_datetime(products['data_cadastro']).sort_values()
+    classifier.trained_at = dates.iloc[59].isoformat()
+    products.to_csv(workdir / 'base.csv', index=False)
+    retrainer = IncrementalRetrainer(classifier, {
+        'ai': {'model_file': str(workdir / 'modelo.pkl')},
+        'retraining': {'training_file': str(workdir / 'base.csv'), 'replay_rows': 1000, 'max_accuracy_drop': 1.0}
+    })
+    seen = {}
+    update_model, accuracy = retrainer.update_model, retrainer.accuracy
+
+    def record_update(df_update, replay_pool):
+        seen['fit'] = set(df_update['id']) | set(replay_pool['id'])
+        return update_model(df_update, replay_pool)
+
+    def record_holdout(df):
+        seen.setdefault('holdout', set(df['id']))
+        return accuracy(df)
+
+    retrainer.update_model, retrainer.accuracy = record_update, record_holdout
+
+    result = retrainer.executar(force=True)
+
+    assert result['status'] == 'aceito'
+    assert seen['holdout'] and seen['holdout'].isdisjoint(seen['fit'])
@@ -0,0 +1,36 @@
+import pandas as pd
+from servidor_modelo import MicroBatcher
+
+
+def request(products):
+    return {'products': products}
+
+
+def test_batched_requests_match_separate_scoring(trained_classifier, products):
+    classifier = trained_classifier()
+    batcher = MicroBatcher(classifier)
+    sample = products.head(6)[['title', 'description', 'seller', 'price']]
+    # Um pedido sem descrição e com suggested_price, outro só com as colunas básicas
+    first = sample.head(3).drop(columns='description').assign(suggested_price=[50.0, 0.0, 120.0]).to_dict(orient='records')
+    second = sample.tail(3).to_dict(orient='records')
+
+    batched = batcher.score_requests([request(first), request(second)])
+    separate = [batcher.score_requests([request(first)])[0], batcher.score_requests([request(second)])[0]]
+
+    assert batched == separate
+    for products_sent, predictions in zip([first, second], batched):
+        alone = classifier.prever(pd.DataFrame(products_sent))
+        assert [p['ai_prediction'] for p in predictions] == alone['ai_prediction'].tolist()
+        assert [p['ai_confidence'] for p in predictions] == alone['ai_confidence'].tolist()
+
+
+def test_cascade_configured_in_classifier_is_applied(trained_classifier, products):
+    classifier = trained_classifier({'ai': {'cascade': {'enabled': True}}})
+    batcher = MicroBatcher(classifier)
+    sent = products.head(5)[['title', 'description', 'seller', 'price']].to_dict(orient='records')
+
+    predictions = batcher.score_requests([request(sent)])[0]
+
+    expected = classifier.prever_cascata(pd.DataFrame(sent))
+    assert [p['ai_source'] for p in predictions] == expected['ai_source'].tolist()
+    assert [p['ai_prediction'] for p in predictions] == expected['ai_prediction'].tolist()